@@ -542,3 +542,70 @@ INVITATION_TOKEN_COOKIE_NAME = "invitation_token"
 DISPLAY_TEACHING_TOPBAR = env.bool("DJANGO_DISPLAY_TEACHING_TOPBAR", default=False)
 
 HASH_SALT_KEY = "123abc"
+
+# Lifetime (in seconds) of the cached amenagement simulation inputs
+# (see `envergo.moulinette.cache`). Set to 0 to disable the cache.
+MOULINETTE_RESULT_CACHE_TIMEOUT = env.int(
+    "DJANGO_MOULINETTE_RESULT_CACHE_TIMEOUT", default=60 * 60 * 24
+)
+
+# Share of the simulations whose evaluation is profiled and logged
+# (see `envergo.moulinette.profiling`). The debug page is always profiled.
+MOULINETTE_PROFILING_SAMPLE_RATE = env.float(
+    "DJANGO_MOULINETTE_PROFILING_SAMPLE_RATE", default=0.0
+)
+
+# Where the catchment area rasters are exported for in-memory lookups
+# (see `envergo.geodata.catchment`). When unset or not exported yet, the db
+# is queried instead.
+CATCHMENT_AREA_RASTERS_DIR = env("DJANGO_CATCHMENT_AREA_RASTERS_DIR", default="")
+
+# Where the hedge density grid is exported (see `envergo.geodata.density_grid`).
+# When unset or not exported yet, densities are computed from the maps.
+HEDGE_DENSITY_GRID_DIR = env("DJANGO_HEDGE_DENSITY_GRID_DIR", default="")
+# Densities in circles of at least this radius (in meters) are computed from
+# the grid. The boundary cells are estimated when the bound of the relative
+# error of the density is under the tolerance, and clipped exactly otherwise.
+HEDGE_DENSITY_GRID_MIN_RADIUS = env.int(
+    "DJANGO_HEDGE_DENSITY_GRID_MIN_RADIUS", default=1000
+)
+HEDGE_DENSITY_GRID_TOLERANCE = env.float(
+    "DJANGO_HEDGE_DENSITY_GRID_TOLERANCE", default=0.05
+)
+
+# Size of the thread pool fetching the independent simulation inputs
+# concurrently (see `envergo.moulinette.prefetch`). Set to 0 to disable.
+MOULINETTE_PREFETCH_WORKERS = env.int("DJANGO_MOULINETTE_PREFETCH_WORKERS", default=4)
+
+# Reverse geocoding answers cache (see `envergo.geodata.geocoding`)
+GEOCODING_CACHE_BACKEND = env(
+    "DJANGO_GEOCODING_CACHE_BACKEND",
+    default="envergo.geodata.geocoding.DjangoCacheBackend",
+)
+GEOCODING_CACHE_TTL = env.int("DJANGO_GEOCODING_CACHE_TTL", default=30 * 24 * 3600)
+GEOCODING_CACHE_STALE_TTL = env.int(
+    "DJANGO_GEOCODING_CACHE_STALE_TTL", default=30 * 24 * 3600
+)
+GEOCODING_CACHE_ERROR_TTL = env.int("DJANGO_GEOCODING_CACHE_ERROR_TTL", default=300)
+
+# Lifetime (in seconds) of the hedge densities shared between projects
+# (see `envergo.hedges.density`). Set to 0 to disable the cache.
+HEDGE_DENSITY_CACHE_TIMEOUT = env.int(
+    "DJANGO_HEDGE_DENSITY_CACHE_TIMEOUT", default=30 * 24 * 3600
+)
+
+# How long the reverse dns bot verdicts of the visitors ips are cached
+BOT_VERDICT_TTL = env.int("DJANGO_BOT_VERDICT_TTL", default=24 * 3600)
+# Reverse dns lookups of the visitors ips are given up after this many seconds
+BOT_DNS_TIMEOUT = env.float("DJANGO_BOT_DNS_TIMEOUT", default=3.0)
+
+# Analytics events of the web process are written in batches by a background
+# thread (see `envergo.analytics.buffer`). Events are dropped when the buffer is
+# full. Set the buffer size to 0 to write events right away.
+ANALYTICS_EVENT_BUFFER_SIZE = env.int(
+    "DJANGO_ANALYTICS_EVENT_BUFFER_SIZE", default=10000
+)
+ANALYTICS_EVENT_BATCH_SIZE = env.int("DJANGO_ANALYTICS_EVENT_BATCH_SIZE", default=500)
+ANALYTICS_EVENT_FLUSH_INTERVAL = env.float(
+    "DJANGO_ANALYTICS_EVENT_FLUSH_INTERVAL", default=2.0
+)
@@ -54,6 +54,21 @@ ENVERGO_AMENAGEMENT_DOMAIN = "testserver"
 
 RATELIMIT_ENABLE = False
 
+# Tests create and edit moulinette data on the fly, the cache is enabled
+# explicitly in the tests that need it.
+MOULINETTE_RESULT_CACHE_TIMEOUT = 0
+HEDGE_DENSITY_CACHE_TIMEOUT = 0
+
+# Prefetch threads use their own db connections, that would not see the data
+# created in the test transactions.
+MOULINETTE_PREFETCH_WORKERS = 0
+
+# Same for the analytics events flush thread
+ANALYTICS_EVENT_BUFFER_SIZE = 0
+
+# Geocoding answers are kept in memory, and cleared between tests
+GEOCODING_CACHE_BACKEND = "envergo.geodata.geocoding.MemoryBackend"
+
 # LOGGING
 # ------------------------------------------------------------------------------
 # Silence the noisiest loggers during tests (DS API calls, GraphQL transport)
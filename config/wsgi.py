@@ -34,6 +34,11 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.production")
 # file. This includes Django's development server, if the WSGI_APPLICATION
 # setting points here.
 application = get_wsgi_application()
+
+# Only the web server buffers the analytics events, see `envergo.analytics.buffer`
+from envergo.analytics.buffer import enable_event_buffer  # noqa: E402
+
+enable_event_buffer()
 # Apply WSGI middleware here.
 # from helloworld.wsgi import HelloWorldApplication
 # application = HelloWorldApplication(application)
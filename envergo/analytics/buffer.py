@@ -0,0 +1,182 @@
+"""Buffered writes of the analytics events.
+
+Almost every user action logs an `Event`. Writing them one by one, inside the
+request transaction, puts an insert query on the latency path of every
+request.
+
+Instead, events are queued in process once the request transaction is
+committed, and a background thread writes them in batches, with
+`bulk_create`, at most every `ANALYTICS_EVENT_FLUSH_INTERVAL` seconds.
+
+The queue is bounded: when the db can't keep up, new events are dropped
+(and counted) rather than piling up in memory. Events still in the queue when
+the process exits are flushed.
+
+Only the web server process buffers its events (see `enable_event_buffer`).
+Celery workers and management commands write them right away: celery prefork
+children exit with `os._exit`, without running the exit handlers, and
+commands would lose their events just the same if they were killed.
+
+Like the moulinette prefetching, the flush thread uses its own db connection,
+that would not see the data created in the test transactions. So buffering
+is disabled in tests (see `ANALYTICS_EVENT_BUFFER_SIZE`), and events are
+written right away.
+"""
+
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+
+class EventBuffer:
+    """A bounded queue of events, flushed in batches by a background thread."""
+
+    def __init__(self, max_size, batch_size, flush_interval):
+        self.queue = queue.Queue(maxsize=max_size)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.thread = None
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+
+    def add(self, event):
+        """Queue the event, return False if it had to be dropped."""
+
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            with self.lock:
+                self.dropped += 1
+            logger.warning(
+                "The analytics event buffer is full, dropping event",
+                extra={"dropped": self.dropped},
+            )
+            return False
+
+        self.start()
+        return True
+
+    def start(self):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(
+                    target=self.run, name="analytics-events", daemon=True
+                )
+                self.thread.start()
+
+    def run(self):
+        while True:
+            batch = self.get_batch()
+            # The flush thread is not a request thread, so Django would never
+            # recycle its connection
+            close_old_connections()
+            self.write(batch)
+
+    def get_batch(self):
+        """Wait for events, and collect them for `flush_interval` seconds."""
+
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def flush(self):
+        """Write all the queued events now."""
+
+        batch = []
+        while True:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+            if len(batch) == self.batch_size:
+                self.write(batch)
+                batch = []
+        if batch:
+            self.write(batch)
+
+    def write(self, batch):
+        # Prevent circular imports
+        from envergo.analytics.models import Event
+        from envergo.analytics.tasks import reconcile_bot_event
+
+        with self.write_lock:
+            try:
+                Event.objects.bulk_create(batch)
+            except DatabaseError:
+                with self.lock:
+                    self.dropped += len(batch)
+                logger.exception(
+                    "Cannot write the analytics events",
+                    extra={"events": len(batch), "dropped": self.dropped},
+                )
+                return
+
+        # Events logged before the request ip was classified (see
+        # `log_unless_bot`)
+        for event in batch:
+            bot_ip = getattr(event, "bot_ip", None)
+            if bot_ip:
+                reconcile_bot_event.delay(bot_ip, event.pk)
+
+
+_buffer = None
+_buffer_enabled = False
+_buffer_lock = threading.Lock()
+
+
+def enable_event_buffer():
+    """Buffer the events logged by this process.
+
+    Called by the web server process only (see `config.wsgi`).
+    """
+    global _buffer_enabled
+
+    _buffer_enabled = True
+
+
+def get_event_buffer():
+    """Return the event buffer of the process, or None if disabled."""
+    global _buffer
+
+    if not _buffer_enabled or settings.ANALYTICS_EVENT_BUFFER_SIZE <= 0:
+        return None
+
+    with _buffer_lock:
+        if _buffer is None:
+            _buffer = EventBuffer(
+                max_size=settings.ANALYTICS_EVENT_BUFFER_SIZE,
+                batch_size=settings.ANALYTICS_EVENT_BATCH_SIZE,
+                flush_interval=settings.ANALYTICS_EVENT_FLUSH_INTERVAL,
+            )
+            atexit.register(_buffer.flush)
+    return _buffer
+
+
+def save_event(event):
+    """Write the event, through the buffer if enabled.
+
+    Just like a direct write, the event is discarded if the current
+    transaction is rolled back.
+    """
+    event_buffer = get_event_buffer()
+    if event_buffer is None:
+        event.save()
+    else:
+        transaction.on_commit(lambda: event_buffer.add(event))
+    return event
@@ -1,24 +1,151 @@
+import logging
+
 from django.core.management.base import BaseCommand
+from django.db import connection
 
 from envergo.analytics.models import Event
+from envergo.geodata.models import MAP_TYPES
 from envergo.geodata.utils import get_commune_from_coords
 
+# The commune name field of the IGN "ADMIN EXPRESS" communes
+COMMUNE_NAME_ATTRIBUTE = "NOM"
+
+logger = logging.getLogger(__name__)
+
+COORD_REGEX = r"^\s*-?[0-9]+(\.[0-9]+)?\s*$"
+
+LOCATE_EVENTS_SQL = """
+    WITH points AS (
+        SELECT
+            id,
+            ST_SetSRID(
+                ST_MakePoint(
+                    (metadata->>'lng')::double precision,
+                    (metadata->>'lat')::double precision
+                ),
+                4326
+            )::geography AS geom
+        FROM analytics_event
+        WHERE id = ANY(%(ids)s)
+          AND metadata->>'lng' ~ %(coord_regex)s
+          AND metadata->>'lat' ~ %(coord_regex)s
+    ),
+    communes AS (
+        SELECT DISTINCT ON (p.id) p.id, z.attributes->>%(name_attribute)s AS name
+        FROM points p
+        JOIN geodata_zone z ON ST_Covers(z.geometry, p.geom)
+        JOIN geodata_map m ON m.id = z.map_id
+        WHERE m.map_type = %(map_type)s
+        ORDER BY p.id, z.id
+    )
+    UPDATE analytics_event e
+    SET metadata = e.metadata || jsonb_build_object('commune', communes.name)
+    FROM communes
+    WHERE e.id = communes.id AND communes.name IS NOT NULL
+    RETURNING e.id
+"""
+
 
 class Command(BaseCommand):
+    """Populate the `commune` metadata of the events with coordinates.
+
+    Communes are found with a spatial join against the `communes` maps (e.g
+    the IGN "ADMIN EXPRESS" COMMUNE layer, imported as a regular map). The
+    geo.api.gouv.fr api is only called for the events outside of those maps,
+    once the spatial join is committed, so no transaction is held open during
+    the api calls.
+    """
+
     help = "Populate geographical fields for log events"
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Number of events updated at once",
+        )
+        parser.add_argument(
+            "--no-api",
+            action="store_true",
+            help="Don't call the geo api for events outside of the communes maps",
+        )
+
     def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        use_api = not options["no_api"]
 
-        events = Event.objects.filter(
-            metadata__lat__isnull=False, metadata__lng__isnull=False
-        ).exclude(metadata__has_key="commune")
-        for event in events:
-            commune = get_commune_from_coords(
-                event.metadata["lng"], event.metadata["lat"]
+        events = (
+            Event.objects.filter(
+                metadata__lat__isnull=False, metadata__lng__isnull=False
             )
-            event.metadata["commune"] = commune or ""
-            event.save()
+            .exclude(metadata__has_key="commune")
+            .order_by("id")
+        )
+
+        located = fetched = 0
+        last_id = 0
+        while True:
+            ids = list(
+                events.filter(id__gt=last_id).values_list("id", flat=True)[:chunk_size]
+            )
+            if not ids:
+                break
+            last_id = ids[-1]
 
-            print(f'{event.metadata["lng"]},{event.metadata["lat"]}, {commune}')
+            # A single update statement, committed right away
+            located_ids = self.locate_events(ids)
+            located += len(located_ids)
+
+            misses = [event_id for event_id in ids if event_id not in located_ids]
+            if use_api and misses:
+                fetched += self.fetch_communes(misses)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Updated {located} events from the communes maps, "
+                f"{fetched} from the geo api"
+            )
+        )
+
+    def locate_events(self, ids):
+        """Set the commune of the events located in a communes map.
+
+        Returns the set of updated event ids.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                LOCATE_EVENTS_SQL,
+                {
+                    "ids": ids,
+                    "coord_regex": COORD_REGEX,
+                    "name_attribute": COMMUNE_NAME_ATTRIBUTE,
+                    "map_type": MAP_TYPES.communes,
+                },
+            )
+            return {row[0] for row in cursor.fetchall()}
+
+    def fetch_communes(self, ids):
+        """Set the commune of the events with the geo api.
+
+        Events whose lookup failed unexpectedly are left untouched, so they
+        are looked up again on the next run.
+        """
+
+        events = []
+        events_qs = Event.objects.filter(id__in=ids).only("id", "metadata")
+        for event in events_qs.order_by("id"):
+            try:
+                commune = get_commune_from_coords(
+                    event.metadata["lng"], event.metadata["lat"]
+                )
+            except (TypeError, ValueError):
+                commune = None
+            except Exception:
+                logger.exception("Cannot find the commune of event %s", event.id)
+                continue
+            event.metadata["commune"] = commune or ""
+            events.append(event)
 
-        self.stdout.write(self.style.SUCCESS("Updated some event records"))
+        Event.objects.bulk_update(events, ["metadata"])
+        return len(events)
@@ -0,0 +1,16 @@
+import logging
+
+from config.celery_app import app
+from envergo.analytics.models import Event
+from envergo.analytics.utils import classify_ip
+
+logger = logging.getLogger(__name__)
+
+
+@app.task
+def reconcile_bot_event(ip, event_id=None):
+    """Classify the ip, and delete the event logged for it if it's a bot."""
+
+    if classify_ip(ip) and event_id:
+        logger.info("Deleting event %s logged for bot ip %s", event_id, ip)
+        Event.objects.filter(pk=event_id).delete()
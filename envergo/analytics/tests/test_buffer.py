@@ -0,0 +1,105 @@
+from unittest.mock import patch
+
+import pytest
+from django.core.cache import cache
+
+from envergo.analytics.buffer import EventBuffer, get_event_buffer, save_event
+from envergo.analytics.models import Event
+from envergo.analytics.utils import log_event, log_unless_bot
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def buffer_enabled():
+    with patch("envergo.analytics.buffer._buffer_enabled", True):
+        yield
+
+
+@pytest.fixture
+def event_buffer(buffer_enabled):
+    # Events are only written when flushed explicitly
+    with patch.object(EventBuffer, "start"):
+        yield EventBuffer(max_size=3, batch_size=2, flush_interval=1)
+
+
+def make_event(site, **kwargs):
+    return Event(category="Category", event="Event", site=site, **kwargs)
+
+
+def test_flush_writes_events_in_batches(event_buffer, site, django_assert_num_queries):
+    for _ in range(3):
+        assert event_buffer.add(make_event(site))
+    assert Event.objects.count() == 0
+
+    with django_assert_num_queries(2):
+        event_buffer.flush()
+    assert Event.objects.count() == 3
+
+
+def test_full_buffer_drops_events(event_buffer, site):
+    for _ in range(3):
+        event_buffer.add(make_event(site))
+
+    assert event_buffer.add(make_event(site)) is False
+    assert event_buffer.dropped == 1
+
+    event_buffer.flush()
+    assert Event.objects.count() == 3
+
+
+def test_save_event_waits_for_commit(
+    settings, site, event_buffer, django_capture_on_commit_callbacks
+):
+    settings.ANALYTICS_EVENT_BUFFER_SIZE = 10
+    with patch("envergo.analytics.buffer._buffer", event_buffer):
+        with django_capture_on_commit_callbacks(execute=True):
+            save_event(make_event(site))
+            assert event_buffer.queue.qsize() == 0
+        assert event_buffer.queue.qsize() == 1
+
+
+def test_buffer_can_be_disabled(settings, site, buffer_enabled):
+    settings.ANALYTICS_EVENT_BUFFER_SIZE = 0
+    assert get_event_buffer() is None
+
+    save_event(make_event(site))
+    assert Event.objects.count() == 1
+
+
+def test_buffer_is_only_enabled_in_the_web_process(settings, site):
+    """Workers and commands may exit without flushing, they write right away."""
+    settings.ANALYTICS_EVENT_BUFFER_SIZE = 10
+    assert get_event_buffer() is None
+
+    save_event(make_event(site))
+    assert Event.objects.count() == 1
+
+
+@patch("envergo.analytics.utils.socket.gethostbyaddr")
+def test_buffered_bot_events_are_deleted(
+    mock_gethostbyaddr,
+    settings,
+    rf,
+    user,
+    site,
+    event_buffer,
+    django_capture_on_commit_callbacks,
+):
+    cache.clear()
+    mock_gethostbyaddr.return_value = ("crawl-66-249-66-2.googlebot.com", [], [])
+    settings.ANALYTICS_EVENT_BUFFER_SIZE = 10
+    request = rf.get("/")
+    request.site = site
+    request.user = user
+    request.COOKIES["visitorid"] = "1234"
+    request.META["HTTP_X_REAL_IP"] = "66.249.66.2"
+
+    with patch("envergo.analytics.buffer._buffer", event_buffer):
+        with django_capture_on_commit_callbacks(execute=True):
+            log_unless_bot(request, lambda: log_event("Category", "Event", request))
+    mock_gethostbyaddr.assert_not_called()
+
+    event_buffer.flush()
+    assert Event.objects.count() == 0
+    mock_gethostbyaddr.assert_called_once()
@@ -0,0 +1,74 @@
+from unittest.mock import patch
+
+import pytest
+import requests
+from django.core.management import call_command
+
+from envergo.analytics.tests.factories import SimulationEventFactory
+from envergo.geodata.models import MAP_TYPES
+from envergo.geodata.tests.factories import MapFactory, ZoneFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def communes_map():
+    communes_map = MapFactory(map_type=MAP_TYPES.communes, zones=[])
+    ZoneFactory(map=communes_map, attributes={"NOM": "Nantes", "INSEE_COM": "44109"})
+    return communes_map
+
+
+@patch(
+    "envergo.analytics.management.commands.populate_log_communes.get_commune_from_coords"
+)
+def test_populate_log_communes(mock_commune, communes_map):
+    mock_commune.return_value = "Somewhere"
+    in_map = SimulationEventFactory(metadata={"lng": -1.55, "lat": 47.21})
+    out_of_map = SimulationEventFactory(metadata={"lng": "-60.0", "lat": "-20.0"})
+    invalid = SimulationEventFactory(metadata={"lng": "abc", "lat": "def"})
+    done = SimulationEventFactory(metadata={"lng": 1, "lat": 1, "commune": "Paris"})
+
+    call_command("populate_log_communes", chunk_size=2)
+
+    for event in (in_map, out_of_map, invalid, done):
+        event.refresh_from_db()
+    assert in_map.metadata["commune"] == "Nantes"
+    assert out_of_map.metadata["commune"] == "Somewhere"
+    assert invalid.metadata["commune"] == "Somewhere"
+    assert done.metadata["commune"] == "Paris"
+    assert mock_commune.call_count == 2
+
+
+@patch(
+    "envergo.analytics.management.commands.populate_log_communes.get_commune_from_coords"
+)
+def test_populate_log_communes_without_api(mock_commune, communes_map):
+    in_map = SimulationEventFactory(metadata={"lng": -1.55, "lat": 47.21})
+    out_of_map = SimulationEventFactory(metadata={"lng": -60.0, "lat": -20.0})
+
+    call_command("populate_log_communes", no_api=True)
+
+    in_map.refresh_from_db()
+    out_of_map.refresh_from_db()
+    assert in_map.metadata["commune"] == "Nantes"
+    assert "commune" not in out_of_map.metadata
+    mock_commune.assert_not_called()
+
+
+@patch(
+    "envergo.analytics.management.commands.populate_log_communes.get_commune_from_coords"
+)
+def test_populate_log_communes_api_errors(mock_commune, communes_map):
+    """Api errors don't prevent the other events from being updated."""
+    mock_commune.side_effect = [requests.ConnectionError("Nope"), "Somewhere"]
+    in_map = SimulationEventFactory(metadata={"lng": -1.55, "lat": 47.21})
+    failed = SimulationEventFactory(metadata={"lng": -60.0, "lat": -20.0})
+    fetched = SimulationEventFactory(metadata={"lng": -61.0, "lat": -21.0})
+
+    call_command("populate_log_communes")
+
+    for event in (in_map, failed, fetched):
+        event.refresh_from_db()
+    assert in_map.metadata["commune"] == "Nantes"
+    assert "commune" not in failed.metadata
+    assert fetched.metadata["commune"] == "Somewhere"
@@ -1,11 +1,20 @@
+import threading
 from unittest.mock import patch
 
 import pytest
 from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
 from django.test import override_settings
 
 from envergo.analytics.models import Event
-from envergo.analytics.utils import is_request_from_a_bot, log_event
+from envergo.analytics.utils import (
+    classify_ip,
+    get_bot_verdict,
+    get_request_ip,
+    is_bot_ip,
+    log_event,
+    log_unless_bot,
+)
 
 pytestmark = pytest.mark.django_db
 
@@ -92,45 +101,118 @@ def test_log_event_with_no_salt_key_configured(rf, haie_user, site, caplog):
     assert event.unique_id is None
 
 
-def test_is_request_from_a_bot_no_ip(rf):
-    """Returns False when no IP is provided."""
+def test_get_request_ip_no_ip(rf):
+    """Returns None when no IP is provided."""
     request = rf.get("/")
     request.META.pop("HTTP_X_REAL_IP", None)
-    assert is_request_from_a_bot(request) is False
+    assert get_request_ip(request) is None
 
 
-def test_is_request_from_a_bot_invalid_ip(rf):
-    """Returns False when IP is invalid (protects against injection)."""
+def test_get_request_ip_invalid_ip(rf):
+    """Returns None when IP is invalid (protects against injection)."""
     request = rf.get("/")
     request.META["HTTP_X_REAL_IP"] = "invalid\ninjection"
-    assert is_request_from_a_bot(request) is False
+    assert get_request_ip(request) is None
 
     request.META["HTTP_X_REAL_IP"] = "not-an-ip"
-    assert is_request_from_a_bot(request) is False
+    assert get_request_ip(request) is None
 
 
 @patch("envergo.analytics.utils.socket.gethostbyaddr")
-def test_is_request_from_a_bot_dns_error(mock_gethostbyaddr, rf):
+def test_is_bot_ip_dns_error(mock_gethostbyaddr):
     """Returns False when DNS lookup fails."""
     mock_gethostbyaddr.side_effect = OSError("DNS lookup failed")
-    request = rf.get("/")
-    request.META["HTTP_X_REAL_IP"] = "66.249.66.1"
-    assert is_request_from_a_bot(request) is False
+    assert is_bot_ip("66.249.66.1") is False
 
 
 @patch("envergo.analytics.utils.socket.gethostbyaddr")
-def test_is_request_from_a_bot_googlebot(mock_gethostbyaddr, rf):
+def test_is_bot_ip_googlebot(mock_gethostbyaddr):
     """Returns True for known bot domains."""
     mock_gethostbyaddr.return_value = ("crawl-66-249-66-1.googlebot.com", [], [])
-    request = rf.get("/")
-    request.META["HTTP_X_REAL_IP"] = "66.249.66.1"
-    assert is_request_from_a_bot(request) is True
+    assert is_bot_ip("66.249.66.1") is True
 
 
 @patch("envergo.analytics.utils.socket.gethostbyaddr")
-def test_is_request_from_a_bot_not_a_bot(mock_gethostbyaddr, rf):
+def test_is_bot_ip_not_a_bot(mock_gethostbyaddr):
     """Returns False for unknown domains."""
     mock_gethostbyaddr.return_value = ("some-random-host.example.com", [], [])
+    assert is_bot_ip("192.168.1.1") is False
+
+
+@override_settings(BOT_DNS_TIMEOUT=0.01)
+@patch("envergo.analytics.utils.socket.gethostbyaddr")
+def test_is_bot_ip_timeout(mock_gethostbyaddr):
+    """Slow lookups are given up, and their verdict is not cached."""
+    cache.clear()
+    lookup_done = threading.Event()
+    mock_gethostbyaddr.side_effect = lambda ip: lookup_done.wait(1)
+
+    assert is_bot_ip("66.249.66.1") is None
+    assert classify_ip("66.249.66.1") is False
+    assert get_bot_verdict("66.249.66.1") is None
+    lookup_done.set()
+
+
+@pytest.fixture
+def visitor_request(rf, user, site):
+    cache.clear()
     request = rf.get("/")
-    request.META["HTTP_X_REAL_IP"] = "192.168.1.1"
-    assert is_request_from_a_bot(request) is False
+    request.site = site
+    request.user = user
+    request.COOKIES["visitorid"] = "1234"
+    request.META["HTTP_X_REAL_IP"] = "66.249.66.1"
+    return request
+
+
+@patch("envergo.analytics.utils.socket.gethostbyaddr")
+def test_log_unless_bot_known_bot(mock_gethostbyaddr, visitor_request):
+    """Requests from known bots are not logged."""
+    mock_gethostbyaddr.return_value = ("crawl-66-249-66-1.googlebot.com", [], [])
+    assert classify_ip("66.249.66.1") is True
+
+    log_unless_bot(
+        visitor_request, lambda: log_event("Category", "Event", visitor_request)
+    )
+    assert Event.objects.count() == 0
+
+
+@patch("envergo.analytics.utils.socket.gethostbyaddr")
+def test_log_unless_bot_resolves_unknown_ips_later(
+    mock_gethostbyaddr, visitor_request, django_capture_on_commit_callbacks
+):
+    """Unknown ips are logged right away, and the event deleted if it's a bot."""
+    mock_gethostbyaddr.return_value = ("crawl-66-249-66-1.googlebot.com", [], [])
+
+    with django_capture_on_commit_callbacks() as callbacks:
+        log_unless_bot(
+            visitor_request, lambda: log_event("Category", "Event", visitor_request)
+        )
+    mock_gethostbyaddr.assert_not_called()
+    assert Event.objects.count() == 1
+
+    callbacks[0]()
+    assert Event.objects.count() == 0
+    assert get_bot_verdict("66.249.66.1") is True
+
+
+@patch("envergo.analytics.utils.socket.gethostbyaddr")
+def test_log_unless_bot_keeps_human_events(
+    mock_gethostbyaddr, visitor_request, django_capture_on_commit_callbacks
+):
+    mock_gethostbyaddr.return_value = ("some-random-host.example.com", [], [])
+
+    with django_capture_on_commit_callbacks(execute=True):
+        log_unless_bot(
+            visitor_request, lambda: log_event("Category", "Event", visitor_request)
+        )
+    assert Event.objects.count() == 1
+    assert get_bot_verdict("66.249.66.1") is False
+
+    # The verdict is known, no more lookup is needed
+    with django_capture_on_commit_callbacks() as callbacks:
+        log_unless_bot(
+            visitor_request, lambda: log_event("Category", "Event", visitor_request)
+        )
+    assert Event.objects.count() == 2
+    assert callbacks == []
+    mock_gethostbyaddr.assert_called_once()
@@ -1,63 +1,150 @@
 import ipaddress
 import logging
 import socket
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
 
 from django.conf import settings
+from django.core.cache import cache
 from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
 
+from envergo.analytics.buffer import save_event
 from envergo.analytics.models import Event
 from envergo.utils.urls import extract_mtm_params, update_qs
 
 logger = logging.getLogger(__name__)
 
 
-def is_request_from_a_bot(request):
-    """Check that the requests comes certain domains identified as bots.
+# Requests coming from those domains are not logged
+BOT_DOMAINS = [
+    "googlebot.com",
+    "search.msn.com",
+    "search.qwant.com",
+    "amazonaws.com",  # Trello preview bot, among others
+    "vultrusercontent.com",  # Updown.io
+    "compute.outscale.com",  # Mattermost
+]
 
-    We perform a reverse dns lookup of the user agent ip, and compare it
-    against known domain origin for bots.
+BOT_VERDICT_CACHE_KEY = "analytics:bot_verdict:{ip}"
+
+# Reverse dns lookups ignore the socket timeouts, so they are made in a thread
+# pool, and given up after `BOT_DNS_TIMEOUT` seconds
+_dns_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="bot-dns")
 
-    """
 
-    bot_domains = [
-        "googlebot.com",
-        "search.msn.com",
-        "search.qwant.com",
-        "amazonaws.com",  # Trello preview bot, among others
-        "vultrusercontent.com",  # Updown.io
-        "compute.outscale.com",  # Mattermost
-    ]
+def get_request_ip(request):
+    """Return the validated ip of the request, or None."""
 
     request_ip = request.META.get("HTTP_X_REAL_IP", None)
     if request_ip is None:
-        return False
+        return None
 
     try:
         ipaddress.ip_address(request_ip)
     except ValueError:
-        return False
+        return None
+
+    return request_ip
+
+
+def is_bot_ip(ip):
+    """Check that the ip belongs to certain domains identified as bots.
+
+    We perform a reverse dns lookup of the ip, and compare it against known
+    domain origin for bots. This is a blocking call, that should not be made
+    on the request path (see `log_unless_bot`).
+
+    Returns None if the lookup timed out.
+    """
 
     # Find domain corresponding to ip
-    socket.setdefaulttimeout(3)
+    lookup = _dns_executor.submit(socket.gethostbyaddr, ip)
     try:
-        host = socket.gethostbyaddr(request_ip)[0]
+        host = lookup.result(timeout=settings.BOT_DNS_TIMEOUT)[0]
+    except TimeoutError:
+        # Must be caught before OSError, its parent class
+        logger.warning("Reverse dns lookup of ip %s timed out", ip)
+        return None
     except OSError:
         return False
 
-    logger.info("Request from ip %s, found matching domain %r", request_ip, host)
+    logger.info("Request from ip %s, found matching domain %r", ip, host)
 
     # Does the request's domain matches a known bot domain?
-    for bot_domain in bot_domains:
-        if host.endswith(bot_domain):
-            return True
+    return any(host.endswith(bot_domain) for bot_domain in BOT_DOMAINS)
+
+
+def get_bot_verdict(ip):
+    """Return the cached bot verdict for the ip, or None if unknown yet."""
+    return cache.get(BOT_VERDICT_CACHE_KEY.format(ip=ip))
+
 
-    return False
+def classify_ip(ip):
+    """Return the bot verdict for the ip, and cache it.
+
+    When the lookup times out, the ip is not considered as a bot, and the
+    verdict is not cached, so the ip is looked up again next time.
+    """
+
+    verdict = get_bot_verdict(ip)
+    if verdict is None:
+        verdict = is_bot_ip(ip)
+        if verdict is None:
+            return False
+        cache.set(
+            BOT_VERDICT_CACHE_KEY.format(ip=ip), verdict, settings.BOT_VERDICT_TTL
+        )
+    return verdict
+
+
+def log_unless_bot(request, log):
+    """Call `log` unless the request comes from a bot.
+
+    When we detect that the request comes from a robot (e.g a search engine
+    crawler), we don't log any event to try to keep some clean analytics.
+
+    The reverse dns lookups are slow, so they are never made on the request
+    path. When the ip was not classified yet, `log` is called right away, and
+    the ip is classified in the background once the event is written. If it
+    turns out to be a bot, the event is then deleted.
+
+    `log` must return the logged `Event`, or None.
+    """
+    # Prevent circular imports
+    from envergo.analytics.tasks import reconcile_bot_event
+
+    request_ip = get_request_ip(request)
+    if request_ip is None:
+        return log()
+
+    verdict = get_bot_verdict(request_ip)
+    if verdict:
+        return None
+
+    if verdict is not None:
+        return log()
+
+    # Buffered events are queued on commit, so they are marked before being
+    # written, even outside of a request transaction
+    with transaction.atomic(savepoint=False):
+        event = log()
+        if event is not None and event.pk is None:
+            # The buffered event is reconciled once written
+            event.bot_ip = request_ip
+        else:
+            event_id = event.pk if event else None
+            transaction.on_commit(
+                lambda: reconcile_bot_event.delay(request_ip, event_id)
+            )
+    return event
 
 
 def log_event(category, event, request, **kwargs):
     visitor_id = request.COOKIES.get(settings.VISITOR_COOKIE_NAME, "")
-    log_event_raw(category, event, visitor_id, request.user, request.site, **kwargs)
+    return log_event_raw(
+        category, event, visitor_id, request.user, request.site, **kwargs
+    )
 
 
 def log_event_raw(category, event, visitor_id, user, site, **kwargs):
@@ -68,13 +155,15 @@ def log_event_raw(category, event, visitor_id, user, site, **kwargs):
                 unique_id = user.get_unique_hash()
             except ImproperlyConfigured as e:
                 logger.error(f"No `unique_id` is set to event: {e}")
-        Event.objects.create(
-            category=category,
-            event=event,
-            session_key=visitor_id,
-            unique_id=unique_id,
-            metadata=kwargs,
-            site=site,
+        return save_event(
+            Event(
+                category=category,
+                event=event,
+                session_key=visitor_id,
+                unique_id=unique_id,
+                metadata=kwargs,
+                site=site,
+            )
         )
 
 
@@ -0,0 +1,165 @@
+"""Performance benchmarks of the moulinette hot paths.
+
+Benchmarks are not run with the test suite. To run them against the local
+PostGIS test database:
+
+    pytest envergo/benchmarks
+
+Each benchmark runs its target a few times and records the best, median and
+mean wall time, as well as the number of db queries. Results are compared to
+the baselines stored in `baselines.json`, and regressions are reported at the
+end of the session.
+
+When a change is expected to alter performances, update the baselines and
+commit them alongside the change, so the difference shows up in review:
+
+    pytest envergo/benchmarks --benchmark-save
+"""
+
+import json
+import statistics
+import time
+from pathlib import Path
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from envergo.benchmarks.geodata import CENTER, hedge_network, large_multipolygon
+from envergo.geodata.conftest import (  # noqa: F401
+    france_map,
+    loire_atlantique_department,
+)
+from envergo.geodata.models import MAP_TYPES, Line
+from envergo.geodata.tests.factories import MapFactory
+
+BASELINES_PATH = Path(__file__).parent / "baselines.json"
+
+# A benchmark is reported as a regression when its median time is this much
+# slower than the baseline
+REGRESSION_THRESHOLD = 1.25
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("benchmarks")
+    group.addoption(
+        "--benchmark-rounds",
+        type=int,
+        default=5,
+        help="Number of timed runs of each benchmark.",
+    )
+    group.addoption(
+        "--benchmark-save",
+        action="store_true",
+        help="Save the results as the new baselines.",
+    )
+    group.addoption(
+        "--benchmark-json",
+        type=Path,
+        default=None,
+        help="Also write the results to the given file.",
+    )
+
+
+_results = {}
+
+
+@pytest.fixture(autouse=True)
+def autouse_site(db, site):
+    """Ensure DB access and a Site object for all benchmarks."""
+    pass
+
+
+@pytest.fixture
+def land_map():
+    """A "terres émergées" map with a 20k vertices coastline around the center."""
+
+    return MapFactory(
+        name="Synthetic land",
+        map_type=MAP_TYPES.density_reference,
+        zones__geometry=large_multipolygon(
+            CENTER, radius=8000, nb_polygons=1, nb_points=20000, seed=1
+        ),
+    )
+
+
+@pytest.fixture
+def bocage_map():
+    """A dense hedge map around the center (~1700 hedges, 100m apart)."""
+
+    map = MapFactory(name="Synthetic bocage", map_type=MAP_TYPES.haies, zones=None)
+    Line.objects.bulk_create(
+        Line(map=map, geometry=geometry) for geometry in hedge_network(CENTER)
+    )
+    return map
+
+
+@pytest.fixture
+def benchmark(request):
+    """Time a callable, and record the results under the benchmark name.
+
+    The callable is called once to warm up caches and count the queries, then
+    `--benchmark-rounds` times. Returns the result of the last call.
+    """
+    rounds = request.config.getoption("--benchmark-rounds")
+
+    def run(func, *args, **kwargs):
+        with CaptureQueriesContext(connection) as ctx:
+            result = func(*args, **kwargs)
+
+        timings = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            timings.append(time.perf_counter() - start)
+
+        _results[request.node.name] = {
+            "rounds": rounds,
+            "min": round(min(timings), 6),
+            "median": round(statistics.median(timings), 6),
+            "mean": round(statistics.mean(timings), 6),
+            "queries": len(ctx.captured_queries),
+        }
+        return result
+
+    return run
+
+
+def load_baselines():
+    if not BASELINES_PATH.exists():
+        return {}
+    return json.loads(BASELINES_PATH.read_text())
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    if not _results:
+        return
+
+    baselines = load_baselines()
+    terminalreporter.section("benchmarks")
+    terminalreporter.write_line(
+        f"{'benchmark':<50} {'median (s)':>12} {'baseline':>12} {'queries':>8}"
+    )
+    for name, result in sorted(_results.items()):
+        baseline = baselines.get(name)
+        line = f"{name:<50} {result['median']:>12.4f}"
+        if baseline:
+            line += f" {baseline['median']:>12.4f} {result['queries']:>8}"
+            ratio = result["median"] / baseline["median"]
+            if ratio > REGRESSION_THRESHOLD:
+                line += f"  REGRESSION x{ratio:.2f}"
+            if result["queries"] > baseline["queries"]:
+                line += f"  +{result['queries'] - baseline['queries']} queries"
+        else:
+            line += f" {'-':>12} {result['queries']:>8}"
+        terminalreporter.write_line(line)
+
+    if config.getoption("--benchmark-save"):
+        # Only the benchmarks that were run are updated
+        baselines.update(_results)
+        BASELINES_PATH.write_text(json.dumps(baselines, indent=2, sort_keys=True))
+        terminalreporter.write_line(f"Baselines saved to {BASELINES_PATH}")
+
+    json_path = config.getoption("--benchmark-json")
+    if json_path:
+        json_path.write_text(json.dumps(_results, indent=2, sort_keys=True))
@@ -0,0 +1,153 @@
+"""Synthetic geodata for the benchmarks.
+
+Real maps are nothing like the tiny geometries created by the test factories:
+wetland inventories contain polygons with tens of thousands of vertices, hedge
+maps contain dense networks of lines, and catchment areas are stored as large
+raster tiles. Performance issues only show up with such data.
+
+All generators are seeded, so every benchmark run works on the same data.
+"""
+
+import json
+import math
+import random
+
+import fiona
+import numpy as np
+from django.contrib.gis.gdal import GDALRaster
+from django.contrib.gis.geos import (
+    LineString,
+    MultiLineString,
+    MultiPolygon,
+    Point,
+    Polygon,
+)
+from fiona import Feature, Geometry, Properties
+
+from envergo.geodata.constants import EPSG_LAMB93, EPSG_WGS84
+
+# All synthetic data is generated around this point, near Nantes
+CENTER = Point(-1.54394, 47.21381, srid=EPSG_WGS84)
+
+METERS_PER_DEGREE = 111_320
+
+# Catchment area rasters have 20x20m pixels
+CATCHMENT_PIXEL_SIZE = 20
+
+
+def offset(center, dx, dy):
+    """Return the (lng, lat) coordinates at (dx, dy) meters from the center."""
+
+    lng = center.x + dx / (METERS_PER_DEGREE * math.cos(math.radians(center.y)))
+    lat = center.y + dy / METERS_PER_DEGREE
+    return lng, lat
+
+
+def jagged_polygon(center, radius, nb_points, rng, roughness=0.2):
+    """A star-shaped polygon with a jagged outline, like a digitized wetland.
+
+    The vertices are sorted by angle, so the polygon is always valid.
+    """
+    coords = []
+    for i in range(nb_points):
+        angle = 2 * math.pi * i / nb_points
+        r = radius * (1 + rng.uniform(-roughness, roughness))
+        coords.append(offset(center, r * math.cos(angle), r * math.sin(angle)))
+    coords.append(coords[0])
+    return Polygon(coords, srid=EPSG_WGS84)
+
+
+def large_multipolygon(center, radius=1000, nb_polygons=4, nb_points=20000, seed=0):
+    """A multipolygon with `nb_polygons` polygons of `nb_points` vertices each.
+
+    The first polygon contains the center, the others surround it.
+    """
+    rng = random.Random(seed)
+    polygons = [jagged_polygon(center, radius, nb_points, rng)]
+    for i in range(1, nb_polygons):
+        angle = 2 * math.pi * i / nb_polygons
+        distance = 3 * radius
+        sub_center = Point(
+            *offset(center, distance * math.cos(angle), distance * math.sin(angle)),
+            srid=EPSG_WGS84,
+        )
+        polygons.append(jagged_polygon(sub_center, radius, nb_points, rng))
+    return MultiPolygon(polygons, srid=EPSG_WGS84)
+
+
+def wiggly_line(start, end, step, rng, jitter=5):
+    """A line from `start` to `end` (in meters), with a vertex every `step`m."""
+
+    (x0, y0), (x1, y1) = start, end
+    nb_steps = max(1, int(math.hypot(x1 - x0, y1 - y0) / step))
+    points = []
+    for i in range(nb_steps + 1):
+        t = i / nb_steps
+        points.append(
+            (
+                x0 + t * (x1 - x0) + rng.uniform(-jitter, jitter),
+                y0 + t * (y1 - y0) + rng.uniform(-jitter, jitter),
+            )
+        )
+    return points
+
+
+def hedge_network(center, size=5000, spacing=100, hedge_length=300, seed=0):
+    """A dense bocage: hedges along the borders of a grid of fields.
+
+    Returns a list of WGS84 multilinestrings, one per hedge.
+    """
+    rng = random.Random(seed)
+    half = size / 2
+    lines = []
+    position = -half
+    while position <= half:
+        start = -half
+        while start < half:
+            end = min(start + hedge_length, half)
+            for points in (
+                wiggly_line((start, position), (end, position), 25, rng),
+                wiggly_line((position, start), (position, end), 25, rng),
+            ):
+                coords = [offset(center, x, y) for x, y in points]
+                lines.append(MultiLineString([LineString(coords)], srid=EPSG_WGS84))
+            start = end
+        position += spacing
+    return lines
+
+
+def catchment_tile(center, size=500, seed=0):
+    """A Lambert 93 raster of catchment areas, centered on the given point."""
+
+    rng = np.random.default_rng(seed)
+    center_l93 = center.transform(EPSG_LAMB93, clone=True)
+    half = size * CATCHMENT_PIXEL_SIZE / 2
+    data = rng.integers(0, 500_000, size=(size, size), dtype=np.int32)
+    return GDALRaster(
+        {
+            "srid": EPSG_LAMB93,
+            "width": size,
+            "height": size,
+            "origin": [center_l93.x - half, center_l93.y + half],
+            "scale": [CATCHMENT_PIXEL_SIZE, -CATCHMENT_PIXEL_SIZE],
+            "datatype": 5,  # GDT_Int32
+            "bands": [{"data": data.tobytes(), "nodata_value": -1}],
+        }
+    )
+
+
+def write_map_file(path, geometries):
+    """Write the geometries to a GeoPackage file, as the admins would upload."""
+
+    geom_type = geometries[0].geom_type
+    schema = {"geometry": geom_type, "properties": {"id": "int"}}
+    with fiona.open(
+        path, "w", driver="GPKG", crs=f"EPSG:{EPSG_WGS84}", schema=schema
+    ) as dst:
+        for i, geometry in enumerate(geometries):
+            feature = Feature(
+                geometry=Geometry.from_dict(json.loads(geometry.geojson)),
+                properties=Properties.from_dict({"id": i}),
+            )
+            dst.write(feature)
+    return path
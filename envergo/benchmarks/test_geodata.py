@@ -0,0 +1,101 @@
+from django.contrib.gis.geos import Point
+
+from envergo.benchmarks.geodata import (
+    CENTER,
+    catchment_tile,
+    hedge_network,
+    large_multipolygon,
+    offset,
+    write_map_file,
+)
+from envergo.geodata.catchment import CatchmentAreaRasters
+from envergo.geodata.constants import EPSG_WGS84
+from envergo.geodata.models import MAP_TYPES, CatchmentAreaTile
+from envergo.geodata.tests.factories import MapFactory
+from envergo.geodata.utils import (
+    build_circles,
+    compute_hedge_densities_around_point,
+    get_catchment_area,
+    make_polygons_valid,
+    process_lines_file,
+    process_zones_file,
+    simplify_lines,
+    simplify_map,
+    trim_land,
+)
+
+
+def test_compute_hedge_densities_around_point(benchmark, land_map, bocage_map):
+    point = Point(*offset(CENTER, 120, 80), srid=EPSG_WGS84)
+
+    result = benchmark(compute_hedge_densities_around_point, point, [200, 5000])
+
+    assert result[5000]["artifacts"]["length"] > 0
+
+
+def test_trim_land(benchmark, land_map):
+    circles, _epsg = build_circles(CENTER, [5000])
+
+    result = benchmark(trim_land, circles[5000])
+
+    assert result is not None
+
+
+def test_import_zones_map(benchmark, tmp_path):
+    path = write_map_file(
+        tmp_path / "zones.gpkg",
+        [
+            large_multipolygon(CENTER, nb_polygons=1, nb_points=20000, seed=seed)
+            for seed in range(10)
+        ],
+    )
+    map = MapFactory(name="Imported zones", map_type=MAP_TYPES.zone_humide, zones=None)
+
+    def import_map():
+        map.zones.all().delete()
+        process_zones_file(map, str(path))
+        make_polygons_valid(map)
+        return simplify_map(map)
+
+    benchmark(import_map)
+
+    assert map.zones.count() == 10
+
+
+def test_import_lines_map(benchmark, tmp_path):
+    lines = hedge_network(CENTER, size=2000)
+    path = write_map_file(tmp_path / "lines.gpkg", lines)
+    map = MapFactory(name="Imported hedges", map_type=MAP_TYPES.haies, zones=None)
+
+    def import_map():
+        map.lines.all().delete()
+        process_lines_file(map, str(path))
+        return simplify_lines(map)
+
+    benchmark(import_map)
+
+    assert map.lines.count() == len(lines)
+
+
+def test_catchment_area_db(benchmark):
+    CatchmentAreaTile.objects.create(
+        filename="synthetic.tif", rast=catchment_tile(CENTER)
+    )
+    lng, lat = offset(CENTER, 120, 80)
+
+    area = benchmark(get_catchment_area, lng, lat)
+
+    assert area is not None
+
+
+def test_catchment_area_in_memory(benchmark, tmp_path, settings):
+    CatchmentAreaTile.objects.create(
+        filename="synthetic.tif", rast=catchment_tile(CENTER)
+    )
+    CatchmentAreaRasters.export(tmp_path)
+    settings.CATCHMENT_AREA_RASTERS_DIR = str(tmp_path)
+    lng, lat = offset(CENTER, 120, 80)
+
+    area = benchmark(get_catchment_area, lng, lat)
+
+    assert area is not None
@@ -0,0 +1,93 @@
+import random
+
+import pytest
+from django.contrib.gis.geos import MultiPolygon, Point
+
+from envergo.benchmarks.geodata import CENTER, jagged_polygon, offset
+from envergo.geodata.constants import EPSG_WGS84
+from envergo.geodata.models import MAP_TYPES, Zone
+from envergo.geodata.tests.factories import MapFactory
+from envergo.hedges.models import LEVELS_OF_CONCERN, HedgeData, Species
+from envergo.hedges.tests.factories import (
+    HedgeFactory,
+    SpeciesFactory,
+    SpeciesHabitatFactory,
+)
+from envergo.moulinette.tests.utils import make_hedge
+
+NB_SPECIES = 200
+
+
+@pytest.fixture
+def species_map():
+    """Species observation zones on a 500m grid, 200 species with habitats."""
+
+    rng = random.Random(4)
+    species = SpeciesFactory.create_batch(NB_SPECIES)
+    cd_refs = [s.cd_ref for s in species]
+
+    map = MapFactory(name="Synthetic species", map_type=MAP_TYPES.species, zones=None)
+    zones = []
+    for x in range(-2500, 2501, 500):
+        for y in range(-2500, 2501, 500):
+            center = Point(*offset(CENTER, x, y), srid=EPSG_WGS84)
+            polygon = jagged_polygon(center, 200, 500, rng)
+            zones.append(
+                Zone(
+                    map=map,
+                    geometry=MultiPolygon([polygon], srid=EPSG_WGS84),
+                    species_taxrefs=rng.sample(cd_refs, 40),
+                )
+            )
+    Zone.objects.bulk_create(zones)
+
+    levels = [level for level, _label in LEVELS_OF_CONCERN]
+    for s in species:
+        SpeciesHabitatFactory(species=s, map=map, level_of_concern=rng.choice(levels))
+    return map
+
+
+def test_ru_species_for_hedges(benchmark, species_map):
+    hedges = []
+    for i in range(50):
+        start = offset(CENTER, (i % 10) * 300 - 1500, (i // 10) * 300 - 750)
+        end = offset(CENTER, (i % 10) * 300 - 1400, (i // 10) * 300 - 700)
+        hedge = make_hedge(
+            coords=[(start[1], start[0]), (end[1], end[0])],
+            hedge_id=f"D{i}",
+            type_haie="mixte",
+        )
+        hedges.append(HedgeFactory(**hedge))
+
+    species = benchmark(lambda: list(Species.ru.for_hedges(hedges)))
+
+    assert species
+
+
+def test_hedge_lengths_by_category(benchmark):
+    rng = random.Random(5)
+    data = []
+    for i in range(300):
+        start = offset(CENTER, rng.uniform(-2500, 2500), rng.uniform(-2500, 2500))
+        start_point = Point(*start, srid=EPSG_WGS84)
+        coords = [start] + [
+            offset(start_point, rng.uniform(0, 300), rng.uniform(0, 300))
+            for _ in range(3)
+        ]
+        data.append(
+            make_hedge(
+                coords=[(lat, lng) for lng, lat in coords],
+                hedge_id=f"D{i}",
+                hedge_type=rng.choice(["TO_PLANT", "TO_REMOVE"]),
+                type_haie=rng.choice(["mixte", "alignement", "degradee"]),
+            )
+        )
+
+    def lengths():
+        hedges = HedgeData(data=data).hedges()
+        return [
+            getattr(hedges.to_remove(), category)().length
+            for category in ("ru", "l350_3", "hru")
+        ] + [hedges.to_remove().centroid]
+
+    assert benchmark(lengths)
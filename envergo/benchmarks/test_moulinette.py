@@ -0,0 +1,105 @@
+import pytest
+from django.contrib.gis.geos import Point
+
+from envergo.benchmarks.geodata import (
+    CENTER,
+    catchment_tile,
+    large_multipolygon,
+    offset,
+)
+from envergo.geodata.constants import EPSG_WGS84
+from envergo.geodata.models import MAP_TYPES, CatchmentAreaTile
+from envergo.geodata.tests.factories import MapFactory
+from envergo.moulinette.models import MoulinetteAmenagement, MoulinetteHaie
+from envergo.moulinette.tests.factories import (
+    ConfigAmenagementFactory,
+    DCConfigHaieFactory,
+)
+from envergo.moulinette.tests.utils import (
+    make_amenagement_data,
+    make_hedge,
+    make_moulinette_haie_data,
+    setup_conditionnalite_pac,
+    setup_ep,
+    setup_eval_env,
+    setup_loi_sur_leau,
+    setup_natura2000,
+    setup_regime_unique_haie,
+)
+
+
+@pytest.fixture
+def amenagement_setup(france_map, loire_atlantique_department):  # noqa
+    ConfigAmenagementFactory(department=loire_atlantique_department)
+    setup_loi_sur_leau(france_map)
+    setup_natura2000(france_map)
+    setup_eval_env(france_map)
+
+    # Large wetlands and flood zones around the project
+    MapFactory(
+        name="Synthetic wetlands",
+        map_type=MAP_TYPES.zone_humide,
+        zones__geometry=large_multipolygon(CENTER, radius=1000, seed=2),
+    )
+    flood_center = Point(*offset(CENTER, 1150, 0), srid=EPSG_WGS84)
+    MapFactory(
+        name="Synthetic flood zones",
+        map_type=MAP_TYPES.zone_inondable,
+        data_type="uncertain",
+        zones__geometry=large_multipolygon(flood_center, radius=1000, seed=3),
+    )
+    CatchmentAreaTile.objects.create(
+        filename="synthetic.tif", rast=catchment_tile(CENTER)
+    )
+
+
+@pytest.fixture
+def haie_setup(france_map, loire_atlantique_department, land_map, bocage_map):  # noqa
+    DCConfigHaieFactory(department=loire_atlantique_department)
+    setup_regime_unique_haie(france_map)
+    setup_conditionnalite_pac(france_map)
+    setup_ep(france_map)
+
+
+def make_hedges(nb_hedges=20, length=150):
+    """Hedges to remove, on a line crossing the center."""
+
+    hedges = []
+    for i in range(nb_hedges):
+        x = (i - nb_hedges / 2) * length
+        start = offset(CENTER, x, 10)
+        end = offset(CENTER, x + length * 0.9, 10)
+        hedges.append(
+            make_hedge(
+                coords=[(start[1], start[0]), (end[1], end[0])],
+                hedge_id=f"D{i}",
+                type_haie="mixte",
+            )
+        )
+    return hedges
+
+
+def test_moulinette_amenagement(benchmark, amenagement_setup):
+    data = make_amenagement_data(
+        lat=CENTER.y, lng=CENTER.x, created_surface=3000, final_surface=3000
+    )
+
+    moulinette = benchmark(MoulinetteAmenagement, data)
+
+    assert moulinette.is_evaluation_available()
+    assert moulinette.catalog["wetlands"]
+
+
+def test_moulinette_haie(benchmark, haie_setup):
+    data = make_moulinette_haie_data(hedge_data=make_hedges())
+    hedge_data = data["data"]["haies"]
+
+    def evaluate():
+        # Don't let the hedge density cache hide the density computation
+        hedge_data._density = None
+        return MoulinetteHaie(data)
+
+    moulinette = benchmark(evaluate)
+
+    assert moulinette.is_valid(), moulinette.form_errors
+    assert moulinette.is_evaluated()
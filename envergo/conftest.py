@@ -4,7 +4,10 @@ import pytest
 from django.contrib.sites.models import Site
 
 from envergo.contrib.sites.tests.factories import SiteFactory
+from envergo.geodata.geocoding import get_geocoding_cache
+from envergo.geodata.locator import invalidate_department_locator
 from envergo.geodata.tests.factories import DepartmentFactory
+from envergo.moulinette.registry import invalidate_registry
 from envergo.users.models import User
 from envergo.users.tests.factories import UserFactory
 
@@ -14,6 +17,24 @@ def media_storage(settings, tmpdir):
     settings.MEDIA_ROOT = tmpdir.strpath
 
 
+@pytest.fixture(autouse=True)
+def moulinette_registry():
+    """Rolled back test data never triggers the registry invalidation."""
+    invalidate_registry()
+
+
+@pytest.fixture(autouse=True)
+def department_locator():
+    """Rolled back departments never trigger the locator invalidation."""
+    invalidate_department_locator()
+
+
+@pytest.fixture(autouse=True)
+def clear_geocoding_cache():
+    """Geocoding answers must not leak from one test to another."""
+    get_geocoding_cache().backend.clear()
+
+
 @pytest.fixture
 def user() -> User:
     return UserFactory()
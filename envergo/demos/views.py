@@ -5,8 +5,8 @@ import numpy as np
 from django.contrib.gis.geos import Point
 from django.db import connection
 from django.views.generic import FormView
-from scipy.interpolate import griddata
 
+from envergo.geodata.catchment import interpolate_pixel_values, round_area
 from envergo.geodata.constants import EPSG_LAMB93, EPSG_WGS84
 from envergo.geodata.forms import LatLngForm
 from envergo.geodata.utils import (
@@ -276,12 +276,13 @@ class CatchmentArea(LatLngDemoMixin, FormView):
         if not pixels:
             return context
 
-        coords = [(x, y) for x, y, v in pixels]
-        values = [int(v) for x, y, v in pixels]
-        interpolated_area = griddata(coords, values, lamb93_coords, method="linear")[0]
+        values = [int(v) for x, y, v, sx, sy in pixels]
+        interpolated_area = interpolate_pixel_values(
+            lamb93_coords.x, lamb93_coords.y, pixels
+        )
         # If the interpolation fails because of missing data, we don't display anything
         # it should not happen so we don't bother display a real error message
-        if np.isnan(interpolated_area):
+        if interpolated_area is None:
             return context
 
         # We get the values as a 1D array, we want to display as a 2D grid
@@ -294,7 +295,7 @@ class CatchmentArea(LatLngDemoMixin, FormView):
             context["flat_values"] = values
 
         # The value we display is actually rounded to the nearest 500m²
-        catchment_area = int(interpolated_area)
+        catchment_area = round_area(interpolated_area)
         catchment_area_500 = round(catchment_area / 500) * 500
 
         # Compute values relevant to the moulinette result
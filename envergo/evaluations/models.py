@@ -321,10 +321,17 @@ class Evaluation(models.Model):
         return MoulinetteUrl(self.moulinette_url).params
 
     def get_moulinette(self):
-        """Return the moulinette instance for this evaluation."""
+        """Return the moulinette instance for this evaluation.
+
+        The moulinette is memoized, so the content, snapshot and email of a
+        published version are all derived from a single evaluation. The memo is
+        dropped when the moulinette url changes.
+        """
         from envergo.moulinette.models import MoulinetteAmenagement
 
-        if not hasattr(self, "_moulinette"):
+        if getattr(self, "_moulinette_key", None) != self.moulinette_url:
+            self.__dict__.pop("moulinette_params", None)
+            self._moulinette_key = self.moulinette_url
             data = self.moulinette_params
             moulinette_data = {"initial": data, "data": data}
             self._moulinette = (
@@ -354,7 +361,7 @@ class Evaluation(models.Model):
             all_criteria.extend(regulation.criteria.all())
 
         return any(
-            criterion._evaluator.eligible_to_self_declaration
+            criterion.get_evaluator().eligible_to_self_declaration
             for criterion in all_criteria
         )
 
@@ -364,14 +371,18 @@ class Evaluation(models.Model):
         self.versions.update(published=False)
 
     def create_version(self, author, message):
+        moulinette = self.get_moulinette()
         content = self.render_content()
         version = EvaluationVersion(
             evaluation=self, created_by=author, content=content, message=message
         )
 
         # create a result snapshot after each new version publication
+        # The snapshot is built from the moulinette that rendered the content
         transaction.on_commit(
-            lambda: EvaluationSnapshot.create_for_evaluation(evaluation=self)
+            lambda: EvaluationSnapshot.create_for_evaluation(
+                evaluation=self, moulinette=moulinette
+            )
         )
         return version
 
@@ -893,9 +904,14 @@ class EvaluationSnapshot(ResultSnapshotBase):
     )
 
     @classmethod
-    def create_for_evaluation(cls, evaluation):
-        """Create a snapshot for an Evaluation."""
-        moulinette = evaluation.get_moulinette()
+    def create_for_evaluation(cls, evaluation, moulinette=None):
+        """Create a snapshot for an Evaluation.
+
+        Pass the `moulinette` when it was already evaluated (e.g to render the
+        published version), to avoid running it again.
+        """
+        if moulinette is None:
+            moulinette = evaluation.get_moulinette()
         payload = moulinette.summary()
         return cls.objects.create(
             evaluation=evaluation,
@@ -7,6 +7,7 @@ from django.contrib.gis.geos import MultiPolygon
 from envergo.evaluations.models import Evaluation, EvaluationSnapshot
 from envergo.evaluations.tests.factories import EvaluationFactory
 from envergo.geodata.tests.factories import MapFactory, ZoneFactory, france_polygon
+from envergo.moulinette.models import MoulinetteAmenagement
 from envergo.moulinette.tests.factories import (
     ConfigAmenagementFactory,
     CriterionFactory,
@@ -150,6 +151,30 @@ class TestEvaluationSnapshot:
         assert snapshot is not None
         assert snapshot.moulinette_url == evaluation.moulinette_url
 
+    @pytest.mark.parametrize("footprint", [1200])
+    def test_publication_evaluates_moulinette_once(self, moulinette_url, user):
+        """The content and the snapshot of a version share a single moulinette."""
+        evaluation = EvaluationFactory(moulinette_url=moulinette_url)
+
+        with patch(
+            "envergo.moulinette.models.MoulinetteAmenagement.evaluate",
+            autospec=True,
+            side_effect=MoulinetteAmenagement.evaluate,
+        ) as mock_evaluate:
+            evaluation.create_version(user, "initial")
+
+        assert mock_evaluate.call_count == 1
+        assert EvaluationSnapshot.objects.filter(evaluation=evaluation).count() == 1
+
+    @pytest.mark.parametrize("footprint", [1200])
+    def test_moulinette_memo_follows_url(self, moulinette_url):
+        evaluation = EvaluationFactory(moulinette_url=moulinette_url)
+        moulinette = evaluation.get_moulinette()
+        assert evaluation.get_moulinette() is moulinette
+
+        evaluation.moulinette_url = moulinette_url.replace("1200", "50")
+        assert evaluation.get_moulinette() is not moulinette
+
     @pytest.mark.parametrize("footprint", [1200])
     def test_no_snapshot_when_no_version(self, moulinette_url):
         """No EvaluationSnapshot is created when no version have been published."""
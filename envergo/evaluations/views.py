@@ -26,8 +26,8 @@ from django.views.generic import (
 from django.views.generic.edit import BaseFormView
 
 from envergo.analytics.utils import (
-    is_request_from_a_bot,
     log_event,
+    log_unless_bot,
     update_url_with_matomo_params,
 )
 from envergo.decorators.csp import csp_report_only_update, csp_update
@@ -247,10 +247,12 @@ class EvaluationDetail(
             if tally:
                 messages.success(request, "Nous avons bien reçu votre réponse.")
 
-            if not is_request_from_a_bot(request):
-                self.log_moulinette_event(
+            log_unless_bot(
+                request,
+                lambda: self.log_moulinette_event(
                     self.moulinette, context, request_reference=self.object.reference
-                )
+                ),
+            )
 
         return res
 
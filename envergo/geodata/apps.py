@@ -5,3 +5,6 @@ from django.utils.translation import gettext_lazy as _
 class GeodataConfig(AppConfig):
     name = "envergo.geodata"
     verbose_name = _("Geo data")
+
+    def ready(self):
+        from . import signals  # noqa
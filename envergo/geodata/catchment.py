@@ -0,0 +1,332 @@
+"""In-memory catchment area lookups.
+
+Catchment areas are stored in the db as Lambert 93 raster tiles (see
+`CatchmentAreaTile`). Querying them with PostGIS means clipping the rasters
+and converting pixels to points for every simulation.
+
+Instead, the tiles can be exported once to numpy files, that are memory mapped
+by every process. Tiles are indexed by Lambert 93 coordinates, and values are
+bilinearly interpolated between the four pixels surrounding the point. A
+lookup doesn't need any db query.
+
+When the tiles were not exported (e.g in tests), `get_catchment_area` falls
+back to the db query. Both lookups locate the values at the pixel centers,
+and share the same interpolation and rounding, so they return the same areas.
+"""
+
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from pyproj import Transformer
+
+from envergo.geodata.constants import EPSG_LAMB93, EPSG_WGS84
+from envergo.geodata.models import CatchmentAreaTile
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILENAME = "index.json"
+
+# Tiles are indexed on a grid of this size, in meters
+INDEX_CELL_SIZE = 10_000
+
+_to_lamb93 = Transformer.from_crs(EPSG_WGS84, EPSG_LAMB93, always_xy=True)
+
+
+def get_pixel_weights(x, y, origin, scale):
+    """Return the four pixels around the coordinates, with their weights.
+
+    Pixel values are located at the pixel centers. Returns the pixel centers
+    coordinates, with the bilinear interpolation weights. Works with scalars
+    and numpy arrays.
+    """
+    (gx, gy), (sx, sy) = origin, scale
+
+    # Coordinates in pixels, relative to the pixel centers
+    fx = (x - gx) / sx - 0.5
+    fy = (y - gy) / sy - 0.5
+    cols = np.floor(fx)
+    rows = np.floor(fy)
+    tx = fx - cols
+    ty = fy - rows
+
+    return [
+        (
+            gx + (cols + dc + 0.5) * sx,
+            gy + (rows + dr + 0.5) * sy,
+            (tx if dc else 1 - tx) * (ty if dr else 1 - ty),
+        )
+        for dc, dr in ((0, 0), (1, 0), (0, 1), (1, 1))
+    ]
+
+
+def interpolate_pixel_values(x, y, pixels):
+    """Bilinear interpolation of the value at the Lambert 93 coordinates.
+
+    Pixels are given as (center x, center y, value, scale x, scale y) rows, as
+    returned by `get_catchment_area_pixel_values`. Missing pixels are ignored,
+    like nodata pixels in `CatchmentAreaRasters.interpolate`.
+    """
+    if not pixels:
+        return None
+
+    cx, cy, _value, sx, sy = pixels[0]
+    origin = (cx - sx / 2, cy - sy / 2)
+
+    def pixel_key(px, py):
+        return round((px - cx) / sx), round((py - cy) / sy)
+
+    values = {pixel_key(px, py): value for px, py, value, _sx, _sy in pixels}
+
+    total = 0.0
+    weights = 0.0
+    for px, py, weight in get_pixel_weights(x, y, origin, (sx, sy)):
+        value = values.get(pixel_key(px, py))
+        if value is not None:
+            total += weight * value
+            weights += weight
+    return total / weights if weights > 0 else None
+
+
+def round_area(area):
+    """Catchment areas are returned as integers, in m²."""
+    return None if area is None else int(round(area))
+
+
+class CatchmentTile:
+    """A single raster tile, with values memory mapped from a numpy file."""
+
+    def __init__(self, path, origin, scale, nodata):
+        self.values = np.load(path, mmap_mode="r")
+        self.height, self.width = self.values.shape
+        self.x0, self.y0 = origin
+        self.sx, self.sy = scale
+        self.nodata = nodata
+
+    @property
+    def bounds(self):
+        """Return the (xmin, ymin, xmax, ymax) extent of the tile."""
+        x1 = self.x0 + self.width * self.sx
+        y1 = self.y0 + self.height * self.sy
+        return min(self.x0, x1), min(self.y0, y1), max(self.x0, x1), max(self.y0, y1)
+
+    def sample(self, xs, ys):
+        """Return the pixel values at the given coordinates.
+
+        Also return the mask of the coordinates that are inside the tile.
+        Nodata pixels are returned as nan.
+        """
+        cols = np.floor((xs - self.x0) / self.sx).astype(np.int64)
+        rows = np.floor((ys - self.y0) / self.sy).astype(np.int64)
+        inside = (cols >= 0) & (cols < self.width) & (rows >= 0) & (rows < self.height)
+
+        values = self.values[rows[inside], cols[inside]].astype(np.float64)
+        if self.nodata is not None:
+            values[values == self.nodata] = np.nan
+        return values, inside
+
+
+class CatchmentAreaRasters:
+    """Catchment area tiles exported to a directory of numpy files."""
+
+    def __init__(self, directory):
+        directory = Path(directory)
+        index = json.loads((directory / INDEX_FILENAME).read_text())
+
+        self.tiles = [
+            CatchmentTile(
+                directory / tile["filename"],
+                tile["origin"],
+                tile["scale"],
+                tile["nodata"],
+            )
+            for tile in index["tiles"]
+        ]
+
+        # The pixel grid shared by all the tiles
+        self.grid_origin = index["grid"]["origin"]
+        self.grid_scale = index["grid"]["scale"]
+
+        self.index = defaultdict(list)
+        for tile in self.tiles:
+            xmin, ymin, xmax, ymax = tile.bounds
+            for x in range(
+                int(xmin // INDEX_CELL_SIZE), int(xmax // INDEX_CELL_SIZE) + 1
+            ):
+                for y in range(
+                    int(ymin // INDEX_CELL_SIZE), int(ymax // INDEX_CELL_SIZE) + 1
+                ):
+                    self.index[(x, y)].append(tile)
+
+    @classmethod
+    def export(cls, directory, tiles=None):
+        """Export the catchment area tiles from the db to the directory.
+
+        Files are versioned, so processes using the previous export can keep
+        reading them until they reload the index. Returns the number of
+        exported tiles.
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        if tiles is None:
+            tiles = CatchmentAreaTile.objects.only("id", "rast").iterator(chunk_size=1)
+
+        version = time.time_ns()
+        entries = []
+        for tile in tiles:
+            raster = tile.rast
+            band = raster.bands[0]
+            filename = f"{tile.id}-{version}.npy"
+            np.save(directory / filename, band.data())
+            entries.append(
+                {
+                    "filename": filename,
+                    "origin": [raster.origin.x, raster.origin.y],
+                    "scale": [raster.scale.x, raster.scale.y],
+                    "nodata": band.nodata_value,
+                }
+            )
+
+        grid = {
+            "origin": entries[0]["origin"] if entries else [0, 0],
+            "scale": entries[0]["scale"] if entries else [1, -1],
+        }
+        index_path = directory / INDEX_FILENAME
+        tmp_path = directory / f"{INDEX_FILENAME}.tmp"
+        tmp_path.write_text(json.dumps({"grid": grid, "tiles": entries}))
+        os.replace(tmp_path, index_path)
+
+        # Files that are mapped by other processes stay readable until they
+        # are unmapped
+        exported = {entry["filename"] for entry in entries}
+        for path in directory.glob("*.npy"):
+            if path.name not in exported:
+                path.unlink()
+
+        return len(entries)
+
+    def get_tiles(self, x, y):
+        """Return the tiles that may contain the Lambert 93 coordinates."""
+        return self.index.get(
+            (int(x // INDEX_CELL_SIZE), int(y // INDEX_CELL_SIZE)), []
+        )
+
+    def sample(self, xs, ys):
+        """Return the pixel values at the given Lambert 93 coordinates.
+
+        Returns nan for nodata pixels and coordinates outside of any tile.
+        """
+        values = np.full(len(xs), np.nan)
+        todo = np.ones(len(xs), dtype=bool)
+        cells_x = np.floor(xs / INDEX_CELL_SIZE).astype(np.int64)
+        cells_y = np.floor(ys / INDEX_CELL_SIZE).astype(np.int64)
+
+        for cell in set(zip(cells_x.tolist(), cells_y.tolist())):
+            in_cell = np.flatnonzero((cells_x == cell[0]) & (cells_y == cell[1]))
+            for tile in self.index.get(cell, []):
+                points = in_cell[todo[in_cell]]
+                if len(points) == 0:
+                    break
+                tile_values, inside = tile.sample(xs[points], ys[points])
+                values[points[inside]] = tile_values
+                todo[points[inside]] = False
+
+        return values
+
+    def sample_one(self, x, y):
+        """Return the pixel value at the Lambert 93 coordinates, or None."""
+        for tile in self.get_tiles(x, y):
+            col = math.floor((x - tile.x0) / tile.sx)
+            row = math.floor((y - tile.y0) / tile.sy)
+            if 0 <= col < tile.width and 0 <= row < tile.height:
+                value = tile.values[row, col]
+                return None if value == tile.nodata else float(value)
+        return None
+
+    def get_pixel_weights(self, x, y):
+        """Return the four pixels around the coordinates, with their weights."""
+        return get_pixel_weights(x, y, self.grid_origin, self.grid_scale)
+
+    def interpolate(self, xs, ys):
+        """Bilinear interpolation of the values at the Lambert 93 coordinates.
+
+        Nodata pixels are ignored, and the weights of the other pixels
+        adjusted accordingly.
+        """
+        pixels = self.get_pixel_weights(xs, ys)
+        values = self.sample(
+            np.concatenate([px for px, _py, _w in pixels]),
+            np.concatenate([py for _px, py, _w in pixels]),
+        ).reshape(4, -1)
+        weights = np.stack([w for _px, _py, w in pixels])
+
+        valid = ~np.isnan(values)
+        total = np.where(valid, values * weights, 0).sum(axis=0)
+        weights = np.where(valid, weights, 0).sum(axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(weights > 0, total / weights, np.nan)
+
+    def interpolate_one(self, x, y):
+        """Same as `interpolate`, for a single point, without numpy overhead."""
+        total = 0.0
+        weights = 0.0
+        for px, py, weight in self.get_pixel_weights(x, y):
+            value = self.sample_one(float(px), float(py))
+            if value is not None:
+                total += weight * value
+                weights += weight
+        return total / weights if weights > 0 else None
+
+    def get_catchment_areas(self, lngs, lats):
+        """Return the catchment areas at the WGS84 coordinates.
+
+        Missing values are returned as None.
+        """
+        xs, ys = _to_lamb93.transform(
+            np.asarray(lngs, dtype=np.float64), np.asarray(lats, dtype=np.float64)
+        )
+        areas = self.interpolate(np.atleast_1d(xs), np.atleast_1d(ys))
+        return [round_area(None if np.isnan(area) else area) for area in areas]
+
+    def get_catchment_area(self, lng, lat):
+        x, y = _to_lamb93.transform(float(lng), float(lat))
+        return round_area(self.interpolate_one(x, y))
+
+
+_rasters = None
+_rasters_mtime = None
+_rasters_lock = threading.Lock()
+
+
+def get_catchment_area_rasters():
+    """Return the exported catchment area tiles, or None if not exported.
+
+    The export is reloaded when the index file changes.
+    """
+    global _rasters, _rasters_mtime
+
+    directory = settings.CATCHMENT_AREA_RASTERS_DIR
+    if not directory:
+        return None
+
+    try:
+        mtime = os.stat(Path(directory) / INDEX_FILENAME).st_mtime
+    except FileNotFoundError:
+        return None
+
+    with _rasters_lock:
+        if mtime != _rasters_mtime:
+            try:
+                _rasters = CatchmentAreaRasters(directory)
+            except (OSError, ValueError, KeyError):
+                logger.exception("Cannot load the catchment area rasters")
+                _rasters = None
+            _rasters_mtime = mtime
+    return _rasters
@@ -0,0 +1,382 @@
+"""Precomputed hedge density grid.
+
+The 5 km hedge density clips and sums every hedge of the "haies" maps in a
+~78 km² circle, for every simulation.
+
+Instead, the hedge length and the land area of every cell of a fixed Lambert
+93 grid (100 m cells by default) can be computed once, from the "haies" and
+"density_reference" maps, and exported to numpy files that are memory mapped
+by every process. The density in a large circle is then the sum of the cells
+inside the circle, plus the cells crossed by the circle boundary:
+
+ - the boundary cells are counted in proportion of the part of the cell
+   inside the circle, which doesn't need any db query, as long as the error
+   bound of the estimated density is under `HEDGE_DENSITY_GRID_TOLERANCE`
+   (see `get_density_error_bound`);
+ - otherwise, the ring between the inner cells and the circle is clipped
+   exactly, like the whole circle would be (see `geodata.utils`).
+
+The grid only covers mainland France, and must be rebuilt when the reference
+maps are re-imported. When the grid was not built (e.g in tests), densities
+are computed from the maps. `get_density_mode` tells which computation is
+used, so results of different modes are not mixed up.
+"""
+
+import json
+import logging
+import math
+import os
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import shapely
+from django.conf import settings
+from django.db import connection
+from pyproj import Transformer
+
+from envergo.geodata.constants import EPSG_LAMB93, EPSG_WGS84
+from envergo.geodata.models import MAP_TYPES, ZONE_PARTS_SQL
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILENAME = "index.json"
+
+# Size of the grid cells, in meters
+DENSITY_CELL_SIZE = 100
+
+# Area of use of Lambert 93 (mainland France and Corsica), in meters
+LAMB93_BOUNDS = (99_000, 6_040_000, 1_243_000, 7_111_000)
+
+_to_lamb93 = Transformer.from_crs(EPSG_WGS84, EPSG_LAMB93, always_xy=True)
+_to_wgs84 = Transformer.from_crs(EPSG_LAMB93, EPSG_WGS84, always_xy=True)
+
+# Cells are built in Lambert 93 then transformed, so they match the boxes that
+# are summed by `HedgeDensityGrid.get_circle_cells`. Land is clipped from the
+# zone parts (see `ZonePart`), so each cell only touches a few small polygons.
+DENSITY_CELLS_SQL = f"""
+    WITH cells AS (
+        SELECT g.i, g.j, ST_Transform(g.geom, %(wgs84)s) AS geom
+        FROM ST_SquareGrid(
+            %(cell_size)s,
+            ST_MakeEnvelope(%(xmin)s, %(ymin)s, %(xmax)s, %(ymax)s, %(lamb93)s)
+        ) AS g
+    ),
+    land AS (
+        SELECT c.i, c.j, ST_Union(
+            ST_MakeValid(ST_Intersection(z.geometry::geometry, c.geom))
+        ) AS geom
+        FROM cells c
+        JOIN {ZONE_PARTS_SQL} z ON ST_Intersects(z.geometry, c.geom)
+        WHERE z.map_type = %(land_map_type)s
+        GROUP BY c.i, c.j
+    ),
+    lengths AS (
+        SELECT land.i, land.j, SUM(ST_LengthSpheroid(
+            ST_Intersection(l.geometry::geometry, land.geom), %(spheroid)s
+        )) AS length
+        FROM land
+        JOIN geodata_line l ON ST_Intersects(l.geometry, land.geom)
+        JOIN geodata_map m ON l.map_id = m.id
+        WHERE m.map_type = %(hedges_map_type)s
+        GROUP BY land.i, land.j
+    )
+    SELECT land.i, land.j, ST_Area(land.geom::geography), COALESCE(lengths.length, 0)
+    FROM land
+    LEFT JOIN lengths ON lengths.i = land.i AND lengths.j = land.j
+    WHERE NOT ST_IsEmpty(land.geom)
+"""
+
+LAND_EXTENT_SQL = """
+    SELECT ST_XMin(e), ST_YMin(e), ST_XMax(e), ST_YMax(e)
+    FROM (
+        SELECT ST_Extent(ST_Transform(z.geometry::geometry, %(lamb93)s)) AS e
+        FROM geodata_zone z
+        JOIN geodata_map m ON z.map_id = m.id
+        WHERE m.map_type = %(land_map_type)s
+    ) AS extent
+"""
+
+
+def get_land_extent(cell_size):
+    """Return the (i0, j0, i1, j1) range of cells covering the land maps."""
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            LAND_EXTENT_SQL,
+            {"lamb93": EPSG_LAMB93, "land_map_type": MAP_TYPES.density_reference},
+        )
+        extent = cursor.fetchone()
+
+    if extent[0] is None:
+        return None
+
+    xmin, ymin, xmax, ymax = (
+        max(extent[0], LAMB93_BOUNDS[0]),
+        max(extent[1], LAMB93_BOUNDS[1]),
+        min(extent[2], LAMB93_BOUNDS[2]),
+        min(extent[3], LAMB93_BOUNDS[3]),
+    )
+    return (
+        int(xmin // cell_size),
+        int(ymin // cell_size),
+        int(xmax // cell_size),
+        int(ymax // cell_size),
+    )
+
+
+def iter_density_cells(cell_size, extent, block_size):
+    """Compute the land area and hedge length of the cells, block by block.
+
+    Yields (i, j, area in m², length in m) tuples, for the cells with land.
+    """
+    # Prevent circular imports
+    from envergo.geodata.utils import WGS84_SPHEROID
+
+    i0, j0, i1, j1 = extent
+    for bi in range(i0, i1 + 1, block_size):
+        for bj in range(j0, j1 + 1, block_size):
+            params = {
+                "wgs84": EPSG_WGS84,
+                "lamb93": EPSG_LAMB93,
+                "cell_size": cell_size,
+                # Shrink the envelope a bit, so the cells of the next blocks
+                # are not included
+                "xmin": bi * cell_size + 1,
+                "ymin": bj * cell_size + 1,
+                "xmax": min(bi + block_size, i1 + 1) * cell_size - 1,
+                "ymax": min(bj + block_size, j1 + 1) * cell_size - 1,
+                "land_map_type": MAP_TYPES.density_reference,
+                "hedges_map_type": MAP_TYPES.haies,
+                "spheroid": WGS84_SPHEROID,
+            }
+            with connection.cursor() as cursor:
+                cursor.execute(DENSITY_CELLS_SQL, params)
+                yield from cursor.fetchall()
+
+
+class HedgeDensityGrid:
+    """Hedge lengths and land areas of a Lambert 93 grid, memory mapped."""
+
+    def __init__(self, directory):
+        directory = Path(directory)
+        index = json.loads((directory / INDEX_FILENAME).read_text())
+
+        self.version = index.get("version", index["lengths"])
+        self.cell_size = index["cell_size"]
+        self.i0, self.j0 = index["origin"]
+        self.lengths = np.load(directory / index["lengths"], mmap_mode="r")
+        self.areas = np.load(directory / index["areas"], mmap_mode="r")
+        self.height, self.width = self.lengths.shape
+
+    @classmethod
+    def export(cls, directory, cell_size=DENSITY_CELL_SIZE, cells=None, block_size=100):
+        """Compute the grid from the db, and export it to the directory.
+
+        `cells` is an optional list of (i, j, area, length) tuples, otherwise
+        they are computed from the maps. Files are versioned, so processes
+        using the previous export can keep reading them until they reload the
+        index. Returns the number of cells with land.
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        if cells is None:
+            extent = get_land_extent(cell_size)
+            cells = iter_density_cells(cell_size, extent, block_size) if extent else []
+        else:
+            cells = list(cells)
+            extent = (
+                (
+                    min(cell[0] for cell in cells),
+                    min(cell[1] for cell in cells),
+                    max(cell[0] for cell in cells),
+                    max(cell[1] for cell in cells),
+                )
+                if cells
+                else (0, 0, 0, 0)
+            )
+
+        i0, j0, i1, j1 = extent or (0, 0, 0, 0)
+        shape = (j1 - j0 + 1, i1 - i0 + 1)
+        version = time.time_ns()
+        lengths_filename = f"lengths-{version}.npy"
+        areas_filename = f"areas-{version}.npy"
+
+        # Written in place, the whole grid doesn't need to fit in memory
+        lengths = np.lib.format.open_memmap(
+            directory / lengths_filename, mode="w+", dtype=np.float32, shape=shape
+        )
+        areas = np.lib.format.open_memmap(
+            directory / areas_filename, mode="w+", dtype=np.float32, shape=shape
+        )
+        nb_cells = 0
+        for i, j, area, length in cells:
+            areas[j - j0, i - i0] = area
+            lengths[j - j0, i - i0] = length
+            nb_cells += 1
+        lengths.flush()
+        areas.flush()
+        del lengths, areas
+
+        index = {
+            "version": version,
+            "cell_size": cell_size,
+            "origin": [i0, j0],
+            "lengths": lengths_filename,
+            "areas": areas_filename,
+        }
+        index_path = directory / INDEX_FILENAME
+        tmp_path = directory / f"{INDEX_FILENAME}.tmp"
+        tmp_path.write_text(json.dumps(index))
+        os.replace(tmp_path, index_path)
+
+        # Files that are mapped by other processes stay readable until they
+        # are unmapped
+        exported = {lengths_filename, areas_filename}
+        for path in directory.glob("*.npy"):
+            if path.name not in exported:
+                path.unlink()
+
+        return nb_cells
+
+    def get_circle_cells(self, circle):
+        """Sum the cells inside the given WGS84 polygon.
+
+        Returns a dict with:
+         - `length` and `area`: the sums of the cells inside the polygon
+         - `boundary_length` and `boundary_area`: the sums of the cells crossed
+           by the polygon boundary, weighted by the part of the cell inside
+         - `boundary_cells_length` and `boundary_cells_area`: the sums of the
+           whole cells crossed by the polygon boundary
+         - `inner_cells`: the union of the cells inside, as a WGS84 polygon
+
+        Returns None if the polygon is not entirely covered by the grid.
+        """
+        size = self.cell_size
+        shape = shapely.from_wkb(bytes(circle.wkb))
+        shape = shapely.transform(shape, _to_lamb93_coords)
+        xmin, ymin, xmax, ymax = shape.bounds
+
+        i_min, i_max = int(xmin // size), int(xmax // size)
+        j_min, j_max = int(ymin // size), int(ymax // size)
+        if (
+            i_min < self.i0
+            or j_min < self.j0
+            or i_max >= self.i0 + self.width
+            or j_max >= self.j0 + self.height
+        ):
+            return None
+
+        ii, jj = np.meshgrid(
+            np.arange(i_min, i_max + 1), np.arange(j_min, j_max + 1), indexing="xy"
+        )
+        ii, jj = ii.ravel(), jj.ravel()
+        boxes = shapely.box(ii * size, jj * size, (ii + 1) * size, (jj + 1) * size)
+
+        shapely.prepare(shape)
+        inside = shapely.contains(shape, boxes)
+        crossing = shapely.intersects(shape, boxes) & ~inside
+
+        lengths = self.lengths[jj - self.j0, ii - self.i0].astype(np.float64)
+        areas = self.areas[jj - self.j0, ii - self.i0].astype(np.float64)
+        fractions = shapely.area(shapely.intersection(boxes[crossing], shape)) / (
+            size * size
+        )
+
+        inner_cells = shapely.union_all(boxes[inside])
+        return {
+            "length": float(lengths[inside].sum()),
+            "area": float(areas[inside].sum()),
+            "boundary_length": float((lengths[crossing] * fractions).sum()),
+            "boundary_area": float((areas[crossing] * fractions).sum()),
+            "boundary_cells_length": float(lengths[crossing].sum()),
+            "boundary_cells_area": float(areas[crossing].sum()),
+            "inner_cells": shapely.transform(inner_cells, _to_wgs84_coords),
+        }
+
+
+def get_density_error_bound(cells):
+    """Return the maximum relative error of the density estimated from the cells.
+
+    The hedges and land of a boundary cell can be anywhere in the cell, so
+    the actual density is somewhere between the density with the whole land
+    of the boundary cells but none of their hedges, and the density with all
+    their hedges but none of their land.
+
+    Returns inf when the density cannot be bounded (e.g no inner land).
+    """
+    if cells["boundary_cells_length"] == 0 and cells["boundary_cells_area"] == 0:
+        # The boundary cells are off land, the estimation is exact
+        return 0.0
+
+    length = cells["length"] + cells["boundary_length"]
+    area = cells["area"] + cells["boundary_area"]
+    if cells["area"] <= 0 or length <= 0:
+        return math.inf
+
+    density = length / area
+    min_density = cells["length"] / (cells["area"] + cells["boundary_cells_area"])
+    max_density = (cells["length"] + cells["boundary_cells_length"]) / cells["area"]
+    return max(max_density - density, density - min_density) / density
+
+
+def get_density_mode(radii):
+    """Return a token identifying how the densities at the given radii are computed.
+
+    Densities estimated from the grid may differ slightly from the exact ones,
+    and from the ones of another grid export, so the token is part of the
+    density cache keys (see `hedges.density`).
+    """
+    if max(radii) < settings.HEDGE_DENSITY_GRID_MIN_RADIUS:
+        return "exact"
+
+    grid = get_hedge_density_grid()
+    if grid is None:
+        return "exact"
+
+    return (
+        f"grid:{grid.version}:{settings.HEDGE_DENSITY_GRID_MIN_RADIUS}:"
+        f"{settings.HEDGE_DENSITY_GRID_TOLERANCE}"
+    )
+
+
+def _to_lamb93_coords(coords):
+    return np.column_stack(_to_lamb93.transform(coords[:, 0], coords[:, 1]))
+
+
+def _to_wgs84_coords(coords):
+    return np.column_stack(_to_wgs84.transform(coords[:, 0], coords[:, 1]))
+
+
+_grid = None
+_grid_mtime = None
+_grid_lock = threading.Lock()
+
+
+def get_hedge_density_grid():
+    """Return the exported hedge density grid, or None if not exported.
+
+    The grid is reloaded when the index file changes.
+    """
+    global _grid, _grid_mtime
+
+    directory = settings.HEDGE_DENSITY_GRID_DIR
+    if not directory:
+        return None
+
+    try:
+        mtime = os.stat(Path(directory) / INDEX_FILENAME).st_mtime
+    except FileNotFoundError:
+        return None
+
+    with _grid_lock:
+        if mtime != _grid_mtime:
+            try:
+                _grid = HedgeDensityGrid(directory)
+            except (OSError, ValueError, KeyError):
+                logger.exception("Cannot load the hedge density grid")
+                _grid = None
+            _grid_mtime = mtime
+    return _grid
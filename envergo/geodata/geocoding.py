@@ -0,0 +1,210 @@
+"""Cache of the reverse geocoding api calls.
+
+Finding the address or the commune of a simulation means calling external
+apis (IGN geocodage, geo.api.gouv.fr) on the request path. Those calls are
+slow, and sometimes time out. But the answer for a given location almost
+never changes, and the same sites are simulated over and over.
+
+So answers are cached, keyed by rounded coordinates:
+ - fresh answers are served from the cache for `GEOCODING_CACHE_TTL` seconds;
+ - then, for `GEOCODING_CACHE_STALE_TTL` more seconds, the stale answer is
+   still served right away, while a fresh one is fetched in the background;
+ - failed calls (timeouts, errors) are cached as well, but only for
+   `GEOCODING_CACHE_ERROR_TTL` seconds, so an unavailable api is not called
+   on every request.
+
+The storage is pluggable (see `GEOCODING_CACHE_BACKEND`): the django cache by
+default, a db table when the cache is too small to keep the answers, or a
+simple dict in tests. Expired rows of the db table are deleted every day by
+the `purge_geocoding_cache` command.
+
+Coordinates are rounded to `COORDS_PRECISION` decimals before the api calls,
+not only in the cache keys, so the cached answer is the one of the rounded
+location, up to ~10m away from the simulated one.
+"""
+
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# 4 decimals is roughly 10m, below the precision of a geocoded address
+COORDS_PRECISION = 4
+
+
+class GeocodingError(Exception):
+    """The geocoding api could not be reached or returned an error."""
+
+
+def round_coords(lng, lat):
+    return (
+        round(float(lng), COORDS_PRECISION),
+        round(float(lat), COORDS_PRECISION),
+    )
+
+
+class DjangoCacheBackend:
+    """Store the answers in the django cache."""
+
+    def __init__(self, alias="default"):
+        self.cache = caches[alias]
+
+    def get(self, key):
+        return self.cache.get(f"geocoding:{key}")
+
+    def set(self, key, entry, timeout):
+        self.cache.set(f"geocoding:{key}", entry, timeout)
+
+
+class DatabaseBackend:
+    """Store the answers in the `GeocodingCacheEntry` table."""
+
+    def get(self, key):
+        from envergo.geodata.models import GeocodingCacheEntry
+
+        row = (
+            GeocodingCacheEntry.objects.filter(key=key, expires_at__gt=timezone.now())
+            .values("entry")
+            .first()
+        )
+        return row["entry"] if row else None
+
+    def set(self, key, entry, timeout):
+        from envergo.geodata.models import GeocodingCacheEntry
+
+        GeocodingCacheEntry.objects.update_or_create(
+            key=key,
+            defaults={
+                "entry": entry,
+                "expires_at": timezone.now() + timedelta(seconds=timeout),
+            },
+        )
+
+    def purge(self):
+        """Delete the expired answers, return the number of deleted rows."""
+        from envergo.geodata.models import GeocodingCacheEntry
+
+        deleted, _ = GeocodingCacheEntry.objects.filter(
+            expires_at__lte=timezone.now()
+        ).delete()
+        return deleted
+
+
+class MemoryBackend:
+    """Store the answers in a dict, e.g for tests."""
+
+    def __init__(self):
+        self.entries = {}
+
+    def get(self, key):
+        entry, expires_at = self.entries.get(key, (None, 0))
+        return entry if expires_at > time.time() else None
+
+    def set(self, key, entry, timeout):
+        self.entries[key] = (entry, time.time() + timeout)
+
+    def clear(self):
+        self.entries = {}
+
+
+def run_in_thread(func):
+    def run():
+        try:
+            func()
+        finally:
+            connections.close_all()
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+class GeocodingCache:
+    """Serve geocoding answers from the cache, or fetch them."""
+
+    def __init__(self, backend, run_in_background=run_in_thread):
+        self.backend = backend
+        self.run_in_background = run_in_background
+        self.refreshing = set()
+        self.lock = threading.Lock()
+
+    @property
+    def ttl(self):
+        return settings.GEOCODING_CACHE_TTL
+
+    @property
+    def stale_ttl(self):
+        return settings.GEOCODING_CACHE_STALE_TTL
+
+    @property
+    def error_ttl(self):
+        return settings.GEOCODING_CACHE_ERROR_TTL
+
+    def get_or_fetch(self, key, fetch):
+        """Return the answer for the key, calling `fetch` when needed.
+
+        `fetch` must raise `GeocodingError` when the api call fails. In this
+        case, None is returned.
+        """
+        try:
+            entry = self.backend.get(key)
+        except Exception:
+            logger.warning("Cannot read the geocoding cache", exc_info=True)
+            entry = None
+
+        if entry is None:
+            entry = self.fetch(key, fetch)
+        elif time.time() - entry["fetched_at"] > self.ttl and not entry["error"]:
+            self.refresh(key, fetch)
+
+        return None if entry["error"] else entry["data"]
+
+    def fetch(self, key, fetch):
+        try:
+            entry = {"data": fetch(), "error": False, "fetched_at": time.time()}
+            timeout = self.ttl + self.stale_ttl
+        except GeocodingError:
+            entry = {"data": None, "error": True, "fetched_at": time.time()}
+            timeout = self.error_ttl
+
+        try:
+            self.backend.set(key, entry, timeout)
+        except Exception:
+            logger.warning("Cannot write the geocoding cache", exc_info=True)
+        return entry
+
+    def refresh(self, key, fetch):
+        """Fetch a fresh answer in the background, unless already in progress."""
+
+        with self.lock:
+            if key in self.refreshing:
+                return
+            self.refreshing.add(key)
+
+        def run():
+            try:
+                self.fetch(key, fetch)
+            finally:
+                with self.lock:
+                    self.refreshing.discard(key)
+
+        self.run_in_background(run)
+
+
+_geocoding_cache = None
+
+
+def get_geocoding_cache():
+    """Return the geocoding cache, with the configured backend."""
+    global _geocoding_cache
+
+    if _geocoding_cache is None:
+        backend_class = import_string(settings.GEOCODING_CACHE_BACKEND)
+        _geocoding_cache = GeocodingCache(backend_class())
+    return _geocoding_cache
@@ -0,0 +1,183 @@
+"""In-process department locator.
+
+Finding the department of a simulation, or the departments crossed by hedges,
+means testing points and lines against the full resolution department
+geometries, which are huge. Those geometries only change when the
+departments are imported again (see the `import_departments` command).
+
+So each process loads the departments once, subdivided in small polygons,
+into a shapely STRtree. Locating a point or measuring lines is then done in
+memory.
+
+Just like the moulinette registry, the locator is versioned with tokens
+stored in the shared django cache:
+
+ - the geometries token is renewed when departments are imported, created,
+   deleted, or when their geometry is edited. The STRtree is then rebuilt.
+   Processes that already have a locator keep using it while the new one is
+   built in the background, so the rebuild is not on the request path. The
+   process that made the change rebuilds it right away, to see its changes;
+ - the departments token is renewed when any other department field is
+   edited. Only the department objects are reloaded.
+"""
+
+import copy
+import logging
+import threading
+import uuid
+from collections import defaultdict
+
+import shapely
+from django.core.cache import cache
+from django.db import connection
+from pyproj import Geod
+
+from envergo.geodata.models import Department
+
+logger = logging.getLogger(__name__)
+
+GEOMETRIES_VERSION_KEY = "geodata:department_locator:geometries_version"
+DEPARTMENTS_VERSION_KEY = "geodata:department_locator:departments_version"
+
+# Maximum number of vertices of the department parts
+SUBDIVIDE_MAX_VERTICES = 256
+
+_locator = None
+_lock = threading.Lock()
+_rebuild_thread = None
+
+_geod = Geod(ellps="WGS84")
+
+
+def get_locator_versions():
+    """Return the (geometries, departments) versions of the locator."""
+
+    keys = (GEOMETRIES_VERSION_KEY, DEPARTMENTS_VERSION_KEY)
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            versions[key] = cache.get_or_set(key, uuid.uuid4().hex, timeout=None)
+    return versions[GEOMETRIES_VERSION_KEY], versions[DEPARTMENTS_VERSION_KEY]
+
+
+def invalidate_department_locator(geometries=True):
+    """Make every process reload the departments.
+
+    When `geometries` is False, only the department objects are reloaded, and
+    the geometries index is kept.
+    """
+    global _locator
+
+    cache.set(DEPARTMENTS_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+    if geometries:
+        cache.set(GEOMETRIES_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+        _locator = None
+
+
+def get_department_locator():
+    """Return the locator matching the current departments version."""
+    global _locator
+
+    version, departments_version = get_locator_versions()
+    locator = _locator
+    if locator is None:
+        with _lock:
+            if _locator is None:
+                _locator = DepartmentLocator(version, departments_version)
+            locator = _locator
+    elif locator.version != version:
+        # The current locator is used until the new one is built
+        rebuild_department_locator(version, departments_version)
+    elif locator.departments_version != departments_version:
+        locator.load_departments(departments_version)
+    return locator
+
+
+def rebuild_department_locator(version, departments_version):
+    """Build the locator of the given version in a background thread."""
+    global _rebuild_thread
+
+    def rebuild():
+        global _locator
+
+        try:
+            locator = DepartmentLocator(version, departments_version)
+            with _lock:
+                # The process may have invalidated the locator in between
+                if _locator is not None:
+                    _locator = locator
+        except Exception:
+            logger.exception("Cannot rebuild the department locator")
+        finally:
+            connection.close()
+
+    with _lock:
+        if _rebuild_thread is not None and _rebuild_thread.is_alive():
+            return
+        _rebuild_thread = threading.Thread(
+            target=rebuild, name="department-locator", daemon=True
+        )
+        _rebuild_thread.start()
+
+
+class DepartmentLocator:
+    """The departments geometries, indexed in memory."""
+
+    def __init__(self, version, departments_version):
+        self.version = version
+        self.load_departments(departments_version)
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT id, ST_AsBinary(ST_Subdivide(geometry, %s))
+                FROM geodata_department
+                WHERE geometry IS NOT NULL
+                """,
+                [SUBDIVIDE_MAX_VERTICES],
+            )
+            rows = cursor.fetchall()
+
+        self.department_ids = [department_id for department_id, _wkb in rows]
+        self.parts = shapely.from_wkb([bytes(wkb) for _id, wkb in rows])
+        shapely.prepare(self.parts)
+        self.tree = shapely.STRtree(self.parts)
+
+    def load_departments(self, departments_version):
+        self.departments = Department.objects.defer("geometry").in_bulk()
+        self.departments_version = departments_version
+
+    def locate(self, lng, lat):
+        """Return the department containing the point, or None."""
+
+        point = shapely.Point(float(lng), float(lat))
+        # Points on the border between two parts of a department are covered
+        # by both, but contained by none
+        for index in self.tree.query(point, predicate="covered_by"):
+            return self.get_department(self.department_ids[index])
+        return None
+
+    def get_department(self, department_id):
+        # Department objects are shared between simulations
+        return copy.copy(self.departments[department_id])
+
+    def get_lengths(self, lines):
+        """Return the list of (Department, length) crossed by the lines.
+
+        `lines` is a shapely geometry, in WGS84. Lengths are geodesic, in
+        meters. The list is ordered by decreasing length.
+        """
+        lengths = defaultdict(float)
+        for index in self.tree.query(lines, predicate="intersects"):
+            department_id = self.department_ids[index]
+            clipped = shapely.intersection(lines, self.parts[index])
+            lengths[department_id] += _geod.geometry_length(clipped)
+
+        return sorted(
+            (
+                (self.get_department(department_id), length)
+                for department_id, length in lengths.items()
+            ),
+            key=lambda item: item[1],
+            reverse=True,
+        )
@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from envergo.geodata.density_grid import DENSITY_CELL_SIZE, HedgeDensityGrid
+
+
+class Command(BaseCommand):
+    """Build the hedge density grid from the "haies" and "density_reference" maps.
+
+    The export is local to the server, so this must be run on every server
+    after those maps are imported.
+    """
+
+    help = "Calcule la grille des densités de haies pour les calculs approchés."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dir",
+            default=settings.HEDGE_DENSITY_GRID_DIR,
+            help="Répertoire d'export (HEDGE_DENSITY_GRID_DIR par défaut)",
+        )
+        parser.add_argument(
+            "--cell-size",
+            type=int,
+            default=DENSITY_CELL_SIZE,
+            help="Taille des cellules, en mètres",
+        )
+        parser.add_argument(
+            "--block-size",
+            type=int,
+            default=100,
+            help="Nombre de cellules (en largeur) calculées par requête",
+        )
+
+    def handle(self, *args, **options):
+        directory = options["dir"]
+        if not directory:
+            raise CommandError("Aucun répertoire d'export n'est configuré.")
+
+        nb_cells = HedgeDensityGrid.export(
+            directory,
+            cell_size=options["cell_size"],
+            block_size=options["block_size"],
+        )
+        self.stdout.write(f"{nb_cells} cellules exportées dans {directory}")
@@ -100,6 +100,9 @@ logger = getLogger(__name__)
 # assert_table_safe() before any string interpolation.
 ALLOWED_DETAIL_TABLES = ("geodata_zone", "geodata_line")
 
+# Tables derived from the zones, that are rebuilt on prod instead of copied
+DERIVED_TABLES = ("geodata_gridcell", "geodata_zonepart")
+
 
 class DbIdentity(NamedTuple):
     """Server-side identity of a Postgres connection.
@@ -706,6 +709,11 @@ class Command(BaseCommand):
         self.stdout.write(
             self.style.SUCCESS(f"Done. {table} rows copied up to id {last_id}.")
         )
+        if table == "geodata_zone":
+            self.stdout.write(
+                "Run `index_map_grid` and `subdivide_map_zones` on production "
+                f"to rebuild the zones indexes of maps {map_ids}."
+            )
 
     def print_warning_banner(self, plan):
         """Print a hard-to-miss warning describing exactly what will happen."""
@@ -816,6 +824,17 @@ class Command(BaseCommand):
             ">>> Phase 1: cleaning up previous import and transferring Maps " "(atomic)"
         )
         with prod.cursor() as prod_cur:
+            # The grid cells and zone parts are not copied, they reference the
+            # zones and are rebuilt on prod (see `index_map_grid` and
+            # `subdivide_map_zones`)
+            for derived_table in DERIVED_TABLES:
+                prod_cur.execute(
+                    f"DELETE FROM {derived_table} WHERE map_id IN ("
+                    f"  SELECT id FROM geodata_map "
+                    f"  WHERE id = ANY(%s) AND map_type = %s"
+                    f")",
+                    [map_ids, map_type],
+                )
             prod_cur.execute(
                 f"DELETE FROM {table} WHERE map_id IN ("
                 f"  SELECT id FROM geodata_map "
@@ -845,6 +864,13 @@ class Command(BaseCommand):
                     ) as copy_out:
                         for chunk in copy_out:
                             copy_in.write(chunk)
+        with prod.cursor() as prod_cur:
+            prod_cur.execute(
+                "UPDATE geodata_map "
+                "SET grid_indexed = false, zones_subdivided = false "
+                "WHERE id = ANY(%s) AND map_type = %s",
+                [map_ids, map_type],
+            )
         prod.commit()
         self.stdout.write(f"  Phase 1 done: {len(map_ids)} maps replaced atomically.")
 
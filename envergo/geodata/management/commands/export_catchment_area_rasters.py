@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from envergo.geodata.catchment import CatchmentAreaRasters
+
+
+class Command(BaseCommand):
+    """Export the catchment area tiles for in-memory lookups.
+
+    The export is local to the server, so this must be run on every server
+    after the rasters are imported.
+    """
+
+    help = "Exporte les rasters des bassins versants pour les lire en mémoire."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dir",
+            default=settings.CATCHMENT_AREA_RASTERS_DIR,
+            help="Répertoire d'export (CATCHMENT_AREA_RASTERS_DIR par défaut)",
+        )
+
+    def handle(self, *args, **options):
+        directory = options["dir"]
+        if not directory:
+            raise CommandError("Aucun répertoire d'export n'est configuré.")
+
+        nb_tiles = CatchmentAreaRasters.export(directory)
+        self.stdout.write(f"{nb_tiles} tuiles exportées dans {directory}")
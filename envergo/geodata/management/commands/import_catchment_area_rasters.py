@@ -2,7 +2,9 @@ import os
 from argparse import ArgumentTypeError
 from pathlib import Path
 
+from django.conf import settings
 from django.contrib.gis.gdal import GDALRaster
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
 
 from envergo.geodata.models import CatchmentAreaTile
@@ -35,6 +37,9 @@ class Command(BaseCommand):
             self.stdout.write(f"Importing {tif_file}")
             self.import_file(tif_file)
 
+        if settings.CATCHMENT_AREA_RASTERS_DIR:
+            call_command("export_catchment_area_rasters", stdout=self.stdout)
+
     def import_file(self, file):
         raster = GDALRaster(file, write=True)
         tile = CatchmentAreaTile(filename=file.name, rast=raster)
@@ -1,6 +1,7 @@
 from django.contrib.gis.utils import LayerMapping
 from django.core.management.base import BaseCommand
 
+from envergo.geodata.locator import invalidate_department_locator
 from envergo.geodata.models import Department
 
 
@@ -34,3 +35,6 @@ class Command(BaseCommand):
         Department.objects.update(geometry=None)
         lm = LayerMapping(Department, shapefile, mapping, unique="department")
         lm.save(strict=True, verbose=True)
+
+        # The bulk update above doesn't send any signal
+        invalidate_department_locator()
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from envergo.geodata.models import Map
+from envergo.geodata.utils import index_map_grid
+
+
+class Command(BaseCommand):
+    help = "Référence les zones des cartes existantes dans la grille."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "map_ids", nargs="*", type=int, help="Cartes à indexer (toutes par défaut)"
+        )
+
+    def handle(self, *args, **options):
+        maps = Map.objects.filter(zones__isnull=False).distinct().order_by("id")
+        if options["map_ids"]:
+            maps = maps.filter(id__in=options["map_ids"])
+
+        for map in maps:
+            with transaction.atomic():
+                index_map_grid(map)
+                map.save(update_fields=["grid_indexed"])
+            status = "indexée" if map.grid_indexed else "non indexée"
+            self.stdout.write(f"Carte {map.id} ({map}) : {status}")
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from envergo.geodata.geocoding import DatabaseBackend
+
+
+class Command(BaseCommand):
+    help = "Delete the expired answers of the geocoding cache db table."
+
+    def handle(self, *args, **options):
+        deleted = DatabaseBackend().purge()
+        self.stdout.write(f"Deleted {deleted} expired geocoding answers")
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from envergo.geodata.models import Map
+from envergo.geodata.utils import subdivide_map_zones
+
+
+class Command(BaseCommand):
+    help = "Découpe les zones des cartes existantes en petits morceaux."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "map_ids", nargs="*", type=int, help="Cartes à découper (toutes par défaut)"
+        )
+
+    def handle(self, *args, **options):
+        maps = Map.objects.filter(zones__isnull=False).distinct().order_by("id")
+        if options["map_ids"]:
+            maps = maps.filter(id__in=options["map_ids"])
+
+        for map in maps:
+            with transaction.atomic():
+                subdivide_map_zones(map)
+                map.save(update_fields=["zones_subdivided"])
+            nb_parts = map.zone_parts.count()
+            self.stdout.write(f"Carte {map.id} ({map}) : {nb_parts} morceaux")
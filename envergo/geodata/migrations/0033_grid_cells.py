@@ -0,0 +1,63 @@
+# Generated by Django 4.2.28 on 2026-10-17 01:09
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("geodata", "0032_alter_map_map_type"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="map",
+            name="grid_indexed",
+            field=models.BooleanField(
+                default=False,
+                help_text="Les zones de la carte sont référencées dans la grille (`GridCell`)",
+                verbose_name="Indexée dans la grille",
+            ),
+        ),
+        migrations.CreateModel(
+            name="GridCell",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("x", models.IntegerField()),
+                ("y", models.IntegerField()),
+                ("is_full", models.BooleanField()),
+                (
+                    "map",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="grid_cells",
+                        to="geodata.map",
+                    ),
+                ),
+                (
+                    "zone",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="grid_cells",
+                        to="geodata.zone",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Cellule de grille",
+                "verbose_name_plural": "Cellules de grille",
+                "indexes": [
+                    models.Index(fields=["x", "y"], name="geodata_gri_x_71dbc4_idx")
+                ],
+            },
+        ),
+    ]
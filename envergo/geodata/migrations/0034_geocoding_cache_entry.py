@@ -0,0 +1,37 @@
+# Generated by Django 4.2.28 on 2026-10-17 01:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("geodata", "0033_grid_cells"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GeocodingCacheEntry",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "key",
+                    models.CharField(max_length=256, unique=True, verbose_name="Key"),
+                ),
+                ("entry", models.JSONField(verbose_name="Entry")),
+                ("expires_at", models.DateTimeField(verbose_name="Expires at")),
+            ],
+            options={
+                "verbose_name": "Geocoding cache entry",
+                "verbose_name_plural": "Geocoding cache entries",
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.28 on 2026-10-17 01:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("geodata", "0034_geocoding_cache_entry"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="map",
+            name="map_type",
+            field=models.CharField(
+                blank=True,
+                choices=[
+                    ("zone_humide", "Zone humide"),
+                    ("zone_inondable", "Zone inondable"),
+                    ("species", "Espèces protégées"),
+                    ("species_legacy", "Espèces protégées (historique)"),
+                    ("haies", "Haies"),
+                    (
+                        "density_reference",
+                        "Surface de référence du calcul de densité bocagère",
+                    ),
+                    ("zonage", "Identifiant zonage"),
+                    ("zone_sensible_ep", "Zone sensible EP"),
+                    ("communes", "Communes"),
+                ],
+                max_length=50,
+                verbose_name="Map type",
+            ),
+        ),
+    ]
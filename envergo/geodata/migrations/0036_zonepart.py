@@ -0,0 +1,92 @@
+# Generated by Django 4.2.28 on 2026-10-17 01:49
+
+import django.contrib.gis.db.models.fields
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("geodata", "0035_map_type_communes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ZonePart",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "map_type",
+                    models.CharField(
+                        blank=True,
+                        choices=[
+                            ("zone_humide", "Zone humide"),
+                            ("zone_inondable", "Zone inondable"),
+                            ("species", "Espèces protégées"),
+                            ("species_legacy", "Espèces protégées (historique)"),
+                            ("haies", "Haies"),
+                            (
+                                "density_reference",
+                                "Surface de référence du calcul de densité bocagère",
+                            ),
+                            ("zonage", "Identifiant zonage"),
+                            ("zone_sensible_ep", "Zone sensible EP"),
+                            ("communes", "Communes"),
+                        ],
+                        max_length=50,
+                        verbose_name="Map type",
+                    ),
+                ),
+                (
+                    "geometry",
+                    django.contrib.gis.db.models.fields.PolygonField(
+                        geography=True, srid=4326
+                    ),
+                ),
+                (
+                    "map",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="zone_parts",
+                        to="geodata.map",
+                    ),
+                ),
+                (
+                    "zone",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="parts",
+                        to="geodata.zone",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Morceau de zone",
+                "verbose_name_plural": "Morceaux de zones",
+            },
+        ),
+        migrations.AddField(
+            model_name="map",
+            name="zones_subdivided",
+            field=models.BooleanField(
+                default=False,
+                help_text="Les zones de la carte sont découpées en morceaux (`ZonePart`)",
+                verbose_name="Zones découpées",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="zonepart",
+            index=models.Index(
+                fields=["map_type"], name="geodata_zon_map_typ_e1f79f_idx"
+            ),
+        ),
+    ]
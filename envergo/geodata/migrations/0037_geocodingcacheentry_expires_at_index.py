@@ -0,0 +1,18 @@
+# Generated by Django 4.2.28 on 2026-10-17 04:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("geodata", "0036_zonepart"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="geocodingcacheentry",
+            name="expires_at",
+            field=models.DateTimeField(db_index=True, verbose_name="Expires at"),
+        ),
+    ]
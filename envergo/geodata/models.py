@@ -1,3 +1,4 @@
+import copy
 import logging
 
 from django.contrib.gis.db import models as gis_models
@@ -5,6 +6,7 @@ from django.contrib.gis.db.models.functions import Distance
 from django.contrib.gis.measure import D
 from django.contrib.postgres.fields import ArrayField
 from django.db import connection, models
+from django.db.models.expressions import RawSQL
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from localflavor.fr.fr_department import DEPARTMENT_CHOICES_PER_REGION
@@ -28,6 +30,7 @@ MAP_TYPES = Choices(
     ("density_reference", "Surface de référence du calcul de densité bocagère"),
     ("zonage", "Identifiant zonage"),
     ("zone_sensible_ep", "Zone sensible EP"),
+    ("communes", "Communes"),
 )
 
 # Sometimes, there are map with different certainty values.
@@ -105,6 +108,16 @@ class Map(models.Model):
     copy_to_staging = models.BooleanField(
         _("Copy to staging?"), help_text=_("Don't touch this please"), default=False
     )
+    grid_indexed = models.BooleanField(
+        "Indexée dans la grille",
+        help_text="Les zones de la carte sont référencées dans la grille (`GridCell`)",
+        default=False,
+    )
+    zones_subdivided = models.BooleanField(
+        "Zones découpées",
+        help_text="Les zones de la carte sont découpées en morceaux (`ZonePart`)",
+        default=False,
+    )
 
     class Meta:
         verbose_name = _("Map")
@@ -118,11 +131,90 @@ class Map(models.Model):
         return self.name
 
 
-class ZoneManager(models.Manager):
-    """Custom manager with helpers for optimizing Zone querying."""
+# Size (in meters) of the cells of the grid index (see `GridCell`)
+GRID_CELL_SIZE = 2000
+
+# Sql expressions of the grid cell containing a 4326 `geom`
+GRID_CELL_X_SQL = f"floor(ST_X(ST_Transform(geom, 2154)) / {GRID_CELL_SIZE})::integer"
+GRID_CELL_Y_SQL = f"floor(ST_Y(ST_Transform(geom, 2154)) / {GRID_CELL_SIZE})::integer"
+
+# Sql subquery of the geometries spatial predicates should run on: the parts of
+# the subdivided maps (see `ZonePart`), and the whole zones of the other maps.
+# There can be several rows per zone, so results must be grouped by `zone_id`
+# when needed.
+ZONE_PARTS_SQL = """(
+    SELECT zp.zone_id, zp.map_id, zp.map_type, zp.geometry
+    FROM geodata_zonepart zp
+    UNION ALL
+    SELECT z.id, z.map_id, m.map_type, z.geometry
+    FROM geodata_zone z
+    JOIN geodata_map m ON z.map_id = m.id
+    WHERE NOT m.zones_subdivided
+)"""
+
+
+class CentroidValuesMixin:
+    """Build the VALUES clause used to run a single query for many points."""
 
     POINT_VALUE_TEMPLATE = "(%s, ST_SetSRID(ST_MakePoint(%s, %s), 4326)::geography)"
 
+    def _build_centroid_values(self, centroids):
+        """Return a (values_sql, params) tuple for use in the CTE's VALUES clause."""
+
+        clauses = []
+        params = []
+        for key, centroid in centroids.items():
+            clauses.append(self.POINT_VALUE_TEMPLATE)
+            params.extend([str(key), centroid.x, centroid.y])
+        values_sql = ", ".join(clauses)
+        return values_sql, params
+
+
+class ZoneManager(CentroidValuesMixin, models.Manager):
+    """Custom manager with helpers for optimizing Zone querying.
+
+    The spatial helpers run their predicates on the zone parts of the
+    subdivided maps (see `ZonePart`), and on the whole zones of the other maps.
+    """
+
+    def filter_by_parts(self, predicate, params):
+        """Filter the zones with a spatial predicate on `zp.geometry`."""
+
+        return self.filter(
+            id__in=RawSQL(
+                f"SELECT zp.zone_id FROM {ZONE_PARTS_SQL} zp WHERE {predicate}",
+                params,
+            )
+        )
+
+    def intersecting(self, geometry):
+        """Return the zones intersecting the geometry."""
+
+        return self.filter_by_parts(
+            "ST_Intersects(zp.geometry, ST_GeomFromEWKT(%s)::geography)",
+            [geometry.ewkt],
+        )
+
+    def covering(self, point):
+        """Return the zones covering the point.
+
+        Only valid for points: a line or a polygon can be covered by a zone
+        without being covered by any of its parts.
+        """
+        return self.filter_by_parts(
+            "ST_Covers(zp.geometry, ST_GeomFromEWKT(%s)::geography)",
+            [point.ewkt],
+        )
+
+    def within_distance(self, geometry, distance):
+        """Return the zones within `distance` (a `D` or meters) of the geometry."""
+
+        meters = distance.m if isinstance(distance, D) else distance
+        return self.filter_by_parts(
+            "ST_DWithin(zp.geometry, ST_GeomFromEWKT(%s)::geography, %s)",
+            [geometry.ewkt, meters],
+        )
+
     def lateral_zone_join(
         self, centroids, map_type, dept_code, lateral_filter, extra_params=()
     ):
@@ -149,8 +241,8 @@ class ZoneManager(models.Manager):
             SELECT c.point_id, z.id
             FROM centroids c
             LEFT JOIN LATERAL (
-                SELECT zz.id
-                FROM geodata_zone zz
+                SELECT zz.zone_id AS id
+                FROM {ZONE_PARTS_SQL} zz
                 JOIN geodata_map m ON zz.map_id = m.id
                 WHERE m.map_type = %s
                 AND m.departments @> ARRAY[%s]::varchar[]
@@ -164,17 +256,6 @@ class ZoneManager(models.Manager):
 
         return self._hydrate_zones(rows)
 
-    def _build_centroid_values(self, centroids):
-        """Return a (values_sql, params) tuple for use in the CTE's VALUES clause."""
-
-        clauses = []
-        params = []
-        for key, centroid in centroids.items():
-            clauses.append(self.POINT_VALUE_TEMPLATE)
-            params.extend([str(key), centroid.x, centroid.y])
-        values_sql = ", ".join(clauses)
-        return values_sql, params
-
     def _hydrate_zones(self, rows):
         """Fetch Zone objects for the matched IDs returned by the raw query."""
 
@@ -203,11 +284,11 @@ class ZoneManager(models.Manager):
         ST_Distance on the geography column gives exact metre ordering.
         """
         return (
-            self.filter(
+            self.within_distance(centroid, D(m=max_distance_m))
+            .filter(
                 map__map_type=map_type,
                 map__departments__contains=[dept_code],
             )
-            .filter(geometry__dwithin=(centroid, D(m=max_distance_m)))
             .annotate(dist=Distance("geometry", centroid))
             .order_by("dist")
             .first()
@@ -227,6 +308,99 @@ class ZoneManager(models.Manager):
             extra_params=(max_distance_m,),
         )
 
+    def find_within_batch(self, centroids, radius):
+        """Return {key: [Zone]} with all the zones within ``radius`` meters.
+
+        This is the batched version of the moulinette zone query: the LATERAL
+        subquery runs once per centroid, but in a single roundtrip. Each
+        returned zone is annotated with its `distance` (in meters) to the
+        centroid, and lists are ordered by distance.
+
+        Zones are shared between centroids, so each centroid gets its own
+        copy of the zone object. Zone geometries are not fetched.
+        """
+        if not centroids:
+            return {}
+
+        values_sql, params = self._build_centroid_values(centroids)
+        params.append(radius)
+
+        sql = f"""
+            WITH centroids(point_id, geom) AS (VALUES {values_sql})
+            SELECT c.point_id, z.id, z.distance
+            FROM centroids c
+            JOIN LATERAL (
+                SELECT
+                    zz.zone_id AS id,
+                    MIN(ST_Distance(zz.geometry, c.geom))::integer AS distance
+                FROM {ZONE_PARTS_SQL} zz
+                WHERE ST_DWithin(zz.geometry, c.geom, %s)
+                GROUP BY zz.zone_id
+            ) z ON TRUE
+        """
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+
+        zones_by_id = (
+            self.select_related("map")
+            .defer("geometry", "map__geometry")
+            .in_bulk({zone_id for _point_id, zone_id, _distance in rows})
+        )
+        zones = {str(key): [] for key in centroids.keys()}
+        for point_id, zone_id, distance in rows:
+            zone = copy.copy(zones_by_id[zone_id])
+            zone.distance = distance
+            zones[point_id].append(zone)
+
+        for point_zones in zones.values():
+            point_zones.sort(key=lambda zone: (zone.distance, zone.map.name))
+        return zones
+
+    def find_covering_map_ids(self, point):
+        """Return the ids of the maps with a zone covering the given point.
+
+        The grid index resolves most maps without touching zone geometries:
+        maps with a zone fully covering the point cell certainly cover the
+        point, and indexed maps with no zone in this cell certainly don't.
+        The exact (and costly) geography check only runs for zones that
+        partially cover the cell, and for maps that are not indexed, on the
+        zone parts when the map is subdivided.
+        """
+
+        sql = f"""
+            WITH point AS (
+                SELECT ST_SetSRID(ST_MakePoint(%s, %s), 4326) AS geom
+            ),
+            cell AS (
+                SELECT {GRID_CELL_X_SQL} AS x, {GRID_CELL_Y_SQL} AS y
+                FROM point
+            )
+            SELECT gc.map_id
+            FROM geodata_gridcell gc
+            JOIN cell c ON gc.x = c.x AND gc.y = c.y
+            WHERE gc.is_full
+            UNION
+            SELECT gc.map_id
+            FROM geodata_gridcell gc
+            JOIN cell c ON gc.x = c.x AND gc.y = c.y
+            JOIN {ZONE_PARTS_SQL} z ON z.zone_id = gc.zone_id
+            CROSS JOIN point p
+            WHERE NOT gc.is_full
+            AND ST_Intersects(z.geometry, p.geom::geography)
+            UNION
+            SELECT z.map_id
+            FROM {ZONE_PARTS_SQL} z
+            CROSS JOIN point p
+            WHERE z.map_id NOT IN (SELECT id FROM geodata_map WHERE grid_indexed)
+            AND ST_Intersects(z.geometry, p.geom::geography)
+        """
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [point.x, point.y])
+            return {row[0] for row in cursor.fetchall()}
+
 
 class Zone(gis_models.Model):
     """Stores an annotated geographic polygon(s)."""
@@ -270,6 +444,66 @@ class Zone(gis_models.Model):
         ]
 
 
+class GridCell(models.Model):
+    """A cell of the grid index of the zones.
+
+    France is divided in square cells of `GRID_CELL_SIZE` meters, aligned on
+    the Lambert 93 origin. For each zone, we store the cells it fully or
+    partially covers. Cells without any row are not covered by the zone.
+
+    The grid is built when the map is imported, and allows to know if a map
+    covers (or is close to) a point without any costly geometry computation,
+    except for the cells on the zone boundaries.
+    """
+
+    map = models.ForeignKey(Map, on_delete=models.CASCADE, related_name="grid_cells")
+    zone = models.ForeignKey(Zone, on_delete=models.CASCADE, related_name="grid_cells")
+    x = models.IntegerField()
+    y = models.IntegerField()
+    is_full = models.BooleanField()
+
+    class Meta:
+        verbose_name = "Cellule de grille"
+        verbose_name_plural = "Cellules de grille"
+        indexes = [
+            models.Index(fields=["x", "y"]),
+        ]
+
+
+# Maximum number of vertices of the zone parts (see `ZonePart`)
+ZONE_PART_MAX_VERTICES = 256
+
+
+class ZonePart(gis_models.Model):
+    """A small piece of a zone.
+
+    Some zones are huge multipolygons (e.g the very detailed coastlines of the
+    land zones), so any exact spatial predicate on them is costly. When the
+    map is imported, its zones are subdivided in pieces of at most
+    `ZONE_PART_MAX_VERTICES` vertices, and the spatial queries run on those
+    pieces instead (see `ZoneManager` and `ZONE_PARTS_SQL`), so exact tests
+    only touch small polygons.
+
+    `map` and `map_type` are copied from the zone, so the parts can be
+    filtered without any join.
+    """
+
+    zone = models.ForeignKey(Zone, on_delete=models.CASCADE, related_name="parts")
+    map = models.ForeignKey(Map, on_delete=models.CASCADE, related_name="zone_parts")
+    map_type = models.CharField(
+        _("Map type"), max_length=50, choices=MAP_TYPES, blank=True
+    )
+    # Geography, like `Zone.geometry`, so predicates and distances match
+    geometry = gis_models.PolygonField(geography=True)
+
+    class Meta:
+        verbose_name = "Morceau de zone"
+        verbose_name_plural = "Morceaux de zones"
+        indexes = [
+            models.Index(fields=["map_type"]),
+        ]
+
+
 class Line(gis_models.Model):
     """Stores an annotated geographic Line(s)."""
 
@@ -289,6 +523,36 @@ class Line(gis_models.Model):
     attributes = models.JSONField(_("Entity attributes"), null=True, blank=True)
 
 
+class DepartmentManager(CentroidValuesMixin, models.Manager):
+    def locate_batch(self, centroids):
+        """Return {key: Department} for the centroids located in a department.
+
+        Department geometries are not fetched.
+        """
+        if not centroids:
+            return {}
+
+        values_sql, params = self._build_centroid_values(centroids)
+        sql = f"""
+            WITH centroids(point_id, geom) AS (VALUES {values_sql})
+            SELECT c.point_id, d.id
+            FROM centroids c
+            JOIN geodata_department d ON ST_Contains(d.geometry, c.geom::geometry)
+        """
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+
+        departments_by_id = self.defer("geometry").in_bulk(
+            {department_id for _point_id, department_id in rows}
+        )
+        return {
+            point_id: departments_by_id[department_id]
+            for point_id, department_id in rows
+        }
+
+
 class Department(models.Model):
     """Water law contact data for a departement."""
 
@@ -303,6 +567,8 @@ class Department(models.Model):
     # distance/area. Geography would break these queries for no gain.
     geometry = gis_models.MultiPolygonField(null=True)
 
+    objects = DepartmentManager()
+
     class Meta:
         verbose_name = _("Department")
         verbose_name_plural = _("Departments")
@@ -335,3 +601,15 @@ class CatchmentAreaTile(models.Model):
     class Meta:
         verbose_name = _("Catchment area tile")
         verbose_name_plural = _("Catchment area tiles")
+
+
+class GeocodingCacheEntry(models.Model):
+    """A cached reverse geocoding api answer (see `envergo.geodata.geocoding`)."""
+
+    key = models.CharField(_("Key"), max_length=256, unique=True)
+    entry = models.JSONField(_("Entry"))
+    expires_at = models.DateTimeField(_("Expires at"), db_index=True)
+
+    class Meta:
+        verbose_name = _("Geocoding cache entry")
+        verbose_name_plural = _("Geocoding cache entries")
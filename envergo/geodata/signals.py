@@ -0,0 +1,41 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from envergo.geodata.locator import invalidate_department_locator
+from envergo.geodata.models import Department, Map
+from envergo.utils.models import get_changed_fields
+
+
+def on_department_save(sender, instance, update_fields=None, **kwargs):
+    # Rebuilding the locator index is expensive, so it's only done when the
+    # geometry changed
+    changed = get_changed_fields(instance, ("geometry",), update_fields)
+    instance._changes_locator_geometries = bool(changed)
+
+
+def on_department_change(sender, instance, **kwargs):
+    geometries = instance.__dict__.pop("_changes_locator_geometries", True)
+    invalidate = partial(invalidate_department_locator, geometries=geometries)
+
+    # We invalidate right away so the current request sees its own changes,
+    # and once again after the commit, in case a concurrent request loaded
+    # the old departments in between.
+    invalidate()
+    transaction.on_commit(invalidate)
+
+
+pre_save.connect(on_department_save, sender=Department)
+post_save.connect(on_department_change, sender=Department)
+post_delete.connect(on_department_change, sender=Department)
+
+
+def on_map_save(sender, instance, **kwargs):
+    # The zone parts hold a copy of the map type (see `ZonePart`)
+    instance.zone_parts.exclude(map_type=instance.map_type).update(
+        map_type=instance.map_type
+    )
+
+
+post_save.connect(on_map_save, sender=Map)
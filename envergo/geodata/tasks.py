@@ -8,11 +8,14 @@ from config.celery_app import app
 from envergo.geodata.models import STATUSES, Map
 from envergo.geodata.utils import (
     extract_map,
+    index_map_grid,
     make_polygons_valid,
+    precompute_map_display_geometries,
     process_lines_file,
     process_zones_file,
     simplify_lines,
     simplify_map,
+    subdivide_map_zones,
 )
 
 logger = logging.getLogger(__name__)
@@ -30,6 +33,8 @@ def process_map(task, map_id):
     map.task_id = task.request.id
     map.import_error_msg = ""
     map.import_status = None
+    map.grid_indexed = False
+    map.zones_subdivided = False
     map.save()
 
     # Proceed with the map import
@@ -37,6 +42,7 @@ def process_map(task, map_id):
         with transaction.atomic():
             map.zones.all().delete()
             map.lines.all().delete()
+            map.zone_parts.all().delete()
 
             logger.info("Creating temporary directory")
             with extract_map(map.file) as map_file:
@@ -49,9 +55,12 @@ def process_map(task, map_id):
                 else:
                     process_zones_file(map, map_file, task)
                     make_polygons_valid(map)
+                    subdivide_map_zones(map)
                     map.geometry = simplify_map(map)
 
     except Exception as e:
+        # The zone parts creation was rolled back too
+        map.zones_subdivided = False
         map.import_error_msg = f"Erreur d'import ({e})"
         logger.error(map.import_error_msg)
 
@@ -69,6 +78,30 @@ def process_map(task, map_id):
     map.import_date = timezone.now()
     map.save()
 
+    precompute_map_display_geometries(map)
+
+    # The grid index is only needed to speed up the spatial queries, so it's
+    # built by another task, once the imported zones are committed
+    if map.zones.exists():
+        transaction.on_commit(lambda: index_map.delay(map_id))
+
+
+@app.task
+def index_map(map_id):
+    """Reference the zones of an imported map in the grid index.
+
+    Until then, the map zones are looked up without the index.
+    """
+    map = Map.objects.filter(pk=map_id).first()
+    if map is None or map.task_id:
+        # The map was deleted, or is being imported again, which will queue
+        # its own indexing
+        return
+
+    with transaction.atomic():
+        index_map_grid(map)
+        map.save(update_fields=["grid_indexed"])
+
 
 @app.task(bind=True)
 def generate_map_preview(task, map_id):
@@ -81,3 +114,5 @@ def generate_map_preview(task, map_id):
         map.geometry = simplify_lines(map)
 
     map.save()
+    # The import date did not change, so the cached geometries must be replaced
+    precompute_map_display_geometries(map)
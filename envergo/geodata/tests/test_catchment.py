@@ -0,0 +1,163 @@
+import numpy as np
+import pytest
+from django.contrib.gis.gdal import GDALRaster
+from django.contrib.gis.geos import Point
+
+from envergo.geodata.catchment import CatchmentAreaRasters, interpolate_pixel_values
+from envergo.geodata.constants import EPSG_LAMB93, EPSG_WGS84
+from envergo.geodata.models import CatchmentAreaTile
+from envergo.geodata.utils import get_catchment_area
+
+# Somewhere near Nantes, in Lambert 93
+ORIGIN = (355_000, 6_690_000)
+PIXEL_SIZE = 20
+NODATA = -1
+
+
+def make_tile(origin, values):
+    values = np.array(values, dtype=np.int32)
+    height, width = values.shape
+    return CatchmentAreaTile(
+        filename="test.tif",
+        rast=GDALRaster(
+            {
+                "srid": EPSG_LAMB93,
+                "width": width,
+                "height": height,
+                "origin": list(origin),
+                "scale": [PIXEL_SIZE, -PIXEL_SIZE],
+                "datatype": 5,  # GDT_Int32
+                "bands": [{"data": values.tobytes(), "nodata_value": NODATA}],
+            }
+        ),
+    )
+
+
+def pixel_center(origin, col, row):
+    return (
+        origin[0] + (col + 0.5) * PIXEL_SIZE,
+        origin[1] - (row + 0.5) * PIXEL_SIZE,
+    )
+
+
+def to_wgs84(x, y):
+    point = Point(x, y, srid=EPSG_LAMB93).transform(EPSG_WGS84, clone=True)
+    return point.x, point.y
+
+
+def make_tiles():
+    # Two side by side tiles
+    left = make_tile(ORIGIN, [[1000, 2000], [3000, 4000]])
+    right_origin = (ORIGIN[0] + 2 * PIXEL_SIZE, ORIGIN[1])
+    right = make_tile(right_origin, [[6000, NODATA], [8000, 9000]])
+    return left, right
+
+
+def tile_pixels(tiles):
+    """Return the pixel rows of the tiles, as returned by the db lookup."""
+    pixels = []
+    for tile in tiles:
+        origin = (tile.rast.origin.x, tile.rast.origin.y)
+        for row, values in enumerate(tile.rast.bands[0].data().tolist()):
+            for col, value in enumerate(values):
+                if value != NODATA:
+                    x, y = pixel_center(origin, col, row)
+                    pixels.append((x, y, value, PIXEL_SIZE, -PIXEL_SIZE))
+    return pixels
+
+
+# Points at pixel centers, pixel corners, and in between
+SAMPLE_POINTS = [
+    (ORIGIN[0] + dx, ORIGIN[1] - dy)
+    for dx in (3, 10, 17.5, 20, 29, 40, 51, 60, 70)
+    for dy in (4, 10, 20, 26.3, 30, 38)
+]
+
+
+@pytest.fixture
+def rasters(tmp_path):
+    left, right = make_tiles()
+    left.id, right.id = 1, 2
+
+    CatchmentAreaRasters.export(tmp_path, tiles=[left, right])
+    return CatchmentAreaRasters(tmp_path)
+
+
+def test_pixel_centers_values(rasters):
+    xs, ys = zip(pixel_center(ORIGIN, 0, 0), pixel_center(ORIGIN, 1, 1))
+    values = rasters.interpolate(np.array(xs), np.array(ys))
+    assert values.tolist() == pytest.approx([1000, 4000])
+
+
+def test_bilinear_interpolation(rasters):
+    # Between the four pixels of the left tile
+    x, y = ORIGIN[0] + PIXEL_SIZE, ORIGIN[1] - PIXEL_SIZE
+    assert rasters.interpolate(np.array([x]), np.array([y]))[0] == pytest.approx(2500)
+
+    # Across the two tiles
+    x = ORIGIN[0] + 2 * PIXEL_SIZE
+    assert rasters.interpolate(np.array([x]), np.array([y]))[0] == pytest.approx(
+        (2000 + 4000 + 6000 + 8000) / 4
+    )
+
+
+def test_nodata_pixels_are_ignored(rasters):
+    # Between the 4 pixels of the right tile, one of them is nodata
+    x, y = ORIGIN[0] + 3 * PIXEL_SIZE, ORIGIN[1] - PIXEL_SIZE
+    assert rasters.interpolate(np.array([x]), np.array([y]))[0] == pytest.approx(
+        (6000 + 8000 + 9000) / 3
+    )
+
+
+def test_db_pixels_are_interpolated_like_the_exported_rasters(rasters):
+    pixels = tile_pixels(make_tiles())
+
+    for x, y in SAMPLE_POINTS:
+        assert interpolate_pixel_values(x, y, pixels) == pytest.approx(
+            rasters.interpolate_one(x, y)
+        )
+
+
+@pytest.mark.django_db
+def test_db_and_exported_rasters_lookups_are_equal(tmp_path, settings):
+    tiles = make_tiles()
+    for tile in tiles:
+        tile.save()
+    CatchmentAreaRasters.export(tmp_path, tiles=tiles)
+
+    points = [to_wgs84(x, y) for x, y in SAMPLE_POINTS]
+    settings.CATCHMENT_AREA_RASTERS_DIR = ""
+    db_areas = [get_catchment_area(lng, lat) for lng, lat in points]
+
+    settings.CATCHMENT_AREA_RASTERS_DIR = str(tmp_path)
+    exported_areas = [get_catchment_area(lng, lat) for lng, lat in points]
+
+    assert db_areas == exported_areas
+    assert any(area is not None for area in db_areas)
+
+
+def test_wgs84_lookups(rasters):
+    inside = to_wgs84(ORIGIN[0] + PIXEL_SIZE, ORIGIN[1] - PIXEL_SIZE)
+    outside = to_wgs84(ORIGIN[0] - 1000, ORIGIN[1] + 1000)
+
+    assert rasters.get_catchment_area(*inside) == 2500
+    assert rasters.get_catchment_area(*outside) is None
+    lngs, lats = zip(inside, outside)
+    assert rasters.get_catchment_areas(lngs, lats) == [2500, None]
+
+
+def test_get_catchment_area_uses_exported_rasters(rasters, tmp_path, settings):
+    settings.CATCHMENT_AREA_RASTERS_DIR = str(tmp_path)
+    lng, lat = to_wgs84(ORIGIN[0] + PIXEL_SIZE, ORIGIN[1] - PIXEL_SIZE)
+
+    assert get_catchment_area(lng, lat) == 2500
+
+
+def test_export_removes_previous_files(tmp_path):
+    tile = make_tile(ORIGIN, [[1000]])
+    tile.id = 1
+
+    CatchmentAreaRasters.export(tmp_path, tiles=[tile])
+    CatchmentAreaRasters.export(tmp_path, tiles=[tile])
+
+    assert len(list(tmp_path.glob("*.npy"))) == 1
@@ -0,0 +1,169 @@
+import math
+from unittest.mock import patch
+
+import pytest
+from django.contrib.gis.geos import Point
+
+from envergo.geodata.constants import EPSG_LAMB93, EPSG_WGS84
+from envergo.geodata.density_grid import (
+    HedgeDensityGrid,
+    get_density_error_bound,
+    get_density_mode,
+)
+from envergo.geodata.utils import (
+    build_circles,
+    compute_hedge_densities_around_point,
+    compute_hedge_density_on_grid,
+)
+
+# Somewhere in the Aisne, in Lambert 93
+CENTER = (740_500, 6_930_500)
+CELL_SIZE = 1000
+
+# Every cell is fully on land, with 50m of hedges per hectare
+CELL_AREA = CELL_SIZE * CELL_SIZE
+CELL_LENGTH = 50 * CELL_AREA / 10000
+
+
+def to_wgs84(x, y):
+    return Point(x, y, srid=EPSG_LAMB93).transform(EPSG_WGS84, clone=True)
+
+
+@pytest.fixture
+def grid(tmp_path):
+    i, j = CENTER[0] // CELL_SIZE, CENTER[1] // CELL_SIZE
+    cells = [
+        (i + di, j + dj, CELL_AREA, CELL_LENGTH)
+        for di in range(-10, 11)
+        for dj in range(-10, 11)
+    ]
+    HedgeDensityGrid.export(tmp_path, cell_size=CELL_SIZE, cells=cells)
+    return HedgeDensityGrid(tmp_path)
+
+
+@pytest.fixture
+def circle():
+    circles, epsg_utm = build_circles(to_wgs84(*CENTER), [5000])
+    return circles[5000], epsg_utm
+
+
+def test_boundary_cells_are_estimated_within_tolerance(grid, circle, settings):
+    settings.HEDGE_DENSITY_GRID_TOLERANCE = 1.0
+    circle, epsg_utm = circle
+
+    with patch("envergo.geodata.utils.trim_land") as mock_trim_land:
+        density = compute_hedge_density_on_grid(grid, circle, epsg_utm)
+
+    mock_trim_land.assert_not_called()
+    assert density["density"] == pytest.approx(50)
+    # The area of a 5km circle
+    assert density["artifacts"]["area_ha"] == pytest.approx(7854, rel=1e-2)
+    assert 0 < density["artifacts"]["error"] <= 1.0
+
+
+def test_boundary_ring_is_clipped_out_of_tolerance(grid, circle, settings):
+    settings.HEDGE_DENSITY_GRID_TOLERANCE = 0.0
+    circle, epsg_utm = circle
+
+    # The ring is entirely off land
+    with (
+        patch("envergo.geodata.utils.trim_land", return_value=None) as mock_trim,
+        patch("envergo.geodata.utils.query_hedge_length", return_value=0.0),
+    ):
+        density = compute_hedge_density_on_grid(grid, circle, epsg_utm)
+
+    ring = mock_trim.call_args[0][0]
+    assert 0 < ring.area < circle.area
+    assert density["density"] == pytest.approx(50)
+    assert density["artifacts"]["area_ha"] < 7854
+    assert density["artifacts"]["error"] == 0.0
+
+
+def test_circles_outside_the_grid_are_not_computed(grid):
+    circles, epsg_utm = build_circles(to_wgs84(CENTER[0] + 50_000, CENTER[1]), [5000])
+    assert grid.get_circle_cells(circles[5000]) is None
+    assert compute_hedge_density_on_grid(grid, circles[5000], epsg_utm) is None
+
+
+def test_large_radii_use_the_grid(grid, tmp_path, settings):
+    settings.HEDGE_DENSITY_GRID_DIR = str(tmp_path)
+    settings.HEDGE_DENSITY_GRID_TOLERANCE = 1.0
+    settings.HEDGE_DENSITY_GRID_MIN_RADIUS = 1000
+    point = to_wgs84(*CENTER)
+
+    with (
+        patch("envergo.geodata.utils.trim_circles_to_land") as mock_trim,
+        patch("envergo.geodata.utils.query_hedge_length", return_value=0.0),
+    ):
+        mock_trim.side_effect = lambda circles: {r: None for r in circles}
+        bundle = compute_hedge_densities_around_point(point, radii=[200, 5000])
+        assert list(mock_trim.call_args[0][0]) == [200]
+
+        settings.HEDGE_DENSITY_GRID_DIR = ""
+        bundle_exact = compute_hedge_densities_around_point(point, radii=[200, 5000])
+        assert list(mock_trim.call_args[0][0]) == [200, 5000]
+
+    assert bundle[5000]["density"] == pytest.approx(50)
+    assert bundle[5000]["artifacts"]["mode"] == "grid"
+    assert bundle[200]["density"] == 1.0
+    assert bundle[200]["artifacts"]["mode"] == "exact"
+    assert bundle_exact[5000]["density"] == 1.0
+    assert bundle_exact[5000]["artifacts"]["mode"] == "exact"
+
+
+def make_cells(length, area, boundary_cells_length, boundary_cells_area, ratio):
+    return {
+        "length": length,
+        "area": area,
+        "boundary_length": boundary_cells_length * ratio,
+        "boundary_area": boundary_cells_area * ratio,
+        "boundary_cells_length": boundary_cells_length,
+        "boundary_cells_area": boundary_cells_area,
+    }
+
+
+def test_density_error_bound_covers_the_worst_distributions():
+    cells = make_cells(1000, 100, 100, 10, ratio=0.5)
+    estimate = 1050 / 105
+    # All the boundary hedges, none of the boundary land
+    highest = 1100 / 100
+    # All the boundary land, none of the boundary hedges
+    lowest = 1000 / 110
+
+    error = get_density_error_bound(cells)
+
+    assert error == pytest.approx(max(highest - estimate, estimate - lowest) / estimate)
+    assert abs(highest - estimate) / estimate <= error
+    assert abs(lowest - estimate) / estimate <= error
+
+
+def test_density_error_bound_of_degenerate_cells():
+    # Boundary cells are off land
+    assert get_density_error_bound(make_cells(1000, 100, 0, 0, ratio=0.5)) == 0.0
+    # No land inside the circle
+    assert get_density_error_bound(make_cells(0, 0, 100, 10, ratio=0.5)) == math.inf
+
+
+def test_density_mode_depends_on_the_grid(grid, tmp_path, settings):
+    settings.HEDGE_DENSITY_GRID_MIN_RADIUS = 1000
+    settings.HEDGE_DENSITY_GRID_TOLERANCE = 0.05
+
+    settings.HEDGE_DENSITY_GRID_DIR = ""
+    assert get_density_mode([200, 5000]) == "exact"
+
+    settings.HEDGE_DENSITY_GRID_DIR = str(tmp_path)
+    assert get_density_mode([200]) == "exact"
+    mode = get_density_mode([200, 5000])
+    assert mode.startswith("grid:")
+
+    settings.HEDGE_DENSITY_GRID_TOLERANCE = 0.1
+    assert get_density_mode([200, 5000]) != mode
+
+
+def test_export_removes_previous_files(tmp_path):
+    cells = [(7405, 69305, CELL_AREA, CELL_LENGTH)]
+
+    HedgeDensityGrid.export(tmp_path, cell_size=CELL_SIZE, cells=cells)
+    HedgeDensityGrid.export(tmp_path, cell_size=CELL_SIZE, cells=cells)
+
+    assert len(list(tmp_path.glob("*.npy"))) == 2
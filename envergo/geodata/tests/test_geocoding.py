@@ -0,0 +1,171 @@
+from io import StringIO
+from unittest.mock import Mock, patch
+
+import pytest
+from django.core.cache import cache
+from django.core.management import call_command
+
+from envergo.geodata.geocoding import (
+    DatabaseBackend,
+    DjangoCacheBackend,
+    GeocodingCache,
+    GeocodingError,
+    MemoryBackend,
+    get_geocoding_cache,
+)
+from envergo.geodata.models import GeocodingCacheEntry
+from envergo.geodata.utils import get_commune_from_coords, get_data_from_coords
+
+
+@pytest.fixture
+def background():
+    """Run the background refreshes on demand."""
+    return []
+
+
+@pytest.fixture
+def geocoding_cache(settings, background):
+    settings.GEOCODING_CACHE_TTL = 100
+    settings.GEOCODING_CACHE_STALE_TTL = 100
+    settings.GEOCODING_CACHE_ERROR_TTL = 10
+    return GeocodingCache(MemoryBackend(), run_in_background=background.append)
+
+
+@pytest.fixture
+def now():
+    with patch("envergo.geodata.geocoding.time.time", return_value=1000) as time:
+        yield time
+
+
+def test_answers_are_cached(geocoding_cache, now):
+    fetch = Mock(return_value="Nantes")
+
+    assert geocoding_cache.get_or_fetch("key", fetch) == "Nantes"
+    assert geocoding_cache.get_or_fetch("key", fetch) == "Nantes"
+    fetch.assert_called_once()
+
+
+def test_empty_answers_are_cached(geocoding_cache, now):
+    fetch = Mock(return_value=None)
+
+    assert geocoding_cache.get_or_fetch("key", fetch) is None
+    assert geocoding_cache.get_or_fetch("key", fetch) is None
+    fetch.assert_called_once()
+
+
+def test_errors_are_cached_shortly(geocoding_cache, now):
+    fetch = Mock(side_effect=GeocodingError)
+
+    assert geocoding_cache.get_or_fetch("key", fetch) is None
+    assert geocoding_cache.get_or_fetch("key", fetch) is None
+    assert fetch.call_count == 1
+
+    now.return_value += 11
+    fetch.side_effect = None
+    fetch.return_value = "Nantes"
+    assert geocoding_cache.get_or_fetch("key", fetch) == "Nantes"
+    assert fetch.call_count == 2
+
+
+def test_stale_answers_are_refreshed_in_background(geocoding_cache, background, now):
+    fetch = Mock(return_value="Nantes")
+    geocoding_cache.get_or_fetch("key", fetch)
+
+    now.return_value += 150
+    fetch.return_value = "Rezé"
+    assert geocoding_cache.get_or_fetch("key", fetch) == "Nantes"
+    assert geocoding_cache.get_or_fetch("key", fetch) == "Nantes"
+
+    # Only one refresh is scheduled
+    assert len(background) == 1
+    background.pop()()
+    assert geocoding_cache.get_or_fetch("key", fetch) == "Rezé"
+    assert not background
+
+
+def test_expired_answers_are_fetched_again(geocoding_cache, background, now):
+    fetch = Mock(return_value="Nantes")
+    geocoding_cache.get_or_fetch("key", fetch)
+
+    now.return_value += 250
+    fetch.return_value = "Rezé"
+    assert geocoding_cache.get_or_fetch("key", fetch) == "Rezé"
+    assert not background
+
+
+def test_commune_lookups_use_rounded_coords(geocoding_cache):
+    with patch(
+        "envergo.geodata.utils.get_geocoding_cache", return_value=geocoding_cache
+    ), patch(
+        "envergo.geodata.utils.fetch_commune_from_coords", return_value="Nantes"
+    ) as fetch:
+        assert get_commune_from_coords(-1.553621, 47.218371) == "Nantes"
+        assert get_commune_from_coords(-1.553644, 47.218392) == "Nantes"
+
+    fetch.assert_called_once_with(-1.5536, 47.2184, 0.5)
+
+
+def test_data_lookups_use_rounded_coords(geocoding_cache):
+    """The api is called with the rounded coords, up to ~10m away."""
+    with patch(
+        "envergo.geodata.utils.get_geocoding_cache", return_value=geocoding_cache
+    ), patch(
+        "envergo.geodata.utils.fetch_data_from_coords", return_value=["Nantes"]
+    ) as fetch:
+        assert get_data_from_coords(-1.553621, 47.218371) == ["Nantes"]
+        assert get_data_from_coords(-1.553644, 47.218392) == ["Nantes"]
+
+    fetch.assert_called_once_with(-1.5536, 47.2184, 0.5, "address", 1)
+
+
+def test_memory_backend_is_used_in_tests():
+    assert isinstance(get_geocoding_cache().backend, MemoryBackend)
+
+
+def test_memory_backend_expires_entries(now):
+    backend = MemoryBackend()
+    entry = {"data": "Nantes", "error": False, "fetched_at": 1000}
+
+    assert backend.get("key") is None
+    backend.set("key", entry, 10)
+    assert backend.get("key") == entry
+
+    now.return_value += 11
+    assert backend.get("key") is None
+
+
+def test_django_cache_backend_stores_entries():
+    cache.clear()
+    backend = DjangoCacheBackend()
+    entry = {"data": "Nantes", "error": False, "fetched_at": 1000}
+
+    assert backend.get("key") is None
+    backend.set("key", entry, 10)
+    assert backend.get("key") == entry
+    assert cache.get("geocoding:key") == entry
+
+
+@pytest.mark.django_db
+def test_database_backend_expires_and_purges_entries():
+    backend = DatabaseBackend()
+    entry = {"data": "Nantes", "error": False, "fetched_at": 1000}
+
+    backend.set("fresh", entry, 100)
+    backend.set("expired", entry, 100)
+    backend.set("expired", {**entry, "data": "Rezé"}, -1)
+
+    assert backend.get("fresh") == entry
+    assert backend.get("expired") is None
+    assert GeocodingCacheEntry.objects.count() == 2
+
+    assert backend.purge() == 1
+    assert list(GeocodingCacheEntry.objects.values_list("key", flat=True)) == ["fresh"]
+
+
+@pytest.mark.django_db
+def test_purge_geocoding_cache_command():
+    DatabaseBackend().set("expired", {"data": None}, -1)
+
+    call_command("purge_geocoding_cache", stdout=StringIO())
+
+    assert not GeocodingCacheEntry.objects.exists()
@@ -0,0 +1,113 @@
+from unittest.mock import patch
+
+import pytest
+import shapely
+from django.contrib.gis.db.models.functions import Intersection, Length
+from django.contrib.gis.geos import GEOSGeometry, MultiPolygon, Polygon
+from django.core.cache import cache
+
+from envergo.geodata.locator import GEOMETRIES_VERSION_KEY, get_department_locator
+from envergo.geodata.models import Department
+from envergo.geodata.tests.factories import DepartmentFactory
+from envergo.geodata.utils import get_department_from_coords
+
+pytestmark = pytest.mark.django_db
+
+EPSG_WGS84 = 4326
+
+# Two adjacent squares
+WEST = MultiPolygon(
+    Polygon(((-2, 47), (-1, 47), (-1, 48), (-2, 48), (-2, 47))), srid=EPSG_WGS84
+)
+EAST = MultiPolygon(
+    Polygon(((-1, 47), (0, 47), (0, 48), (-1, 48), (-1, 47))), srid=EPSG_WGS84
+)
+
+
+@pytest.fixture
+def departments():
+    return (
+        DepartmentFactory(department="44", geometry=WEST),
+        DepartmentFactory(department="49", geometry=EAST),
+    )
+
+
+def test_locate(departments):
+    locator = get_department_locator()
+
+    assert locator.locate(-1.5, 47.5).department == "44"
+    assert locator.locate(-0.5, 47.5).department == "49"
+    assert locator.locate(5, 45) is None
+    assert get_department_from_coords(-0.5, 47.5) == "49"
+
+
+def test_get_lengths_matches_postgis(departments):
+    line = shapely.LineString([(-1.8, 47.5), (-0.9, 47.6)])
+    lines = shapely.MultiLineString([line])
+
+    lengths = get_department_locator().get_lengths(lines)
+
+    geos_lines = GEOSGeometry(lines.wkt, srid=EPSG_WGS84)
+    expected = (
+        Department.objects.filter(geometry__intersects=geos_lines)
+        .annotate(length=Length(Intersection("geometry", geos_lines)))
+        .order_by("-length")
+    )
+    assert [d.department for d, _length in lengths] == ["44", "49"]
+    for (_department, length), department in zip(lengths, expected):
+        assert length == pytest.approx(department.length.m, rel=1e-3)
+
+
+def test_locator_is_refreshed_when_departments_change(departments):
+    locator = get_department_locator()
+    assert locator.locate(1.5, 47.5) is None
+
+    DepartmentFactory(
+        department="37",
+        geometry=MultiPolygon(
+            Polygon(((1, 47), (2, 47), (2, 48), (1, 48), (1, 47))), srid=EPSG_WGS84
+        ),
+    )
+
+    assert get_department_locator().locate(1.5, 47.5).department == "37"
+
+
+def test_locator_index_is_kept_when_geometries_are_unchanged(departments):
+    locator = get_department_locator()
+    tree = locator.tree
+
+    west, _east = departments
+    west.department = "85"
+    west.save()
+
+    locator = get_department_locator()
+    assert locator.tree is tree
+    assert locator.locate(-1.5, 47.5).department == "85"
+
+
+def test_locator_index_is_rebuilt_when_geometries_change(departments):
+    locator = get_department_locator()
+
+    _west, east = departments
+    east.geometry = MultiPolygon(
+        Polygon(((1, 47), (2, 47), (2, 48), (1, 48), (1, 47))), srid=EPSG_WGS84
+    )
+    east.save(update_fields=["geometry"])
+
+    locator = get_department_locator()
+    assert locator.locate(-0.5, 47.5) is None
+    assert locator.locate(1.5, 47.5).department == "49"
+
+
+def test_other_processes_rebuild_the_locator_in_the_background(departments):
+    locator = get_department_locator()
+
+    # Another process changed the geometries
+    cache.set(GEOMETRIES_VERSION_KEY, "new-version", timeout=None)
+
+    with (
+        patch("envergo.geodata.locator._rebuild_thread", None),
+        patch("envergo.geodata.locator.threading.Thread") as mock_thread,
+    ):
+        assert get_department_locator() is locator
+    mock_thread.return_value.start.assert_called_once()
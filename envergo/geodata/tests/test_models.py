@@ -1,9 +1,11 @@
 from datetime import date, timedelta
 
 import pytest
+from django.contrib.gis.geos import Point
 from django.db.backends.postgresql.psycopg_any import DateRange
 
-from envergo.geodata.tests.factories import DepartmentFactory
+from envergo.geodata.models import Department
+from envergo.geodata.tests.factories import Department34Factory, DepartmentFactory
 from envergo.moulinette.tests.factories import ConfigAmenagementFactory
 
 pytestmark = pytest.mark.django_db
@@ -37,3 +39,19 @@ def test_is_amenagement_activated_with_current_config():
     )
 
     assert dept.is_amenagement_activated()
+
+
+def test_locate_departments_in_batch():
+    """Each point is matched with the department containing it."""
+    dept_44 = DepartmentFactory()
+    dept_34 = Department34Factory()
+
+    departments = Department.objects.locate_batch(
+        {
+            "nantes": Point(-1.54394, 47.21381, srid=4326),
+            "herault": Point(3.26, 43.58, srid=4326),
+            "atlantic": Point(-20, 45, srid=4326),
+        }
+    )
+
+    assert departments == {"nantes": dept_44, "herault": dept_34}
@@ -4,15 +4,19 @@ Expected values are pinned as literal floats with tight tolerance.
 Any drift beyond floating-point noise is a real regression.
 """
 
+import json
+
 import pytest
 from django.contrib.gis.geos import (
     GEOSGeometry,
     LineString,
     MultiLineString,
+    MultiPolygon,
     Point,
     Polygon,
 )
 
+from envergo.geodata.models import MAP_TYPES, Map
 from envergo.geodata.tests.factories import (
     LineFactory,
     TerresEmergeesZoneFactory,
@@ -22,8 +26,12 @@ from envergo.geodata.utils import (
     compute_hedge_densities_around_point,
     compute_hedge_density_around_lines,
     get_best_epsg_for_location,
+    index_map_grid,
+    is_inland,
     query_hedge_length,
     query_hedges_display_geojson,
+    subdivide_map_zones,
+    trim_land,
 )
 
 pytestmark = [pytest.mark.django_db, pytest.mark.haie]
@@ -87,6 +95,78 @@ def test_density_around_point_pinned_values(hedge_density_fixture):
         assert result["artifacts"]["truncated_circle"] is not None
 
 
+def test_density_around_point_with_subdivided_land(hedge_density_fixture):
+    """Land zone parts give the same densities as the land zones."""
+    land_map = Map.objects.get(map_type=MAP_TYPES.density_reference)
+    subdivide_map_zones(land_map)
+    land_map.save()
+    assert land_map.zone_parts.exists()
+
+    bundle = compute_hedge_densities_around_point(
+        hedge_density_fixture, radii=[200, 400, 5000]
+    )
+
+    for radius, expected in EXPECTED_AROUND_POINT.items():
+        result = bundle[radius]
+        assert result["density"] == pytest.approx(expected["density"], rel=1e-6)
+        assert result["artifacts"]["area_ha"] == pytest.approx(
+            expected["area_ha"], rel=1e-6
+        )
+
+
+def test_query_hedge_length_across_land_parts():
+    """Hedges spanning several land parts are measured like on a single zone.
+
+    The fast path needs a hedge covered by a single land part, so those
+    hedges are clipped to the buffer instead, with the same length. The
+    display query takes the same paths.
+    """
+    center = Point(TEST_LNG, TEST_LAT, srid=4326)
+    land = center.buffer(0.2, quadsegs=100)
+    land_zone = TerresEmergeesZoneFactory(geometry=MultiPolygon([land]))
+    hedge = MultiLineString(
+        [LineString([(TEST_LNG - 0.1, TEST_LAT), (TEST_LNG + 0.1, TEST_LAT)])],
+        srid=4326,
+    )
+    LineFactory(geometry=hedge)
+    circle = center.buffer(0.15)
+    truncated = trim_land(circle)
+    expected_length = query_hedge_length(truncated, circle)
+    expected_display = query_hedges_display_geojson(truncated, circle)
+
+    subdivide_map_zones(land_zone.map)
+    land_zone.map.save()
+    parts = land_zone.map.zone_parts.all()
+    assert parts.count() > 1
+    assert not any(part.geometry.covers(hedge) for part in parts)
+
+    length = query_hedge_length(truncated, circle)
+    assert length == pytest.approx(expected_length, rel=1e-6)
+    assert length > 0
+
+    display = query_hedges_display_geojson(truncated, circle)
+    assert GEOSGeometry(json.dumps(display)).length == pytest.approx(
+        GEOSGeometry(json.dumps(expected_display)).length, rel=1e-6
+    )
+
+
+def test_trim_land_skips_union_inland():
+    """Circles in cells fully covered by land are not trimmed."""
+    land = Polygon.from_bbox((3.3, 49.1, 3.9, 49.5))
+    land.srid = 4326
+    land_zone = TerresEmergeesZoneFactory(geometry=MultiPolygon([land]))
+    index_map_grid(land_zone.map)
+    land_zone.map.save()
+
+    inland = Point(TEST_LNG, TEST_LAT, srid=4326).buffer(0.01)
+    coastal = Point(3.3, TEST_LAT, srid=4326).buffer(0.01)
+    assert is_inland(inland)
+    assert not is_inland(coastal)
+
+    assert trim_land(inland).equals(inland)
+    assert trim_land(coastal).area == pytest.approx(coastal.area / 2, rel=1e-2)
+
+
 def test_bundle_display_geojson(hedge_density_fixture):
     """Display geometry is a MultiLineString."""
     bundle = compute_hedge_densities_around_point(
@@ -237,7 +317,7 @@ def test_query_hedge_length_handles_non_noded_difference(non_noded_geometries):
 def test_query_hedges_display_geojson_handles_non_noded_difference(
     non_noded_geometries,
 ):
-    """Same ST_Difference flaw, same fix, in the display query."""
+    """The display query must survive the same geometries."""
     truncated, circle = non_noded_geometries
     LineFactory(
         geometry=MultiLineString([LineString([(-0.66, 49.06), (-0.661, 49.06)])])
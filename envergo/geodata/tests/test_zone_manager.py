@@ -1,8 +1,11 @@
 import pytest
-from django.contrib.gis.geos import MultiPolygon, Point, Polygon
+from django.contrib.gis.geos import LineString, MultiPolygon, Point, Polygon
+from django.contrib.gis.measure import D
 
-from envergo.geodata.models import MAP_TYPES, Zone
+from envergo.geodata.models import MAP_TYPES, GridCell, Zone, ZonePart
+from envergo.geodata.tasks import index_map
 from envergo.geodata.tests.factories import MapFactory, ZoneFactory
+from envergo.geodata.utils import index_map_grid, subdivide_map_zones
 
 pytestmark = pytest.mark.django_db
 
@@ -251,3 +254,167 @@ class TestFindNearestBatch:
         )
         assert result["near"].pk == zones[0].pk
         assert "far" not in result
+
+
+class TestFindWithinBatch:
+    """Tests for Zone.objects.find_within_batch()."""
+
+    def test_zones_are_matched_with_distance(self):
+        """Each point gets the zones within the radius, closest first."""
+        zones = make_zonage_map(
+            [
+                (MultiPolygon([ZONE_A_POLY]), {"identifiant_zone": "A"}),
+                (MultiPolygon([ZONE_B_POLY]), {"identifiant_zone": "B"}),
+            ]
+        )
+        # Between the two zones, a bit closer to zone A
+        between = Point(3.5, 43.84, srid=EPSG_WGS84)
+        result = Zone.objects.find_within_batch(
+            {"in_a": POINT_IN_A, "between": between}, 50_000
+        )
+        assert [zone.pk for zone in result["in_a"]] == [zones[0].pk]
+        assert result["in_a"][0].distance == 0
+        assert [zone.pk for zone in result["between"]] == [zones[0].pk, zones[1].pk]
+        assert 0 < result["between"][0].distance < result["between"][1].distance
+
+    def test_point_without_zones_has_empty_list(self):
+        """A point far from any zone gets an empty list."""
+        make_zonage_map(
+            [
+                (MultiPolygon([ZONE_A_POLY]), {"identifiant_zone": "A"}),
+            ]
+        )
+        result = Zone.objects.find_within_batch({"p1": POINT_OUTSIDE}, 200)
+        assert result == {"p1": []}
+
+    def test_empty_centroids_returns_empty(self):
+        """An empty input dict returns an empty result."""
+        assert Zone.objects.find_within_batch({}, 200) == {}
+
+
+class TestFindCoveringMapIds:
+    """Tests for Zone.objects.find_covering_map_ids() and the grid index."""
+
+    def test_grid_index_cells(self):
+        """Zones are indexed with full cells inside, and partial cells on borders."""
+        zone = make_zonage_map([(MultiPolygon([ZONE_A_POLY]), {})])[0]
+        index_map_grid(zone.map)
+
+        assert zone.map.grid_indexed
+        cells = GridCell.objects.filter(zone=zone)
+        assert cells.filter(is_full=True).exists()
+        assert cells.filter(is_full=False).exists()
+        assert not cells.exclude(map=zone.map).exists()
+
+    def test_index_map_task(self):
+        """Imported maps are indexed by a separate task, unless being imported."""
+        zone = make_zonage_map([(MultiPolygon([ZONE_A_POLY]), {})])[0]
+        zone.map.task_id = "import-task"
+        zone.map.save()
+
+        index_map(zone.map_id)
+        assert not GridCell.objects.exists()
+
+        zone.map.task_id = None
+        zone.map.save()
+        index_map(zone.map_id)
+
+        zone.map.refresh_from_db()
+        assert zone.map.grid_indexed
+        assert GridCell.objects.filter(zone=zone).exists()
+
+    def test_map_outside_metropolitan_france_is_not_indexed(self):
+        """Maps the grid is not accurate for keep using the exact geometries."""
+        polygon = Polygon(
+            ((55.2, -21.4), (55.8, -21.4), (55.8, -20.9), (55.2, -20.9), (55.2, -21.4)),
+            srid=EPSG_WGS84,
+        )
+        zone = make_zonage_map([(MultiPolygon([polygon]), {})])[0]
+        index_map_grid(zone.map)
+
+        assert not zone.map.grid_indexed
+        assert not GridCell.objects.exists()
+
+        point = Point(55.5, -21.1, srid=EPSG_WGS84)
+        assert Zone.objects.find_covering_map_ids(point) == {zone.map_id}
+
+    @pytest.mark.parametrize("indexed", [True, False])
+    def test_covering_maps(self, indexed):
+        """Indexed and unindexed maps give the same results."""
+        zone_a, zone_b = make_zonage_map(
+            [
+                (MultiPolygon([ZONE_A_POLY]), {}),
+                (MultiPolygon([ZONE_B_POLY]), {}),
+            ]
+        )
+        other_zone = ZoneFactory(
+            map=MapFactory(zones=[]), geometry=MultiPolygon([ZONE_B_POLY])
+        )
+        if indexed:
+            index_map_grid(zone_a.map)
+            zone_a.map.save()
+
+        map_ids = Zone.objects.find_covering_map_ids
+        assert map_ids(POINT_IN_A) == {zone_a.map_id}
+        assert map_ids(POINT_IN_B) == {zone_a.map_id, other_zone.map_id}
+        assert map_ids(POINT_OUTSIDE) == set()
+
+        # Close to the zone A border, in a partially covered cell
+        assert map_ids(Point(2.9001, 43.3, srid=EPSG_WGS84)) == {zone_a.map_id}
+        assert map_ids(Point(2.8999, 43.3, srid=EPSG_WGS84)) == set()
+
+
+class TestZoneParts:
+    """Tests for the zone parts (`ZonePart`) and the spatial helpers."""
+
+    def test_subdivide_map_zones(self):
+        """Zones are subdivided in small parts, with the map type."""
+        circle = POINT_IN_A.buffer(0.5, quadsegs=100)
+        zone = make_zonage_map([(MultiPolygon([circle]), {})])[0]
+        subdivide_map_zones(zone.map)
+
+        assert zone.map.zones_subdivided
+        parts = ZonePart.objects.filter(zone=zone)
+        assert parts.count() > 1
+        assert set(parts.values_list("map_type", flat=True)) == {MAP_TYPES.zonage}
+
+        zone.map.map_type = MAP_TYPES.zone_sensible_ep
+        zone.map.save()
+        assert set(parts.values_list("map_type", flat=True)) == {
+            MAP_TYPES.zone_sensible_ep
+        }
+
+    @pytest.mark.parametrize("subdivided", [True, False])
+    def test_spatial_helpers(self, subdivided):
+        """Subdivided and whole zones give the same results."""
+        circle = POINT_IN_A.buffer(0.5, quadsegs=100)
+        zone_a, zone_b = make_zonage_map(
+            [
+                (MultiPolygon([circle]), {}),
+                (MultiPolygon([ZONE_B_POLY]), {}),
+            ]
+        )
+        if subdivided:
+            subdivide_map_zones(zone_a.map)
+            zone_a.map.save()
+
+        # Between the two zones, a bit closer to zone A
+        between = Point(3.5, 43.84, srid=EPSG_WGS84)
+        line = LineString((3.5, 43.3), (3.5, 44.3), srid=EPSG_WGS84)
+
+        assert set(Zone.objects.covering(POINT_IN_A)) == {zone_a}
+        assert set(Zone.objects.covering(between)) == set()
+        assert set(Zone.objects.intersecting(line)) == {zone_a, zone_b}
+        assert set(Zone.objects.within_distance(between, D(m=10_000))) == {
+            zone_a,
+            zone_b,
+        }
+        assert set(Zone.objects.within_distance(between, 100)) == set()
+
+        result = Zone.objects.find_within_batch({"between": between}, 50_000)
+        assert [zone.pk for zone in result["between"]] == [zone_a.pk, zone_b.pk]
+        result = Zone.objects.find_nearest_batch(
+            {"between": between}, MAP_TYPES.zonage, "44", 50_000
+        )
+        assert result["between"] == zone_a
+        assert Zone.objects.find_covering_map_ids(POINT_IN_A) == {zone_a.map_id}
@@ -1,6 +1,7 @@
 import glob
 import json
 import logging
+import math
 import re
 import sys
 import zipfile
@@ -8,19 +9,35 @@ from contextlib import contextmanager
 from tempfile import TemporaryDirectory
 from typing import TYPE_CHECKING
 
-import numpy as np
 import requests
+import shapely
+from django.conf import settings
 from django.contrib.gis.gdal import DataSource
 from django.contrib.gis.geos import GEOSGeometry, MultiLineString, MultiPolygon, Point
 from django.contrib.gis.utils.layermapping import LayerMapping
+from django.core.cache import cache
 from django.core.serializers import serialize
 from django.db import connection
 from django.db.models import QuerySet
 from django.utils.translation import gettext_lazy as _
-from scipy.interpolate import griddata
 
+from envergo.geodata.catchment import (
+    get_catchment_area_rasters,
+    interpolate_pixel_values,
+    round_area,
+)
 from envergo.geodata.constants import EPSG_LAMB93, EPSG_WGS84
-from envergo.geodata.models import MAP_TYPES, Department, Line, Zone
+from envergo.geodata.density_grid import get_density_error_bound, get_hedge_density_grid
+from envergo.geodata.geocoding import GeocodingError, get_geocoding_cache, round_coords
+from envergo.geodata.locator import get_department_locator
+from envergo.geodata.models import (
+    GRID_CELL_SIZE,
+    MAP_TYPES,
+    ZONE_PART_MAX_VERTICES,
+    ZONE_PARTS_SQL,
+    Line,
+    Zone,
+)
 
 if TYPE_CHECKING:
     from envergo.hedges.models import HedgeList
@@ -274,6 +291,84 @@ def make_polygons_valid(map):
     logger.info("Invalid polygons have been fixed")
 
 
+# Envelope (in lng / lat) of metropolitan France, where the Lambert 93
+# projection used by the grid index is accurate
+METROPOLITAN_EXTENT = (-9.86, 41.15, 10.38, 51.56)
+
+
+def index_map_grid(map):
+    """Reference the map zones in the grid index (see `GridCell`).
+
+    For every zone, we store the grid cells it intersects, and whether the
+    zone fully covers them. Maps that are not entirely in metropolitan France
+    are not indexed, and are always looked up with the exact geometries.
+    """
+
+    logger.info("Indexing zones in the grid")
+    map.grid_cells.all().delete()
+    map.grid_indexed = False
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT ST_Covers(
+              ST_MakeEnvelope(%s, %s, %s, %s, 4326),
+              ST_Extent(geometry::geometry)
+            )
+            FROM geodata_zone
+            WHERE map_id = %s
+            """,
+            [*METROPOLITAN_EXTENT, map.id],
+        )
+        row = cursor.fetchone()
+        if not row[0]:
+            logger.info("The map is outside metropolitan France, skipping")
+            return
+
+        cursor.execute(
+            """
+            INSERT INTO geodata_gridcell (map_id, zone_id, x, y, is_full)
+            SELECT z.map_id, z.id, g.i, g.j, ST_Covers(z.geom, g.geom)
+            FROM (
+              SELECT id, map_id, ST_Transform(geometry::geometry, 2154) AS geom
+              FROM geodata_zone
+              WHERE map_id = %s
+            ) AS z
+            CROSS JOIN LATERAL ST_SquareGrid(%s, z.geom) AS g
+            WHERE ST_Intersects(z.geom, g.geom)
+            """,
+            [map.id, GRID_CELL_SIZE],
+        )
+        logger.info(f"{cursor.rowcount} grid cells have been created")
+
+    map.grid_indexed = True
+
+
+def subdivide_map_zones(map):
+    """Subdivide the map zones in small pieces (see `ZonePart`)."""
+
+    logger.info("Subdividing zones")
+    map.zone_parts.all().delete()
+    map.zones_subdivided = False
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            INSERT INTO geodata_zonepart (zone_id, map_id, map_type, geometry)
+            SELECT z.id, z.map_id, %s, d.geom::geography
+            FROM geodata_zone z
+            CROSS JOIN LATERAL ST_Subdivide(z.geometry::geometry, %s) AS s(geom)
+            CROSS JOIN LATERAL ST_Dump(s.geom) AS d
+            WHERE z.map_id = %s
+            AND ST_GeometryType(d.geom) = 'ST_Polygon'
+            """,
+            [map.map_type, ZONE_PART_MAX_VERTICES, map.id],
+        )
+        logger.info(f"{cursor.rowcount} zone parts have been created")
+
+    map.zones_subdivided = True
+
+
 def to_geojson(obj, geometry_field="geometry"):
     """Return serialized geojson.
 
@@ -300,20 +395,34 @@ def to_geojson(obj, geometry_field="geometry"):
 
 
 def get_data_from_coords(lng, lat, timeout=0.5, index="address", limit=1):
+    """Use ign geocodage api to find the features around the coords.
+
+    Answers are cached (see `envergo.geodata.geocoding`).
+    """
+    lng, lat = round_coords(lng, lat)
+
+    def fetch():
+        return fetch_data_from_coords(lng, lat, timeout, index, limit)
+
+    key = f"ign:{index}:{limit}:{lng}:{lat}"
+    return get_geocoding_cache().get_or_fetch(key, fetch)
+
+
+def fetch_data_from_coords(lng, lat, timeout, index, limit):
     url = f"https://data.geopf.fr/geocodage/reverse?lon={lng}&lat={lat}&index={index}&limit={limit}"  # noqa
 
     if is_test():
         raise NotImplementedError("You should mock this function in tests")
 
-    data = None
     try:
         logger.info("Requesting ign geocodage api", extra={"lng": lng, "lat": lat})
         res = requests.get(url, timeout=timeout)
-        if res.status_code == 200:
-            json = res.json()
-            data = json["features"]
+        res.raise_for_status()
+        json = res.json()
+        data = json["features"]
     except (
         requests.exceptions.RequestException,
+        ValueError,
         KeyError,
         IndexError,
     ) as e:
@@ -321,6 +430,7 @@ def get_data_from_coords(lng, lat, timeout=0.5, index="address", limit=1):
             "An error occured during the request to ign geocodage api",
             extra={"exception": e},
         )
+        raise GeocodingError(e)
 
     return data
 
@@ -346,27 +456,38 @@ def get_address_from_coords(lng, lat, timeout=0.5):
 
 
 def get_commune_from_coords(lng, lat, timeout=0.5):
+    """Use geo.api.gouv.fr to find the name of the commune at the coords.
+
+    Answers are cached (see `envergo.geodata.geocoding`).
+    """
+    lng, lat = round_coords(lng, lat)
+
+    def fetch():
+        return fetch_commune_from_coords(lng, lat, timeout)
+
+    return get_geocoding_cache().get_or_fetch(f"commune:{lng}:{lat}", fetch)
+
+
+def fetch_commune_from_coords(lng, lat, timeout):
     url = f"https://geo.api.gouv.fr/communes?lon={lng}&lat={lat}&fields=code,nom"
 
     if is_test():
         raise NotImplementedError("You should mock this function in tests")
 
-    data = None
     try:
         res = requests.get(url, timeout=timeout)
-        if res.status_code == 200:
-            json = res.json()
-            data = json[0]
-    except (requests.exceptions.Timeout, KeyError, IndexError):
-        pass
+        res.raise_for_status()
+        json = res.json()
+    except (requests.exceptions.RequestException, ValueError) as e:
+        raise GeocodingError(e)
 
-    return data["nom"] if data else None
+    # No commune at these coords (e.g at sea) is a valid answer
+    return json[0]["nom"] if json else None
 
 
 def get_department_from_coords(lng, lat):
     """Get department code from lng lat"""
-    lng_lat = Point(float(lng), float(lat), srid=EPSG_WGS84)
-    department = Department.objects.filter(geometry__contains=lng_lat).first()
+    department = get_department_locator().locate(lng, lat)
 
     return department.department if department else ""
 
@@ -485,6 +606,111 @@ def simplify_lines(map):
     return lines
 
 
+# Leaflet zoom levels for which simplified map geometries are cached. Beyond
+# the max level, the map preview is already as detailed as it can be.
+MAP_DISPLAY_MIN_ZOOM = 5
+MAP_DISPLAY_MAX_ZOOM = 14
+
+# Zoom level used for maps that are fitted to their content
+MAP_DISPLAY_DEFAULT_ZOOM = 12
+
+MAP_DISPLAY_CACHE_TIMEOUT = 60 * 60 * 24 * 30
+
+
+def get_display_zoom(zoom):
+    """Return the cached zoom level to use for a map displayed at `zoom`."""
+
+    if zoom is None:
+        return MAP_DISPLAY_DEFAULT_ZOOM
+    return min(max(zoom, MAP_DISPLAY_MIN_ZOOM), MAP_DISPLAY_MAX_ZOOM)
+
+
+def get_display_tolerance(zoom):
+    """Return the size of a pixel (in degrees) at the given leaflet zoom level."""
+
+    return 360 / (256 * 2**zoom)
+
+
+def get_map_display_cache_key(map, zoom):
+    version = map.import_date.timestamp() if map.import_date else 0
+    return f"map_display_geometry:{map.id}:{version}:{zoom}"
+
+
+def compute_map_display_geometry(map, zoom):
+    """Return the map preview simplified for the given zoom level, as ewkb."""
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT ST_AsEWKB(
+              ST_SimplifyPreserveTopology(geometry::geometry, %s)
+            )
+            FROM geodata_map
+            WHERE id = %s
+            """,
+            [get_display_tolerance(zoom), map.id],
+        )
+        row = cursor.fetchone()
+
+    return bytes(row[0]) if row and row[0] else b""
+
+
+def get_map_display_geometry(map, zoom=None):
+    """Return the map geometry, simplified for display at the given zoom level.
+
+    Maps geometries are large and only change when the map is imported, so the
+    simplified versions are cached (by map id and import date). This way, we
+    don't even need to fetch the map geometry from the db.
+
+    Returns None if the map has no geometry.
+    """
+
+    zoom = get_display_zoom(zoom)
+    key = get_map_display_cache_key(map, zoom)
+    ewkb = cache.get(key)
+    if ewkb is None:
+        ewkb = compute_map_display_geometry(map, zoom)
+        cache.set(key, ewkb, MAP_DISPLAY_CACHE_TIMEOUT)
+
+    return GEOSGeometry(memoryview(ewkb)) if ewkb else None
+
+
+def precompute_map_display_geometries(map):
+    """Fill the cache with the simplified map geometries for every zoom level."""
+
+    logger.info("Caching simplified map geometries")
+    for zoom in range(MAP_DISPLAY_MIN_ZOOM, MAP_DISPLAY_MAX_ZOOM + 1):
+        ewkb = compute_map_display_geometry(map, zoom)
+        cache.set(get_map_display_cache_key(map, zoom), ewkb, MAP_DISPLAY_CACHE_TIMEOUT)
+
+
+def get_bbox_around(point, radius):
+    """Return the (xmin, ymin, xmax, ymax) WGS84 bbox of `radius` meters around a point."""
+
+    dy = radius / 111_320
+    dx = dy / math.cos(math.radians(point.y))
+    return (point.x - dx, point.y - dy, point.x + dx, point.y + dy)
+
+
+def clip_to_bbox(geometry, bbox):
+    """Clip the geometry to the given bbox.
+
+    This is way faster than a regular intersection: the clipping is done in a
+    single pass over the geometry coordinates, and the result may be slightly
+    invalid, which is fine for display purpose.
+    """
+
+    if geometry.empty:
+        return geometry
+
+    xmin, ymin, xmax, ymax = geometry.extent
+    if xmin > bbox[2] or xmax < bbox[0] or ymin > bbox[3] or ymax < bbox[1]:
+        return GEOSGeometry("POLYGON EMPTY", srid=geometry.srid)
+
+    clipped = shapely.clip_by_rect(shapely.from_wkb(bytes(geometry.wkb)), *bbox)
+    return GEOSGeometry(memoryview(shapely.to_wkb(clipped)), srid=geometry.srid)
+
+
 def fill_polygon_stats():
     """Update the main obj with stats from the geometry field.
 
@@ -502,7 +728,13 @@ def fill_polygon_stats():
 
 
 def get_catchment_area(lng, lat):
-    """Return the catchment area of a point."""
+    """Return the catchment area of a point.
+
+    Use the exported rasters when available, and query the db otherwise.
+    """
+    rasters = get_catchment_area_rasters()
+    if rasters is not None:
+        return rasters.get_catchment_area(lng, lat)
 
     pixels = get_catchment_area_pixel_values(lng, lat)
     if not pixels:
@@ -511,14 +743,8 @@ def get_catchment_area(lng, lat):
     # Pixel coords are in the raster's CRS (Lambert 93), so interpolate there.
     lng_lat = Point(float(lng), float(lat), srid=EPSG_WGS84)
     lamb93_coords = lng_lat.transform(EPSG_LAMB93, clone=True)
-
-    coords = [(x, y) for x, y, v in pixels]
-    values = [int(v) for x, y, v in pixels]
-    interpolated_area = griddata(coords, values, lamb93_coords, method="linear")[0]
-    if np.isnan(interpolated_area):
-        interpolated_area = None
-
-    return int(interpolated_area)
+    area = interpolate_pixel_values(lamb93_coords.x, lamb93_coords.y, pixels)
+    return round_area(area)
 
 
 def get_catchment_area_pixel_values(lng, lat):
@@ -541,23 +767,27 @@ def get_catchment_area_pixel_values(lng, lat):
 
     # The usual raster querying methods ST_Value, ST_NearestValue and
     # ST_Neighborhood return value from the raster, but not the coordinates.
-    # So we have to use the alternative ST_PixelAsPoints, which converts
+    # So we have to use the alternative ST_PixelAsCentroids, which converts
     # the raster values into Point geometries, alongside the associated values.
+    # The raster scale is returned too, so the values can be interpolated like
+    # the exported rasters (see `interpolate_pixel_values`).
 
     # To only get the relevant values, we clip the raster with a bounding box
     # around our point using ST_Clip(ST_Envelope(ST_Buffer(…
     pixels = []
     with connection.cursor() as cursor:
         query = """
-        SELECT ST_X(geom), ST_Y(geom), val
+        SELECT ST_X(geom), ST_Y(geom), val, scale_x, scale_y
         FROM (
             SELECT
-            (ST_PixelAsPoints(
+            (ST_PixelAsCentroids(
                 ST_Clip(
                 tiles.rast,
                 envelope
                 )
-            )).*
+            )).*,
+            ST_ScaleX(tiles.rast) AS scale_x,
+            ST_ScaleY(tiles.rast) AS scale_y
             FROM
             geodata_catchmentareatile AS tiles
             CROSS JOIN
@@ -600,6 +830,40 @@ def get_best_epsg_for_location(longitude, latitude) -> int:
     return epsg_code
 
 
+def is_inland(geom):
+    """Return True if the geometry is entirely covered by the land zones.
+
+    Only the grid index is queried (see `GridCell`): the geometry is inland
+    if every cell it intersects is fully covered by a land zone. Geometries
+    close to the coast, or to a hole in the land zones (e.g forests), or in
+    maps that are not indexed are never considered inland.
+    """
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            WITH input AS (
+              SELECT ST_Transform(ST_GeomFromEWKT(%s), 2154) AS geom
+            ),
+            cells AS (
+              SELECT g.i, g.j
+              FROM input i
+              CROSS JOIN LATERAL ST_SquareGrid(%s, i.geom) AS g
+              WHERE ST_Intersects(g.geom, i.geom)
+            )
+            SELECT COUNT(*) > 0 AND bool_and(EXISTS (
+              SELECT 1
+              FROM geodata_gridcell gc
+              JOIN geodata_map m ON gc.map_id = m.id
+              WHERE gc.x = c.i AND gc.y = c.j AND gc.is_full AND m.map_type = %s
+            ))
+            FROM cells c
+            """,
+            [geom.ewkt, GRID_CELL_SIZE, MAP_TYPES.density_reference],
+        )
+        return bool(cursor.fetchone()[0])
+
+
 def trim_land(geom):
     """Keep only the part of the geometry that is in France and not in the sea.
 
@@ -608,13 +872,18 @@ def trim_land(geom):
 
     How the query works:
 
-     - Select all the "Terres emergées" polygons that intersect the geometry
-     - Clip the polygons to the geometry bounding box (cheap operation)
-     - Merge the remaining polygons
+     - Select all the "Terres emergées" pieces that intersect the geometry
+     - Clip the pieces to the geometry bounding box (cheap operation)
+     - Merge the remaining pieces
      - Intersects the merged polygon with the input geometry
 
-    The clipping step is an optimization: it reduces the size of the polygons
-    before merging them (which is a costly operation).
+    Land zones are subdivided in small pieces when the map is imported (see
+    `ZonePart`), and the clipping step reduces their size even more before
+    merging them (which is a costly operation). The zones of the maps that
+    were not subdivided yet are used as is.
+
+    Geometries that are entirely inland (see `is_inland`) are returned
+    without any union.
 
     Returns:
         - the intersection of the input geometry with the union of land zones,
@@ -622,22 +891,26 @@ def trim_land(geom):
         - None if there is no intersection (input is entirely off-land)
     """
 
+    if is_inland(geom):
+        trimmed_geom = geom.clone() if geom.valid else geom.make_valid()
+        trimmed_geom.srid = geom.srid
+        return trimmed_geom
+
     with connection.cursor() as cursor:
         cursor.execute(
             # EWKB: ST_AsText's precision merges near-identical vertices in
             # the microscopic holes left by the tile union (see trim_land doc).
-            """
+            f"""
             WITH input_poly AS (
               SELECT
-                ST_GeomFromEWKT(%s) AS geom,
-                ST_Envelope(ST_GeomFromEWKT(%s)) AS bbox
+                ST_GeomFromEWKT(%(geom)s) AS geom,
+                ST_Envelope(ST_GeomFromEWKT(%(geom)s)) AS bbox
             ),
             clipped AS (
               SELECT ST_MakeValid(ST_ClipByBox2D(z.geometry::geometry, i.bbox)) AS g
-              FROM geodata_zone z
-              JOIN geodata_map m ON z.map_id = m.id
+              FROM {ZONE_PARTS_SQL} z
               JOIN input_poly i ON ST_Intersects(z.geometry, i.geom)
-              WHERE m.map_type = %s
+              WHERE z.map_type = %(map_type)s
             ),
             unioned AS (
               SELECT ST_Union(g) AS merged
@@ -647,7 +920,7 @@ def trim_land(geom):
             SELECT ST_AsEWKB(ST_Intersection(u.merged, i.geom))
             FROM unioned u, input_poly i;
         """,
-            [geom.ewkt, geom.ewkt, MAP_TYPES.density_reference],
+            {"geom": geom.ewkt, "map_type": MAP_TYPES.density_reference},
         )
         ewkb = cursor.fetchone()[0]
 
@@ -672,9 +945,16 @@ def query_hedge_length(truncated_buffer, untruncated_circle):
     toward density. The buffer is a complex polygon; the raw circle is simple.
     Each candidate hedge is measured by one of two paths:
 
-      Fast path — hedge covered by the circle and clear of the excluded
-        (sea / forest) zone: measure it whole, skipping the costly clip.
+      Fast path — hedge covered by the circle and by a single land piece
+        (see `ZonePart`), so inside the buffer: measure it whole, skipping
+        the costly clip.
       Slow path — hedge straddles a boundary: clip to the buffer first.
+        Hedges crossing the seam between two land pieces take this path too,
+        even when they are entirely on land. Their length is the same, the
+        clip is only slower.
+
+    The truncated buffer must be the land-trimmed circle (see `trim_land`),
+    since the fast path tests the land pieces rather than the buffer.
 
     trunc is sanitized (ST_MakeValid + ST_CollectionExtract): land-trimmed
     buffers can carry degenerate holes (see trim_land).
@@ -692,7 +972,7 @@ def query_hedge_length(truncated_buffer, untruncated_circle):
     if truncated_buffer is None or truncated_buffer.empty:
         return 0.0
 
-    sql = """
+    sql = f"""
         -- inputs: the sanitized truncated buffer and the raw circle.
         WITH inputs AS (
             SELECT
@@ -700,25 +980,23 @@ def query_hedge_length(truncated_buffer, untruncated_circle):
                     ST_MakeValid(ST_GeomFromEWKT(%(truncated)s)), 3) AS trunc,
                 ST_GeomFromEWKT(%(circle)s) AS circ
         ),
-        -- zones: adds the excluded area (circle minus buffer = sea / forest).
-        zones AS (
-            SELECT trunc, circ,
-                ST_Difference(ST_MakeValid(circ), trunc) AS excluded
-            FROM inputs
-        ),
         -- candidates: hedges inside the circle, with fast/slow path flag.
         candidates AS (
             SELECT
                 l.geometry::geometry AS hedge,
-                zones.trunc,
-                ST_CoveredBy(l.geometry, zones.circ)
-                    AND NOT ST_Intersects(l.geometry, zones.excluded)
-                        AS fully_inside
+                inputs.trunc,
+                ST_CoveredBy(l.geometry, inputs.circ)
+                    AND EXISTS (
+                        SELECT 1
+                        FROM {ZONE_PARTS_SQL} p
+                        WHERE p.map_type = %(land_map_type)s
+                        AND ST_CoveredBy(l.geometry, p.geometry)
+                    ) AS fully_inside
             FROM geodata_line l
             JOIN geodata_map m ON l.map_id = m.id
-            CROSS JOIN zones
+            CROSS JOIN inputs
             WHERE m.map_type = %(map_type)s
-              AND ST_Intersects(l.geometry, zones.circ)
+              AND ST_Intersects(l.geometry, inputs.circ)
         )
         SELECT COALESCE(SUM(ST_LengthSpheroid(
             CASE WHEN fully_inside THEN hedge
@@ -735,6 +1013,7 @@ def query_hedge_length(truncated_buffer, untruncated_circle):
                 "truncated": truncated_buffer.ewkt,
                 "circle": untruncated_circle.ewkt,
                 "map_type": MAP_TYPES.haies,
+                "land_map_type": MAP_TYPES.density_reference,
                 "spheroid": WGS84_SPHEROID,
             },
         )
@@ -744,46 +1023,47 @@ def query_hedge_length(truncated_buffer, untruncated_circle):
 def query_hedges_display_geojson(truncated_buffer, untruncated_circle):
     """Return hedge geometries clipped to the truncated buffer for display.
 
-    Uses the same CTE excluded-zone strategy as `query_hedge_length` — see
-    its docstring for the trunc sanitization and the ::geometry casts:
+    Uses the same strategy as `query_hedge_length` — see its docstring for
+    the land pieces, the trunc sanitization and the ::geometry casts:
 
-      Fast path — hedge fully inside the truncated buffer (covered by the
-        simple circle and not touching the excluded zone): return as-is.
+      Fast path — hedge covered by the circle and by a single land piece:
+        return as-is.
 
-      Slow path — hedge crosses a boundary (coast, forest, circle edge):
-        clip against the truncated buffer via ST_Intersection.
+      Slow path — hedge crosses a boundary (coast, circle edge, land piece
+        seam): clip against the truncated buffer via ST_Intersection.
 
     Returns a parsed MultiLineString dict, or None if no hedges match.
     """
 
-    sql = """
+    sql = f"""
         WITH inputs AS (
             SELECT
                 ST_CollectionExtract(
                     ST_MakeValid(ST_GeomFromEWKT(%(truncated)s)), 3) AS trunc,
                 ST_GeomFromEWKT(%(circle)s) AS circ
-        ),
-        zones AS (
-            SELECT trunc, circ,
-                ST_Difference(ST_MakeValid(circ), trunc) AS excluded
-            FROM inputs
         )
         SELECT ST_AsGeoJSON(ST_CollectionExtract(ST_Collect(
             CASE
-                WHEN ST_CoveredBy(l.geometry, zones.circ)
-                     AND NOT ST_Intersects(l.geometry, zones.excluded)
+                WHEN ST_CoveredBy(l.geometry, inputs.circ)
+                     AND EXISTS (
+                        SELECT 1
+                        FROM {ZONE_PARTS_SQL} p
+                        WHERE p.map_type = %(land_map_type)s
+                        AND ST_CoveredBy(l.geometry, p.geometry)
+                     )
                 THEN l.geometry::geometry
-                ELSE ST_Intersection(l.geometry::geometry, zones.trunc)
+                ELSE ST_Intersection(l.geometry::geometry, inputs.trunc)
             END
         ), 2))
         FROM geodata_line l
         JOIN geodata_map m ON l.map_id = m.id
-        CROSS JOIN zones
+        CROSS JOIN inputs
         WHERE m.map_type = %(map_type)s
-          AND ST_Intersects(l.geometry, zones.circ);
+          AND ST_Intersects(l.geometry, inputs.circ);
     """
     params = {
         "map_type": MAP_TYPES.haies,
+        "land_map_type": MAP_TYPES.density_reference,
         "truncated": truncated_buffer.ewkt,
         "circle": untruncated_circle.ewkt,
     }
@@ -841,6 +1121,51 @@ def area_in_ha(geom, epsg_utm):
     return geom.transform(epsg_utm, clone=True).area * 0.0001
 
 
+def compute_hedge_density_on_grid(grid, circle, epsg_utm):
+    """Compute the hedge density in the circle from the precomputed grid.
+
+    The cells inside the circle are summed. The cells crossed by the circle
+    boundary are counted in proportion of their area inside the circle if
+    the error bound of the resulting density is under
+    `HEDGE_DENSITY_GRID_TOLERANCE` (see `get_density_error_bound`).
+    Otherwise, the ring between the inner cells and the circle is trimmed to
+    land and its hedges are measured, just like the whole circle would be.
+
+    Returns None if the circle is not covered by the grid.
+    """
+
+    cells = grid.get_circle_cells(circle)
+    if cells is None:
+        return None
+
+    length = cells["length"] + cells["boundary_length"]
+    area = cells["area"] + cells["boundary_area"]
+    error = get_density_error_bound(cells)
+    if error > settings.HEDGE_DENSITY_GRID_TOLERANCE:
+        ring = GEOSGeometry(
+            memoryview(shapely.to_wkb(cells["inner_cells"])), srid=EPSG_WGS84
+        )
+        ring = circle.difference(ring) if not ring.empty else circle
+        ring.srid = EPSG_WGS84
+        truncated_ring = trim_land(ring)
+        length = cells["length"] + query_hedge_length(truncated_ring, ring)
+        area = cells["area"] + area_in_ha(truncated_ring, epsg_utm) * 10000
+        error = 0.0
+
+    ha = area * 0.0001
+    return {
+        "density": length / ha if ha > 0 else 1.0,
+        "artifacts": {
+            "circle": circle,
+            "truncated_circle": None,
+            "length": length,
+            "area_ha": ha,
+            "mode": "grid",
+            "error": error,
+        },
+    }
+
+
 def compute_hedge_densities_around_point(
     point_geos,
     radii,
@@ -855,6 +1180,11 @@ def compute_hedge_densities_around_point(
      - get the hedges length inside that circle
      - divide length by land area to get density
 
+    Radii of at least `HEDGE_DENSITY_GRID_MIN_RADIUS` are computed from the
+    precomputed density grid when it's available (see `geodata.density_grid`).
+    Their `truncated_circle` artifact is None, and their `error` artifact is
+    the bound of the relative error of the density.
+
     Returns {radius: {"density", "artifacts": {...}}, "display_geojson": ...}.
     Off-land radii get the sentinel (density=1.0, length=0, area_ha=0).
     """
@@ -865,14 +1195,24 @@ def compute_hedge_densities_around_point(
 
     # Build the multiple land-intersecting circle geometries
     circles, epsg_utm = build_circles(point_geos, radii)
-    truncated = trim_circles_to_land(circles)
     max_circle = circles[max(radii)]
 
+    result = {}
+    grid = get_hedge_density_grid()
+    if grid is not None:
+        for r in radii:
+            if r >= settings.HEDGE_DENSITY_GRID_MIN_RADIUS:
+                density = compute_hedge_density_on_grid(grid, circles[r], epsg_utm)
+                if density is not None:
+                    result[r] = density
+
+    radii = [r for r in radii if r not in result]
+    truncated = trim_circles_to_land({r: circles[r] for r in radii}) if radii else {}
+
     # One length query per radius, each focused on its own hedge set
     lengths = {r: query_hedge_length(truncated[r], circles[r]) for r in radii}
 
     # Build the result dict
-    result = {}
     for r in radii:
         ha = area_in_ha(truncated[r], epsg_utm)
         density = lengths[r] / ha if truncated[r] and ha > 0 else 1.0
@@ -883,12 +1223,13 @@ def compute_hedge_densities_around_point(
                 "truncated_circle": truncated[r],
                 "length": lengths[r],
                 "area_ha": ha,
+                "mode": "exact",
+                "error": 0.0,
             },
         }
 
     if include_display_geojson:
-        max_r = max(radii)
-        display_truncated = truncated[max_r] or max_circle
+        display_truncated = truncated.get(max(circles)) or max_circle
         result["display_geojson"] = query_hedges_display_geojson(
             display_truncated, max_circle
         )
@@ -71,6 +71,6 @@ class ZoneSearch(View):
             geometry.transform(EPSG_WGS84)
         logger.info(geometry)
 
-        qs = Zone.objects.filter(geometry__intersects=geometry)
+        qs = Zone.objects.intersecting(geometry)
         data = serialize("geojson", qs, geometry_field="geometry", fields=["code"])
         return HttpResponse(data, content_type="application/json")
@@ -0,0 +1,104 @@
+"""Shared cache for the hedge densities.
+
+Computing the density of hedges around a project means trimming circles or
+buffers to the land zones, then summing the length of the reference hedges
+inside, which are the most expensive queries of a hedge simulation.
+
+The results are stored in the `_density` field of each `HedgeData`, but a new
+`HedgeData` is created every time the hedges are edited, and for every
+alternative or simulation of the same project. So the results are also stored
+in the django cache, shared between all the projects, and keyed by:
+
+ - a fingerprint of the hedges geometries (rounded coordinates, so hedges
+   with the same geometry share the same result whatever their ids) ;
+ - the kind of density and the radii ;
+ - the computation mode, since densities estimated from the density grid
+   differ slightly from the exact ones (see `geodata.density_grid`) ;
+ - a version of the reference maps (land zones and hedges), so a new map
+   import makes all the existing entries unreachable.
+
+Entries expire after `HEDGE_DENSITY_CACHE_TIMEOUT` seconds, and are evicted by
+the cache backend when it's full.
+"""
+
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.utils.functional import cached_property
+
+from envergo.geodata.models import MAP_TYPES, Map
+
+# 6 decimals is roughly 10cm, way below the precision of the density maps
+COORDS_PRECISION = 6
+
+
+def get_reference_maps_version():
+    """Return a token identifying the current version of the density maps."""
+
+    maps = Map.objects.filter(
+        map_type__in=[MAP_TYPES.density_reference, MAP_TYPES.haies]
+    ).aggregate(
+        count=Count("id"),
+        last_created=Max("created_at"),
+        last_import=Max("import_date"),
+    )
+    version = "{count}:{last_created}:{last_import}".format(**maps)
+    return hashlib.sha256(version.encode()).hexdigest()[:16]
+
+
+def hedges_fingerprint(hedges):
+    """Return a canonical hash of the hedges geometries.
+
+    The hedges ids, order and properties are ignored, since the density only
+    depends on the geometries.
+    """
+    lines = sorted(
+        [
+            [
+                round(latLng["lng"], COORDS_PRECISION),
+                round(latLng["lat"], COORDS_PRECISION),
+            ]
+            for latLng in hedge.latLngs
+        ]
+        for hedge in hedges
+    )
+    return hashlib.sha256(json.dumps(lines).encode()).hexdigest()
+
+
+class HedgeDensityCache:
+    """Read and write the cached density of a set of hedges."""
+
+    def __init__(self, kind, radii, hedges, mode="exact"):
+        self.kind = kind
+        self.radii = radii
+        self.hedges = hedges
+        self.mode = mode
+
+    def is_enabled(self):
+        return settings.HEDGE_DENSITY_CACHE_TIMEOUT > 0
+
+    @cached_property
+    def key(self):
+        radii = "-".join(str(radius) for radius in self.radii)
+        return (
+            f"hedges:density:{self.kind}:{radii}:{self.mode}:"
+            f"{get_reference_maps_version()}:"
+            f"{hedges_fingerprint(self.hedges)}"
+        )
+
+    def get(self):
+        """Return the cached density, or None."""
+
+        if not self.is_enabled():
+            return None
+
+        return cache.get(self.key)
+
+    def set(self, density):
+        if not self.is_enabled():
+            return
+
+        cache.set(self.key, density, settings.HEDGE_DENSITY_CACHE_TIMEOUT)
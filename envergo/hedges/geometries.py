@@ -0,0 +1,91 @@
+"""Vectorized hedge geometries.
+
+The hedges of a `HedgeData` are measured over and over: the length of the
+hedges to remove, to plant, of each category, their centroids… Measuring
+them one by one means one shapely geometry and one geodesic computation per
+hedge and per call.
+
+Instead, the coordinates of all the hedges are packed in a single numpy
+array, and the lines, lengths and bounds of every hedge are computed in a
+single vectorized pass, the first time one of them is needed. Aggregates over
+a subset of hedges are then simple array reductions, and the centroids of
+subsets are only computed once.
+"""
+
+import numpy as np
+import shapely
+from pyproj import Geod
+
+_geod = Geod(ellps="WGS84")
+
+
+class HedgeGeometries:
+    """The geometries of a list of hedges, packed in numpy arrays."""
+
+    def __init__(self, hedges):
+        self.hedges = hedges
+        self.computed = False
+        for index, hedge in enumerate(hedges):
+            hedge._geometries = self
+            hedge._index = index
+
+    def compute(self):
+        """Compute the lines, lengths and bounds of all the hedges."""
+
+        if self.computed:
+            return
+
+        counts = np.array([len(h.latLngs) for h in self.hedges], dtype=np.int64)
+        self.offsets = np.concatenate([[0], np.cumsum(counts)])
+        self.coords = np.array(
+            [
+                (latLng["lng"], latLng["lat"])
+                for hedge in self.hedges
+                for latLng in hedge.latLngs
+            ],
+            dtype=np.float64,
+        ).reshape(-1, 2)
+        indices = np.repeat(np.arange(len(self.hedges)), counts)
+
+        self.lines = shapely.linestrings(self.coords, indices=indices)
+        self.bounds = shapely.bounds(self.lines)
+        self.centroids = {}
+
+        # Geodesic length of every segment, ignoring the segments joining the
+        # last point of a hedge to the first point of the next one
+        lngs, lats = self.coords[:, 0], self.coords[:, 1]
+        _az, _back_az, distances = _geod.inv(lngs[:-1], lats[:-1], lngs[1:], lats[1:])
+        same_hedge = indices[:-1] == indices[1:]
+        self.lengths = np.bincount(
+            indices[:-1][same_hedge],
+            weights=distances[same_hedge],
+            minlength=len(self.hedges),
+        )
+
+        for hedge, line, length in zip(self.hedges, self.lines, self.lengths):
+            hedge._geometry = line
+            hedge._length = float(length)
+        self.computed = True
+
+    def length(self, indices):
+        """Total geodesic length (in meters) of the given hedges."""
+        self.compute()
+        return float(self.lengths[indices].sum())
+
+    def bounds_of(self, indices):
+        """The (min_x, min_y, max_x, max_y) bounds of the given hedges."""
+        self.compute()
+        bounds = self.bounds[indices]
+        return (
+            *bounds[:, :2].min(axis=0).tolist(),
+            *bounds[:, 2:].max(axis=0).tolist(),
+        )
+
+    def centroid(self, indices):
+        """Centroid of the union of the given hedges, as a shapely Point."""
+        self.compute()
+        key = tuple(indices)
+        if key not in self.centroids:
+            union = shapely.union_all(self.lines[indices])
+            self.centroids[key] = shapely.centroid(union)
+        return self.centroids[key]
@@ -6,8 +6,8 @@ from functools import cached_property, reduce
 from textwrap import dedent
 from typing import Self
 
+import numpy as np
 from django.conf import settings
-from django.contrib.gis.db.models.functions import Intersection, Length
 from django.contrib.gis.geos import GEOSGeometry, MultiLineString, Polygon
 from django.contrib.gis.measure import D
 from django.contrib.postgres.fields import ArrayField
@@ -27,17 +27,23 @@ from django.db.models import (
 from django.utils import timezone
 from model_utils import Choices
 from pyproj import Geod
-from shapely import LineString, centroid, union_all
+from shapely import LineString, centroid, multilinestrings, union_all
 
 from envergo.geodata.constants import EPSG_WGS84
-from envergo.geodata.models import MAP_TYPES, Department, Zone
+from envergo.geodata.density_grid import get_density_mode
+from envergo.geodata.locator import get_department_locator
+from envergo.geodata.models import MAP_TYPES, Zone
 from envergo.geodata.utils import (
     compute_hedge_densities_around_point,
     compute_hedge_density_around_lines,
     get_department_from_coords,
 )
+from envergo.hedges.density import HedgeDensityCache
+from envergo.hedges.geometries import HedgeGeometries
 from envergo.utils.fields import EnrichedChoices
 
+_geod = Geod(ellps="WGS84")
+
 TO_PLANT = "TO_PLANT"
 TO_REMOVE = "TO_REMOVE"
 
@@ -131,16 +137,40 @@ class HedgeCategory(EnrichedChoices):
 
 
 class Hedge:
-    """Represent a single hedge."""
+    """Represent a single hedge.
+
+    Hedges are shared between all the users of a `HedgeData` (see
+    `HedgeData.hedges`), so their geometries are only computed once, when
+    first needed.
+    """
+
+    __slots__ = (
+        "id",
+        "latLngs",
+        "type",
+        "additionalData",
+        "_geometry",
+        "_geos_geometry",
+        "_geos_centroid",
+        "_length",
+        "_geometries",
+        "_index",
+    )
 
     def __init__(self, id, latLngs, type, additionalData=None):
         self.id = id  # The edge reference, e.g A1, A2…
         self.latLngs = latLngs
-        self.geometry = LineString(
-            [(latLng["lng"], latLng["lat"]) for latLng in latLngs]
-        )
         self.type = type
-        self.additionalData = additionalData or {}
+        # Keep a reference to the original dict, so in place edits of the
+        # hedge data are visible
+        self.additionalData = additionalData if additionalData is not None else {}
+        self._geometry = None
+        self._geos_geometry = None
+        self._geos_centroid = None
+        self._length = None
+        # Set when the hedge belongs to a `HedgeData` (see `HedgeGeometries`)
+        self._geometries = None
+        self._index = None
 
     def toDict(self):
         """Export hedge data back as a dict.
@@ -153,23 +183,42 @@ class Hedge:
             "latLngs": self.latLngs,
         }
 
+    @property
+    def geometry(self):
+        """The hedge line as a shapely LineString (WGS84)."""
+        if self._geometry is None:
+            if self._geometries is not None:
+                self._geometries.compute()
+            else:
+                self._geometry = LineString(
+                    [(latLng["lng"], latLng["lat"]) for latLng in self.latLngs]
+                )
+        return self._geometry
+
     @property
     def geos_geometry(self):
-        geom = GEOSGeometry(self.geometry.wkt, srid=EPSG_WGS84)
-        return geom
+        if self._geos_geometry is None:
+            self._geos_geometry = GEOSGeometry(
+                memoryview(self.geometry.wkb), srid=EPSG_WGS84
+            )
+        return self._geos_geometry
 
     @property
     def geos_centroid(self):
         """Centroid of the hedge line as a GEOSGeometry point (WGS84)."""
-        return self.geos_geometry.centroid
+        if self._geos_centroid is None:
+            self._geos_centroid = self.geos_geometry.centroid
+        return self._geos_centroid
 
     @property
     def length(self):
         """Returns the geodesic length (in meters) of the line."""
-
-        geod = Geod(ellps="WGS84")
-        length = geod.geometry_length(self.geometry)
-        return length
+        if self._length is None:
+            if self._geometries is not None:
+                self._geometries.compute()
+            else:
+                self._length = _geod.geometry_length(self.geometry)
+        return self._length
 
     def has_property(self, property_name):
         """Check if the hedge has a specific property."""
@@ -284,6 +333,63 @@ class Hedge:
         ]
 
 
+class HedgeIndex:
+    """Classification of a list of hedges, computed in a single pass.
+
+    Filtering a `HedgeList` means checking the type, category and properties
+    of every hedge, and evaluators filter the same hedges over and over. So
+    those are computed once for all the hedges of a list, as boolean arrays,
+    and every list filtered from it selects positions in those arrays.
+    """
+
+    def __init__(self, hedges):
+        self.hedges = tuple(hedges)
+        self.to_plant = np.array([h.type == TO_PLANT for h in self.hedges], dtype=bool)
+        self.to_remove = np.array(
+            [h.type == TO_REMOVE for h in self.hedges], dtype=bool
+        )
+        self.hedge_types = np.array([h.hedge_type for h in self.hedges], dtype=object)
+        self.categories = np.array([h.category for h in self.hedges], dtype=object)
+        self.pac = np.array(
+            [
+                h.is_on_pac
+                and h.hedge_type != HedgeTypeBase.ALIGNEMENT
+                and (
+                    not h.has_property("mode_plantation")
+                    or h.prop("mode_plantation") == "plantation"
+                )
+                for h in self.hedges
+            ],
+            dtype=bool,
+        )
+        self.props = {}
+
+    def prop(self, p):
+        """Hedges with the property, or without the property defined."""
+        if p not in self.props:
+            self.props[p] = np.array(
+                [bool(h.prop(p)) or not h.has_property(p) for h in self.hedges],
+                dtype=bool,
+            )
+        return self.props[p]
+
+    def no_prop(self, p):
+        """Hedges without the property, or without the property defined."""
+        key = f"!{p}"
+        if key not in self.props:
+            self.props[key] = np.array(
+                [not h.prop(p) or not h.has_property(p) for h in self.hedges],
+                dtype=bool,
+            )
+        return self.props[key]
+
+    def sublist(self, positions) -> HedgeList:
+        hedges = HedgeList([self.hedges[i] for i in positions])
+        hedges._hedge_index = self
+        hedges._positions = positions
+        return hedges
+
+
 class HedgeList(list[Hedge]):
     """A class representing a list of Hedge objects.
 
@@ -293,82 +399,186 @@ class HedgeList(list[Hedge]):
     "vieilArbre" property:
 
     hedges = HedgeList(hedges).to_remove().mixte().prop("vieilArbre")
+
+    Filters rely on a `HedgeIndex`, computed the first time the list is
+    filtered (or along with the hedges, see `HedgeData.hedges`), and shared by
+    all the lists filtered from it. Adding, removing or replacing hedges in the
+    list drops its index, which is computed again on the next filter. But
+    hedges edited in place once the list is filtered are not filtered again.
     """
 
     def __init__(self, *args, label=None, **kwargs):
         self.label = label
+        self._hedge_index = None
+        self._positions = None
         super().__init__(*args, **kwargs)
 
+    def get_hedge_index(self):
+        """Return the index of the hedges, and the positions of this list in it."""
+        if self._hedge_index is None:
+            self._hedge_index = HedgeIndex(self)
+            self._positions = np.arange(len(self))
+        return self._hedge_index, self._positions
+
+    def _drop_hedge_index(self):
+        self._hedge_index = None
+        self._positions = None
+
+    def __setitem__(self, key, value):
+        self._drop_hedge_index()
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self._drop_hedge_index()
+        super().__delitem__(key)
+
+    def __iadd__(self, other):
+        self._drop_hedge_index()
+        return super().__iadd__(other)
+
+    def __imul__(self, n):
+        self._drop_hedge_index()
+        return super().__imul__(n)
+
+    def append(self, hedge):
+        self._drop_hedge_index()
+        super().append(hedge)
+
+    def extend(self, hedges):
+        self._drop_hedge_index()
+        super().extend(hedges)
+
+    def insert(self, i, hedge):
+        self._drop_hedge_index()
+        super().insert(i, hedge)
+
+    def remove(self, hedge):
+        self._drop_hedge_index()
+        super().remove(hedge)
+
+    def pop(self, i=-1):
+        self._drop_hedge_index()
+        return super().pop(i)
+
+    def clear(self):
+        self._drop_hedge_index()
+        super().clear()
+
+    def sort(self, *args, **kwargs):
+        self._drop_hedge_index()
+        super().sort(*args, **kwargs)
+
+    def reverse(self):
+        self._drop_hedge_index()
+        super().reverse()
+
+    def select(self, flags) -> Self:
+        """Return the hedges of the list for which the index flag is set."""
+        index, positions = self.get_hedge_index()
+        return index.sublist(positions[flags[positions]])
+
+    def union(self, *others) -> Self:
+        """Concatenate lists, keeping the index when they share the same one."""
+        lists = (self, *others)
+        index = self.get_hedge_index()[0]
+        if all(hedges.get_hedge_index()[0] is index for hedges in lists):
+            return index.sublist(np.concatenate([h._positions for h in lists]))
+        return HedgeList([hedge for hedges in lists for hedge in hedges])
+
+    def copy(self) -> Self:
+        index, positions = self.get_hedge_index()
+        return index.sublist(positions)
+
+    def get_geometries(self):
+        """Return the `HedgeGeometries` shared by all the hedges, or None."""
+        geometries = self[0]._geometries if self else None
+        if geometries is None or any(h._geometries is not geometries for h in self):
+            return None
+        return geometries
+
+    @property
+    def indices(self):
+        return [h._index for h in self]
+
     @property
     def names(self):
         return ", ".join(h.id for h in self)
 
     @property
     def length(self):
+        geometries = self.get_geometries()
+        if geometries is not None:
+            return geometries.length(self.indices)
         return sum(h.length for h in self)
 
+    @property
+    def bounds(self):
+        """Returns the (min_x, min_y, max_x, max_y) bounds of the hedges."""
+        geometries = self.get_geometries()
+        if geometries is not None:
+            return geometries.bounds_of(self.indices)
+        return union_all([h.geometry for h in self]).bounds
+
     @property
     def centroid(self):
         """Returns centroid"""
+        geometries = self.get_geometries()
+        if geometries is not None:
+            return geometries.centroid(self.indices)
+
         geometries = [h.geometry for h in self]
         hedges_centroid = centroid(union_all(geometries))
         return hedges_centroid
 
     def to_plant(self) -> Self:
-        return HedgeList([h for h in self if h.type == TO_PLANT])
+        return self.select(self.get_hedge_index()[0].to_plant)
 
     def to_remove(self) -> Self:
-        return HedgeList([h for h in self if h.type == TO_REMOVE])
+        return self.select(self.get_hedge_index()[0].to_remove)
 
     def pac(self) -> Self:
-        return HedgeList(
-            [
-                h
-                for h in self
-                if h.is_on_pac
-                and h.hedge_type != HedgeTypeBase.ALIGNEMENT
-                and (
-                    not h.has_property("mode_plantation")
-                    or h.prop("mode_plantation") == "plantation"
-                )
-            ]
-        )
+        return self.select(self.get_hedge_index()[0].pac)
+
+    def hedge_type_is(self, hedge_type) -> Self:
+        return self.select(self.get_hedge_index()[0].hedge_types == hedge_type)
 
     def mixte(self) -> Self:
-        return HedgeList([h for h in self if h.hedge_type == HedgeTypeBase.MIXTE])
+        return self.hedge_type_is(HedgeTypeBase.MIXTE)
 
     def arbustive(self) -> Self:
-        return HedgeList([h for h in self if h.hedge_type == HedgeTypeBase.ARBUSTIVE])
+        return self.hedge_type_is(HedgeTypeBase.ARBUSTIVE)
 
     def buissonnante(self) -> Self:
-        return HedgeList(
-            [h for h in self if h.hedge_type == HedgeTypeBase.BUISSONNANTE]
-        )
+        return self.hedge_type_is(HedgeTypeBase.BUISSONNANTE)
 
     def degradee(self) -> Self:
-        return HedgeList([h for h in self if h.hedge_type == HedgeTypeBase.DEGRADEE])
+        return self.hedge_type_is(HedgeTypeBase.DEGRADEE)
 
     def alignement(self) -> Self:
-        return HedgeList([h for h in self if h.hedge_type == HedgeTypeBase.ALIGNEMENT])
+        return self.hedge_type_is(HedgeTypeBase.ALIGNEMENT)
 
     def n_alignement(self) -> Self:
         """Select all hedges that are of ALL types BUT alignement.
 
         Useful because we often need to separate "haies" from "alignements d'arbres".
         """
-        return HedgeList([h for h in self if h.hedge_type != HedgeTypeBase.ALIGNEMENT])
+        index = self.get_hedge_index()[0]
+        return self.select(index.hedge_types != HedgeTypeBase.ALIGNEMENT)
+
+    def category_is(self, category) -> Self:
+        return self.select(self.get_hedge_index()[0].categories == category)
 
     def ru(self) -> Self:
         """Select all hedges that are covered by the single procedure (régime unique, RU)."""
-        return HedgeList([h for h in self if h.category == HedgeCategory.ru])
+        return self.category_is(HedgeCategory.ru)
 
     def l350_3(self) -> Self:
         """Select all tree alignment that are covered the L350-3 regulation."""
-        return HedgeList([h for h in self if h.category == HedgeCategory.l350_3])
+        return self.category_is(HedgeCategory.l350_3)
 
     def hru(self) -> Self:
         """Select all hedges are not covered by either the single procedure or L350-3"""
-        return HedgeList([h for h in self if h.category == HedgeCategory.hru])
+        return self.category_is(HedgeCategory.hru)
 
     def to_multilinestring(self):
         """Return a MultiLineString combining all hedges in this list."""
@@ -385,10 +595,11 @@ class HedgeList(list[Hedge]):
         if t.replace("!", "") not in HedgeTypeBase.values:
             raise ValueError(f"Argument hedge_type must be in {HedgeTypeBase}")
 
+        index = self.get_hedge_index()[0]
         if t.startswith("!"):
-            hedges = HedgeList([h for h in self if h.hedge_type != t.replace("!", "")])
+            hedges = self.select(index.hedge_types != t.replace("!", ""))
         else:
-            hedges = HedgeList([h for h in self if h.hedge_type == t])
+            hedges = self.select(index.hedge_types == t)
         return hedges
 
     def prop(self, p) -> Self:
@@ -397,13 +608,11 @@ class HedgeList(list[Hedge]):
         IMPORTANT! We don't filter out the hedges that DO NOT feature the property.
         """
 
+        index = self.get_hedge_index()[0]
         if p.startswith("!"):
-            p = p.replace("!", "")
-            hedges = HedgeList(
-                [h for h in self if not h.prop(p) or not h.has_property(p)]
-            )
+            hedges = self.select(index.no_prop(p.replace("!", "")))
         else:
-            hedges = HedgeList([h for h in self if h.prop(p) or not h.has_property(p)])
+            hedges = self.select(index.prop(p))
         return hedges
 
     def evaluator_category(self, single_procedure, category) -> Self:
@@ -418,7 +627,7 @@ class HedgeList(list[Hedge]):
         """
         if not single_procedure:
             if category == HedgeCategory.hru:
-                return HedgeList(self)
+                return self.copy()
             else:
                 return HedgeList()
 
@@ -438,12 +647,12 @@ class HedgeList(list[Hedge]):
                 return hru
             if not has_ru and not has_l350_3:
                 # Only one category (HRU): all hedges to plant are categorized as HRU
-                return HedgeList(self)
+                return self.copy()
             if not has_ru:
                 # Two categories (HRU and L350-3): RU to plant are categorized as HRU
-                return HedgeList(hru + ru)
+                return hru.union(ru)
             # Two categories (HRU and RU): L350-3 to plant are categorized as HRU
-            return HedgeList(hru + l350_3)
+            return hru.union(l350_3)
         elif category == HedgeCategory.ru:
             if not has_ru:
                 return HedgeList()
@@ -452,15 +661,15 @@ class HedgeList(list[Hedge]):
                 return ru
             if has_l350_3:
                 # Two categories (RU and L350-3): HRU to plant are categorized as RU
-                return HedgeList(hru + ru)
+                return hru.union(ru)
             # Only one category (RU): all hedges to plant are categorized as RU
-            return HedgeList(self)
+            return self.copy()
         elif category == HedgeCategory.l350_3:
             if not has_l350_3:
                 return HedgeList()
             if not has_hru and not has_ru:
                 # Only one category (L350-3): all hedges to plant are categorized as L350-3
-                return HedgeList(self)
+                return self.copy()
             # HRU or RU also present (absorbs orphans): return only L350-3
             return l350_3
 
@@ -507,6 +716,8 @@ class HedgeData(models.Model):
             self._length_to_plant = None
             if hasattr(self, "_departments_lengths"):
                 del self._departments_lengths
+            if hasattr(self, "_hedges_cache"):
+                del self._hedges_cache
             self._length_to_remove = self.length_to_remove()
             self._length_to_plant = self.length_to_plant()
 
@@ -519,18 +730,30 @@ class HedgeData(models.Model):
     def get_bounding_box(self, hedges):
         """Return the bounding box of the given hedge set."""
 
-        min_x, min_y, max_x, max_y = hedges[0].geometry.bounds
-        for hedge in hedges[1:]:
-            x0, y0, x1, y1 = hedge.geometry.bounds
-            min_x = min(min_x, x0)
-            min_y = min(min_y, y0)
-            max_x = max(max_x, x1)
-            max_y = max(max_y, y1)
-        box = Polygon.from_bbox([min_x, min_y, max_x, max_y])
+        box = Polygon.from_bbox(HedgeList(hedges).bounds)
         return box
 
     def hedges(self):
-        return HedgeList([Hedge(**h) for h in self.data])
+        """Return the list of hedges.
+
+        Hedges, and their `HedgeIndex`, are only built once, until `data` is
+        replaced or edited (hedges added, removed or replaced). Every call
+        returns a new list, so callers can alter it.
+        """
+        items = tuple(self.data)
+        cached = getattr(self, "_hedges_cache", None)
+        if (
+            cached is None
+            or cached[0] is not self.data
+            or len(cached[1]) != len(items)
+            or any(a is not b for a, b in zip(cached[1], items))
+        ):
+            hedges = tuple(Hedge(**h) for h in items)
+            HedgeGeometries(hedges)
+            cached = (self.data, items, HedgeIndex(hedges))
+            self._hedges_cache = cached
+        index = cached[2]
+        return index.sublist(np.arange(len(index.hedges)))
 
     def hedges_to_plant(self):
         return self.hedges().to_plant()
@@ -560,9 +783,7 @@ class HedgeData(models.Model):
 
     def get_centroid_to_remove(self):
         """Returns hedges to remove centroid"""
-        hedges_to_remove_geometries = [h.geometry for h in self.hedges_to_remove()]
-        hedges_centroid = centroid(union_all(hedges_to_remove_geometries))
-        return hedges_centroid
+        return self.hedges_to_remove().centroid
 
     @cached_property
     def department_code(self):
@@ -648,7 +869,8 @@ class HedgeData(models.Model):
 
         Callers pass the hedge subset they evaluate (typically the evaluator's
         category-filtered hedges to remove); the cache is keyed by the hedge
-        ids so each distinct subset gets its own entry.
+        ids so each distinct subset gets its own entry. Results are also
+        shared between projects with the same hedges (see `hedges.density`).
         Returns a dict of Nones (uncached, no computation) when the subset is
         empty.
         """
@@ -666,19 +888,31 @@ class HedgeData(models.Model):
                 "density_5000": 0.0,
             }
 
-        density_200, density_5000, _ = (
-            self.compute_density_around_points_with_artifacts(hedges)
+        # Other projects with the same hedges may have computed it already
+        shared_cache = HedgeDensityCache(
+            "around_centroid",
+            [200, 5000],
+            hedges,
+            mode=get_density_mode([200, 5000]),
         )
+        density = shared_cache.get()
+        if density is None:
+            density_200, density_5000, _ = (
+                self.compute_density_around_points_with_artifacts(hedges)
+            )
+            density = {
+                "length_200": density_200["artifacts"]["length"],
+                "length_5000": density_5000["artifacts"]["length"],
+                "area_200_ha": density_200["artifacts"]["area_ha"],
+                "area_5000_ha": density_5000["artifacts"]["area_ha"],
+                "density_200": density_200["density"],
+                "density_5000": density_5000["density"],
+            }
+            shared_cache.set(density)
+
         if not self._density:
             self._density = {}
-        self._density[key] = {
-            "length_200": density_200["artifacts"]["length"],
-            "length_5000": density_5000["artifacts"]["length"],
-            "area_200_ha": density_200["artifacts"]["area_ha"],
-            "area_5000_ha": density_5000["artifacts"]["area_ha"],
-            "density_200": density_200["density"],
-            "density_5000": density_5000["density"],
-        }
+        self._density[key] = density
         self.save()
         return self._density[key]
 
@@ -688,7 +922,8 @@ class HedgeData(models.Model):
 
         Callers pass the hedge subset they evaluate (typically the evaluator's
         category-filtered hedges to remove); the cache is keyed by the hedge
-        ids so each distinct subset gets its own entry.
+        ids so each distinct subset gets its own entry. Results are also
+        shared between projects with the same hedges (see `hedges.density`).
         Returns a dict of Nones (uncached, no computation) when the subset is
         empty.
         """
@@ -699,14 +934,22 @@ class HedgeData(models.Model):
         if not hedges:
             return {"length_400": 0.0, "area_400_ha": 0.0, "density_400": 0.0}
 
-        density_400_buffer = self.compute_density_around_lines_with_artifacts(hedges)
+        shared_cache = HedgeDensityCache("around_lines", [400], hedges)
+        density = shared_cache.get()
+        if density is None:
+            density_400_buffer = self.compute_density_around_lines_with_artifacts(
+                hedges
+            )
+            density = {
+                "length_400": density_400_buffer["artifacts"]["length"],
+                "area_400_ha": density_400_buffer["artifacts"]["area_ha"],
+                "density_400": density_400_buffer["density"],
+            }
+            shared_cache.set(density)
+
         if not self._density:
             self._density = {}
-        self._density[key] = {
-            "length_400": density_400_buffer["artifacts"]["length"],
-            "area_400_ha": density_400_buffer["artifacts"]["area_ha"],
-            "density_400": density_400_buffer["density"],
-        }
+        self._density[key] = density
         self.save()
         return self._density[key]
 
@@ -727,19 +970,8 @@ class HedgeData(models.Model):
             self._departments_lengths = []
             return self._departments_lengths
 
-        to_remove_geom = hedges_to_remove.to_multilinestring()
-        intersecting_departments = (
-            Department.objects.filter(geometry__intersects=to_remove_geom)
-            .annotate(
-                clipped_hedges=Intersection("geometry", to_remove_geom),
-                hedge_length=Length("clipped_hedges"),
-            )
-            .defer("geometry")
-            .order_by("-hedge_length")
-        )
-        self._departments_lengths = [
-            (dept, dept.hedge_length.m) for dept in intersecting_departments
-        ]
+        lines = multilinestrings([h.geometry for h in hedges_to_remove])
+        self._departments_lengths = get_department_locator().get_lengths(lines)
         return self._departments_lengths
 
     def is_multi_departments(self):
@@ -760,12 +992,13 @@ class HedgeData(models.Model):
 
     def get_statistics(self):
         hedge_centroid_coords = self.hedges_to_remove().centroid
-        ru_to_plant = self.hedges_to_plant().ru()
-        l350_3_to_plant = self.hedges_to_plant().l350_3()
-        hru_to_plant = self.hedges_to_plant().hru()
-        ru_to_remove = self.hedges_to_remove().ru()
-        l350_3_to_remove = self.hedges_to_remove().l350_3()
-        hru_to_remove = self.hedges_to_remove().hru()
+        hedges = self.hedges()
+        ru_to_plant = hedges.to_plant().ru()
+        l350_3_to_plant = hedges.to_plant().l350_3()
+        hru_to_plant = hedges.to_plant().hru()
+        ru_to_remove = hedges.to_remove().ru()
+        l350_3_to_remove = hedges.to_remove().l350_3()
+        hru_to_remove = hedges.to_remove().hru()
         return {
             "longueur_detruite": round(self.length_to_remove(), 1),
             "longueur_plantee": round(self.length_to_plant(), 1),
@@ -799,8 +1032,9 @@ class HedgeData(models.Model):
         self, single_procedure
     ) -> dict[HedgeCategory, HedgeList]:
         """Get the hedges list for each category."""
+        hedges = self.hedges()
         hedges_by_category = {
-            category: self.hedges().evaluator_category(single_procedure, category)
+            category: hedges.evaluator_category(single_procedure, category)
             for category in HedgeCategory
         }
 
@@ -860,7 +1094,7 @@ class HruSpeciesQuerySet(models.QuerySet):
             )
 
         zone_subquery = (
-            Zone.objects.filter(geometry__intersects=hedge.geos_geometry)
+            Zone.objects.intersecting(hedge.geos_geometry)
             .filter(map_id=OuterRef("habitats__map_id"))
             .filter(map__map_type=MAP_TYPES.species_legacy)
             .filter(species_taxrefs__overlap=OuterRef("cd_noms"))
@@ -968,10 +1202,9 @@ class RuSpeciesQuerySet(models.QuerySet):
         signature_groups = group_hedges_by_signature(hedges)
         all_hedges_geom = hedges.to_multilinestring()
 
-        zones = Zone.objects.filter(
-            geometry__dwithin=(all_hedges_geom, SPECIES_BUFFER_DISTANCE),
-            map__map_type=MAP_TYPES.species,
-        )
+        zones = Zone.objects.within_distance(
+            all_hedges_geom, SPECIES_BUFFER_DISTANCE
+        ).filter(map__map_type=MAP_TYPES.species)
 
         sig_annotations = {}
         sig_order = []
@@ -117,10 +117,11 @@ def get_replantation_coefficient_by_category(moulinette):
     for regulation in moulinette.regulations:
         if regulation.is_activated():
             for criterion in regulation.criteria.all():
-                if hasattr(criterion._evaluator, "get_replantation_coefficient"):
-                    R_by_category[criterion._evaluator.category] = max(
-                        R_by_category[criterion._evaluator.category],
-                        D(criterion._evaluator.get_replantation_coefficient()),
+                evaluator = criterion.get_evaluator()
+                if hasattr(evaluator, "get_replantation_coefficient"):
+                    R_by_category[evaluator.category] = max(
+                        R_by_category[evaluator.category],
+                        D(evaluator.get_replantation_coefficient()),
                     )
 
     return R_by_category
@@ -385,10 +386,11 @@ class PlantationEvaluator:
                     continue
 
             for criterion in regulation.criteria.all():
-                if hasattr(criterion._evaluator, "plantation_evaluate"):
-                    conditions_by_category[criterion._evaluator.category].extend(
-                        criterion._evaluator.plantation_evaluate(
-                            R_by_category[criterion._evaluator.category],
+                evaluator = criterion.get_evaluator()
+                if hasattr(evaluator, "plantation_evaluate"):
+                    conditions_by_category[evaluator.category].extend(
+                        evaluator.plantation_evaluate(
+                            R_by_category[evaluator.category],
                             self.moulinette.catalog,
                         )
                     )
@@ -1,6 +1,5 @@
 import factory
 from factory.django import DjangoModelFactory
-from shapely import LineString
 
 from envergo.geodata.tests.factories import MapFactory
 from envergo.hedges.models import Hedge, HedgeData, Species, SpeciesHabitat
@@ -41,9 +40,6 @@ class HedgeFactory(factory.Factory):
             # One degree of latitude is approx 111 km
             obj.latLngs[1]["lng"] = obj.latLngs[0]["lng"]
             obj.latLngs[1]["lat"] = obj.latLngs[0]["lat"] + (extracted / 111000.0)
-            obj.geometry = LineString(
-                [(latLng["lng"], latLng["lat"]) for latLng in obj.latLngs]
-            )
 
 
 class HedgeDataFactory(DjangoModelFactory):
@@ -1,11 +1,13 @@
 from unittest.mock import patch
 
 import pytest
-from django.contrib.gis.geos import MultiPolygon, Polygon
+from django.contrib.gis.geos import GEOSGeometry, MultiPolygon, Polygon
+from django.core.cache import cache
 from django.db import IntegrityError, transaction
 from shapely import centroid
 
 from envergo.geodata.conftest import aisne_map, calvados_map  # noqa
+from envergo.geodata.models import MAP_TYPES
 from envergo.geodata.tests.factories import (
     DepartmentFactory,
     MapFactory,
@@ -305,6 +307,111 @@ def test_hedges_has_centroid_and_department():
     assert department == "34"
 
 
+def test_hedges_are_built_once():
+    hedge_data = HedgeDataFactory(hedges=[HedgeFactory(), HedgeFactory()])
+    hedges = hedge_data.hedges()
+    assert all(a is b for a, b in zip(hedges, hedge_data.hedges()))
+
+    # Returned lists can be altered safely
+    hedges.pop()
+    assert len(hedge_data.hedges()) == 2
+
+    # Hedges are built again when the data changes
+    hedge_data.data = hedge_data.data[:1]
+    assert len(hedge_data.hedges()) == 1
+    assert hedge_data.hedges()[0] is not hedges[0]
+
+    hedge_data.data.append(HedgeFactory(id="A42").toDict())
+    assert [h.id for h in hedge_data.hedges()][-1] == "A42"
+
+    hedge_data.data[-1] = HedgeFactory(id="A43").toDict()
+    assert [h.id for h in hedge_data.hedges()][-1] == "A43"
+
+
+def test_hedge_geometries_are_computed_lazily():
+    hedge = HedgeFactory()
+    assert hedge._geometry is None
+    assert hedge.length > 0
+    assert hedge.geos_geometry.equals_exact(GEOSGeometry(hedge.geometry.wkt, srid=4326))
+    assert hedge.geos_centroid is hedge.geos_centroid
+    with pytest.raises(AttributeError):
+        hedge.foo = "bar"
+
+
+def test_hedge_geometries_are_vectorized():
+    hedges = [
+        HedgeFactory(
+            id="D1",
+            latLngs=[{"lat": 43.6871, "lng": 3.5847}, {"lat": 43.6873, "lng": 3.5859}],
+        ),
+        HedgeFactory(
+            id="D2",
+            latLngs=[
+                {"lat": 43.6880, "lng": 3.5847},
+                {"lat": 43.6890, "lng": 3.5850},
+                {"lat": 43.6895, "lng": 3.5870},
+            ],
+        ),
+        HedgeFactory(id="P1", to_plant=True),
+    ]
+    hedge_data = HedgeDataFactory.build(hedges=hedges)
+    to_remove = hedge_data.hedges().to_remove()
+
+    assert to_remove.length == pytest.approx(sum(h.length for h in hedges[:2]))
+    assert to_remove.length == pytest.approx(HedgeList(hedges[:2]).length)
+    assert to_remove.centroid.equals_exact(HedgeList(hedges[:2]).centroid, 1e-9)
+    assert to_remove.bounds == pytest.approx(HedgeList(hedges[:2]).bounds)
+    assert to_remove[0].geometry.equals(hedges[0].geometry)
+
+
+def test_hedge_list_filters_share_an_index():
+    hedges = [
+        HedgeFactory(id="D1", additionalData__type_haie="mixte"),
+        HedgeFactory(id="D2", additionalData__type_haie="alignement"),
+        HedgeFactory(id="D3", additionalData__type_haie="mixte"),
+        HedgeFactory(id="P1", to_plant=True, additionalData__type_haie="mixte"),
+    ]
+    hedge_data = HedgeDataFactory.build(hedges=hedges)
+    all_hedges = hedge_data.hedges()
+
+    to_remove = all_hedges.to_remove()
+    mixte = to_remove.mixte()
+    assert [h.id for h in mixte] == ["D1", "D3"]
+    assert mixte.get_hedge_index()[0] is all_hedges.get_hedge_index()[0]
+    assert [h.id for h in mixte.union(to_remove.alignement())] == ["D1", "D3", "D2"]
+    assert [h.id for h in all_hedges.type("mixte").to_plant()] == ["P1"]
+
+
+def test_hedge_index_is_built_with_the_hedges():
+    hedges = [
+        HedgeFactory(id="D1", additionalData__type_haie="mixte"),
+        HedgeFactory(id="D2", additionalData__type_haie="alignement"),
+    ]
+    hedge_data = HedgeDataFactory.build(hedges=hedges)
+
+    all_hedges = hedge_data.hedges()
+    assert all_hedges._hedge_index is not None
+    assert hedge_data.hedges().get_hedge_index()[0] is all_hedges._hedge_index
+
+
+def test_hedge_list_mutations_drop_the_index():
+    hedges = [
+        HedgeFactory(id="D1", additionalData__type_haie="mixte"),
+        HedgeFactory(id="D2", additionalData__type_haie="alignement"),
+    ]
+    other = HedgeDataFactory.build(
+        hedges=[HedgeFactory(id="D3", additionalData__type_haie="mixte")]
+    ).hedges()[0]
+    hedge_list = HedgeDataFactory.build(hedges=hedges).hedges()
+
+    # Same length, but a different hedge
+    hedge_list[1] = other
+    assert [h.id for h in hedge_list.mixte()] == ["D1", "D3"]
+
+    hedge_list.append(other)
+    assert [h.id for h in hedge_list.mixte()] == ["D1", "D3", "D3"]
+
+
 def test_species_are_filtered_by_hedge_features():
     s1 = SpeciesHabitatFactory(
         hedge_properties=["proximite_mare", "vieil_arbre"]
@@ -1011,6 +1118,49 @@ class TestDensityLazyComputation:
         assert result["density_400"] == 12.0
 
 
+class TestSharedDensityCache:
+    """Densities are shared between projects with the same hedges."""
+
+    @pytest.fixture(autouse=True)
+    def density_cache(self, settings):
+        settings.HEDGE_DENSITY_CACHE_TIMEOUT = 60
+        cache.clear()
+        yield
+        cache.clear()
+
+    def test_density_is_shared_between_projects(self):
+        project = HedgeDataFactory(hedges=[HedgeFactory(id="D1")])
+        same_hedges = HedgeDataFactory(hedges=[HedgeFactory(id="D42")])
+        other_hedges = HedgeDataFactory(hedges=[HedgeFactory(length=50)])
+
+        with patch(LINES_PATCH, return_value=MOCK_DENSITY_LINES_400) as mock_lines:
+            project.density_around_lines(project.hedges_to_remove())
+            result = same_hedges.density_around_lines(same_hedges.hedges_to_remove())
+            mock_lines.assert_called_once()
+
+            other_hedges.density_around_lines(other_hedges.hedges_to_remove())
+            assert mock_lines.call_count == 2
+
+        assert result["density_400"] == 60.0
+        assert (
+            same_hedges._density[
+                same_hedges.around_lines_cache_key(same_hedges.hedges_to_remove())
+            ]
+            == result
+        )
+
+    def test_map_import_invalidates_density(self):
+        project = HedgeDataFactory()
+        resubmitted = HedgeDataFactory()
+
+        with patch(LINES_PATCH, return_value=MOCK_DENSITY_LINES_400) as mock_lines:
+            project.density_around_lines(project.hedges_to_remove())
+            MapFactory(map_type=MAP_TYPES.haies, zones=[])
+            resubmitted.density_around_lines(resubmitted.hedges_to_remove())
+
+        assert mock_lines.call_count == 2
+
+
 class TestHedgeCategory:
     """Tests for Hedge.category property.
 
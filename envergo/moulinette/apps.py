@@ -5,3 +5,6 @@ class MoulinetteConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "envergo.moulinette"
     verbose_name = "Simulateur"
+
+    def ready(self):
+        from . import signals  # noqa
@@ -0,0 +1,249 @@
+"""Evaluate the amenagement moulinette for many locations at once.
+
+Running N simulations one after the other costs N times the spatial queries
+(zones, criteria and perimeters activation distances, catchment area).
+
+Here, we fetch those inputs once for a whole chunk of locations:
+
+ - all zones around all locations, with a single VALUES CTE + LATERAL query;
+ - the catchment areas, from the exported rasters when available;
+ - perimeters once for the whole batch, criteria being read from the registry
+   (see `registry.py`). Activation distances are computed in python from the
+   zone distances.
+
+Then each location is evaluated by a regular moulinette object, fed with those
+prefetched inputs through the result cache hook (see `cache.py`), in the same
+shape as a cached simulation. Departments and configs are read from the
+in-memory locator and registry, as for any simulation.
+"""
+
+import copy
+import csv
+import json
+
+from django.contrib.gis.geos import Point
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from envergo.geodata.catchment import get_catchment_area_rasters
+from envergo.geodata.constants import EPSG_WGS84
+from envergo.geodata.models import Zone
+from envergo.moulinette.models import MoulinetteAmenagement, Perimeter
+from envergo.moulinette.registry import get_registry
+from envergo.moulinette.spatial import SpatialContext
+
+# Locations are processed by chunks, to keep the raw queries and the
+# prefetched data to a reasonable size
+CHUNK_SIZE = 200
+
+CSV_FIELDS = [
+    "row",
+    "lat",
+    "lng",
+    "existing_surface",
+    "created_surface",
+    "final_surface",
+    "department",
+    "is_eval_available",
+    "main_result",
+    *MoulinetteAmenagement.REGULATIONS,
+    "errors",
+]
+
+
+class PrefetchedResult:
+    """Mimic the `MoulinetteResultCache` api with already fetched inputs."""
+
+    def __init__(self, entry):
+        self.entry = entry
+
+    def get(self):
+        return self.entry
+
+    def set(self, entry):
+        pass
+
+
+class BatchMoulinetteAmenagement(MoulinetteAmenagement):
+    """A moulinette evaluated with inputs prefetched by `MoulinetteBatch`."""
+
+    def __init__(self, form_kwargs, prefetched=None):
+        self.prefetched_inputs = prefetched or {}
+        if "spatial_context" in self.prefetched_inputs:
+            # The zones were fetched with the batch, don't load them again
+            self._spatial_context = self.prefetched_inputs["spatial_context"]
+        super().__init__(form_kwargs)
+
+    def get_result_cache(self, catalog):
+        entry = {}
+        if "spatial_context" in self.prefetched_inputs:
+            entry["spatial_context"] = self._spatial_context.as_cache_entry()
+        if "catchment_area" in self.prefetched_inputs:
+            entry["catchment_area"] = self.prefetched_inputs["catchment_area"]
+        return PrefetchedResult(entry)
+
+    def get_perimeters(self):
+        if "perimeters" in self.prefetched_inputs:
+            return self.prefetched_inputs["perimeters"]
+        return super().get_perimeters()
+
+
+class MoulinetteBatch:
+    """Evaluate the amenagement moulinette for a list of simulation data.
+
+    Each row is a dict of moulinette parameters (lat, lng, created_surface…),
+    as they would be found in the result page url. Iterating over the batch
+    yields one result dict per row, in the same order.
+    """
+
+    def __init__(self, rows, date=None, radius=200):
+        self.rows = rows
+        self.date = date or timezone.now().date()
+        self.radius = radius
+
+    def __iter__(self):
+        chunk = []
+        for index, row in enumerate(self.rows):
+            chunk.append((index, row))
+            if len(chunk) >= CHUNK_SIZE:
+                yield from self.evaluate_chunk(chunk)
+                chunk = []
+
+        if chunk:
+            yield from self.evaluate_chunk(chunk)
+
+    def evaluate_chunk(self, chunk):
+        locations = {}
+        for index, row in chunk:
+            try:
+                lng_lat = Point(float(row["lng"]), float(row["lat"]), srid=EPSG_WGS84)
+            except (KeyError, TypeError, ValueError):
+                continue
+            locations[str(index)] = lng_lat
+
+        zones = Zone.objects.find_within_batch(locations, self.radius)
+        catchment_areas = self.get_catchment_areas(locations)
+
+        for index, row in chunk:
+            key = str(index)
+            prefetched = None
+            if key in locations:
+                prefetched = self.get_prefetched_inputs(zones[key])
+                if key in catchment_areas:
+                    prefetched["catchment_area"] = catchment_areas[key]
+            yield self.evaluate_row(index, row, prefetched)
+
+    def evaluate_row(self, index, row, prefetched):
+        data = {key: value for key, value in row.items() if value not in (None, "")}
+        data["date"] = self.date.isoformat()
+        moulinette = BatchMoulinetteAmenagement(
+            {"initial": data, "data": data}, prefetched
+        )
+
+        result = {"row": index}
+        if moulinette.bound_main_form.is_valid():
+            result.update(moulinette.summary())
+        if moulinette.form_errors:
+            result["errors"] = {
+                field: list(errors) for field, errors in moulinette.form_errors.items()
+            }
+        return result
+
+    def get_catchment_areas(self, locations):
+        """Return {key: catchment area}, if the rasters are exported.
+
+        Otherwise, each simulation queries its own catchment area, only if
+        a criterion needs it.
+        """
+        rasters = get_catchment_area_rasters()
+        if rasters is None or not locations:
+            return {}
+
+        areas = rasters.get_catchment_areas(
+            [lng_lat.x for lng_lat in locations.values()],
+            [lng_lat.y for lng_lat in locations.values()],
+        )
+        return dict(zip(locations.keys(), areas))
+
+    def get_prefetched_inputs(self, zones):
+        """Build the spatial inputs of a single location.
+
+        Criteria and perimeters are activated by maps, so the distance to a
+        map is the distance to its closest zone around the location.
+        """
+        # Zones are ordered by distance, so the first one is the closest
+        map_distances = {}
+        for zone in zones:
+            map_distances.setdefault(zone.map_id, zone.distance)
+
+        criteria_distances = {}
+        for criteria in self.registry.criteria.values():
+            for criterion in criteria:
+                distance = map_distances.get(criterion.activation_map_id)
+                if distance is not None and distance <= criterion.activation_distance:
+                    criteria_distances[criterion.id] = distance
+
+        # Perimeter objects are shared between rows, so each row gets its own
+        # copies
+        perimeters = []
+        for perimeter in self.perimeters:
+            distance = map_distances.get(perimeter.activation_map_id)
+            if distance is not None:
+                perimeter = copy.copy(perimeter)
+                perimeter.distance = distance
+                perimeters.append(perimeter)
+        perimeters_distances = {
+            perimeter.id: perimeter.distance for perimeter in perimeters
+        }
+
+        return {
+            "spatial_context": SpatialContext.from_zones(
+                zones, criteria_distances, perimeters_distances
+            ),
+            "perimeters": perimeters,
+        }
+
+    @cached_property
+    def registry(self):
+        return get_registry()
+
+    @cached_property
+    def perimeters(self):
+        return list(
+            Perimeter.objects.select_related("activation_map")
+            .defer("activation_map__geometry")
+            .order_by("id")
+        )
+
+
+class Echo:
+    """A file-like object that just returns what is written."""
+
+    def write(self, value):
+        return value
+
+
+def iter_ndjson(results):
+    """Serialize batch results as newline delimited json."""
+
+    for result in results:
+        yield json.dumps(result, cls=DjangoJSONEncoder) + "\n"
+
+
+def iter_csv(results):
+    """Serialize batch results as csv, with a column per regulation result.
+
+    Criteria results are not exported, since they depend on each location.
+    Use the ndjson format to get them.
+    """
+    writer = csv.DictWriter(Echo(), fieldnames=CSV_FIELDS, extrasaction="ignore")
+    yield writer.writeheader()
+    for result in results:
+        row = dict(result)
+        row["main_result"] = result.get("main_result", "")
+        for regulation, regulation_result in result.get("result", {}).items():
+            row[regulation] = regulation_result["result"]
+        if "errors" in result:
+            row["errors"] = json.dumps(result["errors"])
+        yield writer.writerow(row)
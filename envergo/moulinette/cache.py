@@ -0,0 +1,98 @@
+"""Result cache for the amenagement moulinette.
+
+Running a simulation requires spatial queries: zones around the project,
+perimeters and criteria activation distances, catchment area raster… For a
+given location, those inputs only change when a map is imported, or when the
+activation map of a criterion or perimeter is edited.
+
+So we store the resolved inputs in the django cache, keyed by a normalized
+version of the location parameters and by a global version token that is
+renewed every time a relevant object is changed (see `signals.py`).
+
+Only plain values are stored (zone ids, distances, surfaces), so entries stay
+small. The zones are loaded back by id, and the department, config, regulations
+and criteria come from the in-memory registries, so they always reflect the
+current configuration.
+"""
+
+import hashlib
+import json
+import logging
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import cached_property
+
+logger = logging.getLogger(__name__)
+
+RESULT_CACHE_VERSION_KEY = "moulinette:result_cache:version"
+
+# 6 decimals is roughly 10cm, way below the precision of the activation
+# distances (which are rounded to the meter)
+COORDS_PRECISION = 6
+
+
+def get_result_cache_version():
+    """Return the token identifying the current version of the moulinette data."""
+    return cache.get_or_set(RESULT_CACHE_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+
+
+def invalidate_result_cache():
+    """Make every existing result cache entry unreachable.
+
+    We use a random token rather than a counter, so an evicted version key can
+    never bring back stale entries.
+    """
+    cache.set(RESULT_CACHE_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+
+
+def normalize_query(lat, lng, **params):
+    """Return a canonical string for the given simulation location parameters.
+
+    Urls with the same parameters in a different order, or with coordinates
+    that differ by a few centimeters, share the same result.
+    """
+    query = {
+        "lat": f"{float(lat):.{COORDS_PRECISION}f}",
+        "lng": f"{float(lng):.{COORDS_PRECISION}f}",
+    }
+    query.update({key: str(value) for key, value in params.items()})
+    return json.dumps(query, sort_keys=True)
+
+
+class MoulinetteResultCache:
+    """Read and write the cached inputs for a single normalized query."""
+
+    def __init__(self, query):
+        self.query = query
+
+    def is_enabled(self):
+        return settings.MOULINETTE_RESULT_CACHE_TIMEOUT > 0
+
+    @cached_property
+    def key(self):
+        digest = hashlib.sha256(self.query.encode()).hexdigest()
+        return f"moulinette:result_cache:{get_result_cache_version()}:{digest}"
+
+    def get(self):
+        """Return the cached entry, or None."""
+
+        if not self.is_enabled():
+            return None
+
+        try:
+            entry = cache.get(self.key)
+        except Exception:
+            # An entry written by a previous deployment can fail to unpickle.
+            # It's just a cache miss.
+            logger.warning("Cannot read moulinette result cache", exc_info=True)
+            entry = None
+
+        return entry
+
+    def set(self, entry):
+        if not self.is_enabled():
+            return
+
+        cache.set(self.key, entry, settings.MOULINETTE_RESULT_CACHE_TIMEOUT)
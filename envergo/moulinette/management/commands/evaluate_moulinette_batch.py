@@ -0,0 +1,46 @@
+import csv
+import pathlib
+
+from dateutil import parser
+from django.core.management.base import BaseCommand
+
+from envergo.moulinette.batch import MoulinetteBatch, iter_csv, iter_ndjson
+
+
+class Command(BaseCommand):
+    help = """Run the amenagement moulinette for every line of a csv file.
+
+    The csv file must have a header line, with at least the `lat`, `lng`,
+    `created_surface` and `final_surface` columns. Any other moulinette
+    parameter can be given as an additional column.
+
+    Results are written as ndjson (default) or csv.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("csv_file", type=pathlib.Path)
+        parser.add_argument(
+            "--format", choices=["ndjson", "csv"], default="ndjson", dest="format"
+        )
+        parser.add_argument("--output", type=pathlib.Path, default=None)
+        parser.add_argument("--date", default=None, help="Simulation date (ISO)")
+        parser.add_argument("--radius", type=int, default=200)
+
+    def handle(self, *args, **options):
+        simulation_date = None
+        if options["date"]:
+            simulation_date = parser.isoparse(options["date"]).date()
+
+        with open(options["csv_file"], newline="") as f:
+            rows = list(csv.DictReader(f))
+
+        batch = MoulinetteBatch(rows, date=simulation_date, radius=options["radius"])
+        serializer = iter_csv if options["format"] == "csv" else iter_ndjson
+
+        if options["output"]:
+            with open(options["output"], "w", newline="") as out:
+                for line in serializer(batch):
+                    out.write(line)
+        else:
+            for line in serializer(batch):
+                self.stdout.write(line, ending="")
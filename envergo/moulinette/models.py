@@ -1,10 +1,11 @@
+import hashlib
 import logging
 import operator
 from abc import ABC, abstractmethod
 from collections import OrderedDict, defaultdict
 from datetime import date
 from enum import Enum, IntEnum, nonmember
-from functools import reduce
+from functools import partial, reduce
 from itertools import groupby
 from operator import attrgetter
 from typing import Literal
@@ -20,20 +21,12 @@ from django.contrib.postgres.fields import ArrayField, DateRangeField, RangeOper
 from django.core.exceptions import ValidationError
 from django.db import DataError, connection, models
 from django.db.backends.postgresql.psycopg_any import DateRange
-from django.db.models import (
-    CheckConstraint,
-    Exists,
-    F,
-    IntegerField,
-    OuterRef,
-    Prefetch,
-    Q,
-)
+from django.db.models import CheckConstraint, F, IntegerField, Q
 from django.db.models import Value
 from django.db.models import Value as V
 from django.db.models.functions import Cast, Coalesce, Concat
 from django.forms import BoundField, Form
-from django.template import TemplateDoesNotExist
+from django.template import Template, TemplateDoesNotExist
 from django.template.loader import get_template
 from django.utils import timezone
 from django.utils.functional import cached_property
@@ -51,7 +44,9 @@ from envergo.evaluations.models import (
     TagStyleEnum,
 )
 from envergo.geodata.constants import EPSG_WGS84
-from envergo.geodata.models import Department, Zone
+from envergo.geodata.locator import get_department_locator
+from envergo.geodata.models import ZONE_PARTS_SQL, Department, Zone
+from envergo.geodata.utils import get_catchment_area
 from envergo.hedges.forms import (
     HedgeToPlantPropertiesRegimeUniqueForm,
     HedgeToRemovePropertiesRegimeUniqueForm,
@@ -63,6 +58,7 @@ from envergo.hedges.models import (
     HedgeList,
     HedgeTypeFactory,
 )
+from envergo.moulinette.cache import MoulinetteResultCache, normalize_query
 from envergo.moulinette.fields import (
     CriterionEvaluatorChoiceField,
     RegulationEvaluatorChoiceField,
@@ -77,6 +73,9 @@ from envergo.moulinette.forms import (
     MoulinetteFormHaieRU,
     TriageFormHaie,
 )
+from envergo.moulinette.prefetch import prefetch
+from envergo.moulinette.profiling import profile_evaluation, step
+from envergo.moulinette.registry import get_registry
 from envergo.moulinette.regulations import (
     TO_ADD,
     TO_SUBTRACT,
@@ -84,6 +83,11 @@ from envergo.moulinette.regulations import (
     HaieRegulationEvaluator,
     MapFactory,
 )
+from envergo.moulinette.spatial import (
+    ZONE_CATEGORIES,
+    SpatialContext,
+    get_distance_annotation,
+)
 from envergo.moulinette.utils import compute_surfaces, list_moulinette_templates
 from envergo.utils.tools import insert_before
 
@@ -324,6 +328,13 @@ class Regulation(models.Model):
         val = getattr(super(), attr)
         return val
 
+    def __getstate__(self):
+        """Evaluation data is bound to a live moulinette and must not be pickled."""
+        state = super().__getstate__()
+        for attr in ("moulinette", "_evaluator", "_is_evaluating"):
+            state.pop(attr, None)
+        return state
+
     def get_criterion(self, criterion_slug):
         """Return the criterion with the given slug."""
 
@@ -343,22 +354,53 @@ class Regulation(models.Model):
         ]
         return optional_criteria
 
-    def evaluate(self, moulinette):
-        """Evaluate the regulation and all its criterions.
+    def bind(self, moulinette):
+        """Attach the regulation and its criteria to the moulinette.
+
+        The regulation will be evaluated on demand, when its result is first
+        accessed (see `ensure_evaluated`).
 
         Note : the `distance` field is not a member of the Criterion model,
         it is added with an annotation in the `get_regulations` method.
         """
         self.moulinette = moulinette
+        self.__dict__.pop("_evaluator", None)
         for criterion in self.criteria.all():
-            criterion.evaluate(moulinette, criterion.distance)
+            criterion.bind(moulinette, criterion.distance)
+
+    def evaluate(self, moulinette):
+        """Evaluate the regulation and all its criterions."""
+        self.bind(moulinette)
+        self.ensure_evaluated()
+
+    def is_evaluated(self):
+        return "_evaluator" in self.__dict__
+
+    def ensure_evaluated(self):
+        """Evaluate the bound regulation, unless it was already evaluated."""
 
-        self._evaluator = self.evaluator(moulinette)
-        self._evaluator.evaluate(self)
+        if (
+            self.is_evaluated()
+            or "moulinette" not in self.__dict__
+            or self.__dict__.get("_is_evaluating")
+        ):
+            return
+
+        self._is_evaluating = True
+        try:
+            with step("regulation", self.slug):
+                for criterion in self.criteria.all():
+                    criterion.ensure_evaluated()
+
+                self._evaluator = self.evaluator(self.moulinette)
+                self._evaluator.evaluate(self)
+        finally:
+            self._is_evaluating = False
 
     @property
     def result(self):
         """Return the regulation result."""
+        self.ensure_evaluated()
         if not hasattr(self, "_evaluator"):
             raise RuntimeError(
                 "Regulation must be evaluated before accessing the result."
@@ -369,6 +411,7 @@ class Regulation(models.Model):
     @property
     def results_by_category(self):
         """Return a regulation result for each category of at least one criterion."""
+        self.ensure_evaluated()
         if not hasattr(self, "_evaluator"):
             raise RuntimeError(
                 "Regulation must be evaluated before accessing the results."
@@ -379,6 +422,7 @@ class Regulation(models.Model):
     @property
     def is_cas_par_cas(self):
         """Whether this regulation's result is any variant of cas par cas."""
+        self.ensure_evaluated()
         if not hasattr(self, "_evaluator"):
             return False
         return self.result is not None and self.result.startswith("cas_par_cas")
@@ -386,6 +430,7 @@ class Regulation(models.Model):
     @property
     def procedure_type(self):
         """Return the regulation procedure type (autorisation / déclaration / hors r.u)."""
+        self.ensure_evaluated()
         if not hasattr(self, "_evaluator"):
             raise RuntimeError(
                 "Regulation must be evaluated before accessing the proceture type."
@@ -669,6 +714,7 @@ class Regulation(models.Model):
     @property
     def actions_to_take(self) -> dict[str, set[str]]:
         """Get potential actions to take (to add or to subtract) from regulation result."""
+        self.ensure_evaluated()
         if not hasattr(self, "_evaluator"):
             raise RuntimeError(
                 "Regulation must be evaluated before accessing actions to take."
@@ -683,6 +729,7 @@ class Regulation(models.Model):
 
     def get_evaluator(self):
         """Return the evaluator instance."""
+        self.ensure_evaluated()
         return self._evaluator
 
 
@@ -832,6 +879,23 @@ class Criterion(models.Model):
     def __str__(self):
         return self.title
 
+    def __getstate__(self):
+        """Evaluation data is bound to a live moulinette and must not be pickled."""
+        state = super().__getstate__()
+        for attr in (
+            "moulinette",
+            "_evaluator",
+            "_templates",
+            "_distance",
+            "_is_evaluating",
+        ):
+            state.pop(attr, None)
+        return state
+
+    def is_valid_at(self, at_date):
+        """Instance-level counterpart of CriterionQuerySet.valid_at()."""
+        return self.validity_range is None or at_date in self.validity_range
+
     def clean(self):
         super().clean()
         if (
@@ -859,19 +923,49 @@ class Criterion(models.Model):
             unique_slug += f"__{self.perimeter.id}"
         return unique_slug
 
+    def bind(self, moulinette, distance):
+        """Attach the criterion to the moulinette, to be evaluated on demand.
+
+        The catalog data the criterion needs is only fetched when the
+        criterion is evaluated.
+        """
+        self.moulinette = moulinette
+        self._distance = distance
+        self.__dict__.pop("_evaluator", None)
+
     def evaluate(self, moulinette, distance):
         """Initialize and run the actual evaluator."""
+        self.bind(moulinette, distance)
+        self.ensure_evaluated()
+
+    def is_evaluated(self):
+        return "_evaluator" in self.__dict__
+
+    def ensure_evaluated(self):
+        """Evaluate the bound criterion, unless it was already evaluated."""
+
+        if (
+            self.is_evaluated()
+            or "moulinette" not in self.__dict__
+            or self.__dict__.get("_is_evaluating")
+        ):
+            return
 
         # Before the evaluation, let's create a `MoulinetteTemplate` dict
         # It would make more sense to do this in the `__init__` method, but
         # the templates would have not be prefetched yet.
         self._templates = {t.key: t for t in self.templates.all()}
 
-        self.moulinette = moulinette
-        self._evaluator = self.evaluator(
-            self, moulinette, distance, self.evaluator_settings
-        )
-        self._evaluator.evaluate()
+        self._is_evaluating = True
+        try:
+            with step("criterion_catalog", self.unique_slug):
+                self._evaluator = self.evaluator(
+                    self, self.moulinette, self._distance, self.evaluator_settings
+                )
+            with step("criterion", self.unique_slug):
+                self._evaluator.evaluate()
+        finally:
+            self._is_evaluating = False
 
     def get_evaluator(self):
         """Return the evaluator instance.
@@ -879,11 +973,13 @@ class Criterion(models.Model):
         This method is useful because templates cannot access properties starting
         with an underscore.
         """
+        self.ensure_evaluated()
         return self._evaluator
 
     @property
     def result_code(self):
         """Return the criterion result code."""
+        self.ensure_evaluated()
         if not hasattr(self, "_evaluator"):
             raise RuntimeError(
                 "Criterion must be evaluated before accessing the result code."
@@ -894,6 +990,7 @@ class Criterion(models.Model):
     @property
     def result(self):
         """Return the criterion result."""
+        self.ensure_evaluated()
         if not hasattr(self, "_evaluator"):
             raise RuntimeError(
                 "Criterion must be evaluated before accessing the result."
@@ -906,6 +1003,7 @@ class Criterion(models.Model):
 
         When their result is not available, optional criteria should not be displayed.
         """
+        self.ensure_evaluated()
         if hasattr(self._evaluator, "should_be_displayed"):
             result = self._evaluator.should_be_displayed()
         else:
@@ -920,6 +1018,7 @@ class Criterion(models.Model):
         This map object will be serialized to Json and passed to a Leaflet
         configuration script.
         """
+        self.ensure_evaluated()
         if not hasattr(self, "_evaluator"):
             raise RuntimeError(
                 "Criterion must be evaluated before accessing the result code."
@@ -932,6 +1031,7 @@ class Criterion(models.Model):
         return map
 
     def get_form_class(self):
+        self.ensure_evaluated()
         if not hasattr(self, "_evaluator"):
             raise RuntimeError(
                 "Criterion must be evaluated before accessing the form class."
@@ -940,6 +1040,7 @@ class Criterion(models.Model):
         return self._evaluator.get_form_class()
 
     def get_form(self):
+        self.ensure_evaluated()
         if not hasattr(self, "_evaluator"):
             raise RuntimeError("Criterion must be evaluated before accessing the form.")
 
@@ -957,11 +1058,13 @@ class Criterion(models.Model):
         return form
 
     def get_template(self, template_key):
+        self.ensure_evaluated()
         return self._templates.get(template_key, None)
 
     @property
     def result_tag_style(self):
         """Return the criterion result tag style."""
+        self.ensure_evaluated()
         if not hasattr(self, "_evaluator"):
             raise RuntimeError(
                 "Criterion must be evaluated before accessing the result code."
@@ -972,6 +1075,7 @@ class Criterion(models.Model):
     @property
     def actions_to_take(self) -> dict[str, set[str]]:
         """Get potential actions to take (to add or to subtract) from regulation result."""
+        self.ensure_evaluated()
         if not hasattr(self, "_evaluator"):
             raise RuntimeError(
                 "Criterion must be evaluated before accessing actions to take."
@@ -1639,6 +1743,15 @@ TEMPLATE_KEYS = [
 ]
 
 
+# Compiled `MoulinetteTemplate` contents, {pk: (content hash, Template)}
+_compiled_templates = {}
+
+
+def evict_compiled_template(pk):
+    """Forget the compiled version of the given `MoulinetteTemplate`."""
+    _compiled_templates.pop(pk, None)
+
+
 def get_all_template_keys():
     tpls = TEMPLATE_KEYS + list(list_moulinette_templates())
     return zip(tpls, tpls)
@@ -1691,6 +1804,25 @@ class MoulinetteTemplate(models.Model):
             ),
         ]
 
+    def get_compiled_template(self):
+        """Return the content as a compiled django template.
+
+        Parsing the content is costly, and the same templates are rendered
+        for every simulation, so the compiled template is kept in memory.
+
+        Entries are keyed by content hash, so a worker that missed the
+        eviction signal will never render an outdated version.
+        """
+        if self.pk is None:
+            return Template(self.content)
+
+        digest = hashlib.sha256(self.content.encode()).hexdigest()
+        cached = _compiled_templates.get(self.pk)
+        if cached is None or cached[0] != digest:
+            cached = (digest, Template(self.content))
+            _compiled_templates[self.pk] = cached
+        return cached[1]
+
 
 class MoulinetteCatalog(dict):
     """Custom class responsible for fetching data used in regulation evaluations.
@@ -1699,20 +1831,100 @@ class MoulinetteCatalog(dict):
     can contribute data to the dictionary.
 
     But some data is used in several criterions, so it must be fetched beforehand.
+
+    Data can also be fetched on demand, with resolvers registered with
+    `add_resolver`. And in a lazy evaluated moulinette, a missing entry may be
+    contributed by a criterion that was not evaluated yet, so the `on_missing`
+    callback is given a chance to evaluate it.
     """
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.resolvers = {}
+        self.on_missing = None
+
+    def add_resolver(self, key, resolver):
+        """Fetch the data with the given callable, when first accessed."""
+        self.resolvers[key] = resolver
+
+    def resolve_all(self):
+        """Fetch all the data that was not accessed yet."""
+        for key in list(self.resolvers.keys()):
+            self[key]
+
+    def has_entry(self, key):
+        """Tell if the data is available, without fetching it."""
+
+        if key in self or key in self.resolvers:
+            return True
+        return bool(self.on_missing and self.on_missing()) and (
+            key in self or key in self.resolvers
+        )
+
+    def as_context(self):
+        """Return a view of the catalog that can be used as a template context."""
+        return CatalogContext(self)
+
     def __missing__(self, key):
         """If the data is not in the dict, use a method to fetch it."""
 
-        if not hasattr(self, key):
+        if key in self.resolvers:
+            method = self.resolvers.pop(key)
+        elif callable(getattr(self, key, None)):
+            method = getattr(self, key)
+        elif self.has_entry(key):
+            # Contributed by a criterion that was just evaluated
+            return self[key]
+        else:
             raise KeyError(f"Donnée manquante : {key}")
 
-        method = getattr(self, key)
-        value = method()
+        with step("catalog", key):
+            value = method()
         self[key] = value
         return value
 
 
+class CatalogContext(dict):
+    """Read-only view of a catalog, to be pushed on a template context.
+
+    Templates only fetch the catalog data they read: an entry with a resolver
+    is fetched when a template first reads it. Iterating over the view (e.g
+    when the template context is flattened) only yields the data that was
+    already fetched.
+
+    The view is a dict, since django template contexts only hold dicts, but
+    the data stays in the catalog.
+    """
+
+    def __init__(self, catalog):
+        super().__init__()
+        self.catalog = catalog
+
+    def __contains__(self, key):
+        return self.catalog.has_entry(key)
+
+    def __getitem__(self, key):
+        return self.catalog[key]
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def __iter__(self):
+        return iter(self.catalog)
+
+    def __len__(self):
+        return len(self.catalog)
+
+    def keys(self):
+        return self.catalog.keys()
+
+    def values(self):
+        return self.catalog.values()
+
+    def items(self):
+        return self.catalog.items()
+
+
 class MoulinetteUrlMixin:
     """A mixin for object containing a moulinette url
 
@@ -1755,7 +1967,7 @@ class MoulinetteHaieUrlMixin(MoulinetteUrlMixin):
     def get_config(self):
         if not self.department:
             return None
-        return ConfigHaie.objects.get_valid_config(self.department, self.date)
+        return get_registry().get_valid_config(ConfigHaie, self.department, self.date)
 
     @property
     def hedge_types(self):
@@ -1776,6 +1988,7 @@ class Moulinette(MoulinetteUrlMixin, ABC):
     """
 
     _is_evaluated = False
+    _is_evaluating_pending = False
 
     REGULATIONS = [
         "loi_sur_leau",
@@ -1787,7 +2000,15 @@ class Moulinette(MoulinetteUrlMixin, ABC):
         "alignement_arbres",
     ]
 
-    def __init__(self, form_kwargs):
+    def __init__(self, form_kwargs, lazy=False):
+        """Build the moulinette and evaluate it, if the data is valid.
+
+        In lazy mode, regulations are only evaluated when their results are
+        first accessed. Pages that don't display every result (e.g redirections,
+        triage) skip the evaluation of the other regulations, and the catalog
+        data they would need.
+        """
+        self.lazy = lazy
         self.catalog = MoulinetteCatalog()
         # Maybe here department should be evaluated if existing
         if "initial" in form_kwargs:
@@ -1795,20 +2016,54 @@ class Moulinette(MoulinetteUrlMixin, ABC):
         if "data" in form_kwargs:
             form_kwargs["data"].update(compute_surfaces(form_kwargs["data"]))
         self.form_kwargs = form_kwargs
-        self.catalog = self.get_catalog_data()
-        if self.bound_main_form.is_valid():
-            if self.config and self.config.id and hasattr(self.config, "templates"):
-                self.templates = {t.key: t for t in self.config.templates.all()}
-            else:
-                self.templates = {}
 
-            self.evaluate()
+        with profile_evaluation(type(self).__name__) as profile:
+            self.profile = profile
+            if profile and not profile.name:
+                profile.name = type(self).__name__
+
+            with step("catalog", "moulinette"):
+                self.catalog = self.get_catalog_data()
+            if self.lazy:
+                self.catalog.on_missing = self.evaluate_pending
+            if self.bound_main_form.is_valid():
+                if self.config and self.config.id and hasattr(self.config, "templates"):
+                    self.templates = {t.key: t for t in self.config.templates.all()}
+                else:
+                    self.templates = {}
+
+                self.evaluate()
 
     def evaluate(self):
         for regulation in self.regulations:
-            regulation.evaluate(self)
+            if self.lazy:
+                regulation.bind(self)
+            else:
+                regulation.evaluate(self)
         self._is_evaluated = True
 
+    def evaluate_pending(self):
+        """Evaluate the regulations that were not evaluated yet.
+
+        In lazy mode, this is called when some catalog data is missing, since
+        it may be contributed by a criterion. Catalog entries with a resolver
+        are still only fetched when they are first read (see
+        `MoulinetteCatalog.resolve_all`). Returns True if anything was
+        evaluated.
+        """
+        if not self.is_evaluated() or self._is_evaluating_pending:
+            return False
+
+        self._is_evaluating_pending = True
+        try:
+            pending = [r for r in self.regulations if not r.is_evaluated()]
+            for regulation in pending:
+                regulation.ensure_evaluated()
+        finally:
+            self._is_evaluating_pending = False
+
+        return bool(pending)
+
     def is_evaluated(self):
         return self._is_evaluated
 
@@ -2235,13 +2490,15 @@ class Moulinette(MoulinetteUrlMixin, ABC):
         return criteria
 
     def get_regulations(self):
-        """Find the activated regulations and their criteria."""
+        """Find the activated regulations and their criteria.
 
-        criteria = self.get_criteria()
-        regulations = (
-            Regulation.objects.filter(regulation__in=self.REGULATIONS)
-            .order_by("weight")
-            .prefetch_related(Prefetch("criteria", queryset=criteria))
+        Only the spatial part is queried, regulations and criteria are read
+        from the registry.
+        """
+
+        criteria_distances = dict(self.get_criteria().values_list("id", "distance"))
+        regulations = get_registry().get_regulations(
+            self.REGULATIONS, self.date, criteria_distances
         )
         return regulations
 
@@ -2438,32 +2695,126 @@ class MoulinetteAmenagement(Moulinette):
     main_form_class = MoulinetteFormAmenagement
     triage_form_class = None
 
+    def __init__(self, form_kwargs, lazy=False):
+        # Simulation inputs read from / stored in the result cache
+        self._cached_inputs = {}
+        self._is_cache_hit = False
+        self._has_new_inputs = False
+        # Input name -> callable fetching it, and the futures of prefetched inputs
+        self._fetchers = {}
+        self._prefetched = {}
+        super().__init__(form_kwargs, lazy=lazy)
+
+    def evaluate(self):
+        super().evaluate()
+        self.save_cached_inputs()
+
+    def get_result_cache(self, catalog):
+        """Return the result cache matching the simulation location."""
+
+        query = normalize_query(
+            catalog["lat"],
+            catalog["lng"],
+            radius=self.data.get("radius", "200"),
+            date=self.date.isoformat(),
+        )
+        return MoulinetteResultCache(query)
+
+    def cache_input(self, name, value):
+        """Collect a resolved simulation input, to store it in the result cache.
+
+        The collected inputs are stored once, after the evaluation. A lazy
+        moulinette only resolves the inputs the page needs, so inputs resolved
+        after the evaluation are stored right away. They must be plain values
+        (ids, distances, surfaces…), the objects are rebuilt from them.
+        """
+        if hasattr(self, "result_cache"):
+            self._cached_inputs[name] = value
+            self._has_new_inputs = True
+            if self.is_evaluated():
+                self.save_cached_inputs()
+        return value
+
+    def save_cached_inputs(self):
+        """Store the collected inputs in the result cache, if there are new ones."""
+
+        if self._has_new_inputs:
+            self.result_cache.set(self._cached_inputs)
+            self._has_new_inputs = False
+
     def get_regulations(self):
         """Find the activated regulations and their criteria."""
 
-        perimeters = self.get_perimeters()
-
-        regulations = (
-            super()
-            .get_regulations()
-            .prefetch_related(Prefetch("perimeters", queryset=perimeters))
+        regulations = get_registry().get_regulations(
+            self.REGULATIONS,
+            self.date,
+            self.spatial_context.criteria_distances,
+            perimeters=list(self.get_perimeters()),
         )
+        self.prefetch_criteria_inputs(regulations)
         return regulations
 
+    def prefetch_criteria_inputs(self, regulations):
+        """Start fetching the inputs that the activated criteria will read.
+
+        Those inputs are only needed by a few criteria, so they are not
+        prefetched with the spatial context.
+        """
+        names = {
+            name
+            for regulation in regulations
+            for criterion in regulation.criteria.all()
+            for name in getattr(criterion.evaluator, "prefetched_inputs", ())
+        }
+        self._prefetched.update(
+            prefetch(
+                {
+                    name: self._fetchers[name]
+                    for name in names
+                    if name in self._fetchers
+                    and name not in self._cached_inputs
+                    and name not in self._prefetched
+                }
+            )
+        )
+
+    @property
+    def fetching_radius(self):
+        return int(self.data.get("radius", "200"))
+
+    @property
+    def spatial_context(self):
+        """Return the zones and activation distances around the project.
+
+        It is fetched with the catalog data, unless it was found in the result
+        cache.
+        """
+        if not hasattr(self, "_spatial_context"):
+            entry = self._cached_inputs.get("spatial_context")
+            if entry:
+                self._spatial_context = SpatialContext(**entry)
+            else:
+                self._spatial_context = self.get_prefetched("spatial_context")
+                self.cache_input(
+                    "spatial_context", self._spatial_context.as_cache_entry()
+                )
+        return self._spatial_context
+
+    def get_prefetched(self, name):
+        """Return a prefetched input, or fetch it now if it was not prefetched."""
+
+        future = self._prefetched.pop(name, None)
+        if future is None:
+            return self._fetchers[name]()
+        return future.result()
+
     def get_perimeters(self):
-        coords = self.catalog["lng_lat"]
-        zones = self.catalog["all_zones"]
+        distances = self.spatial_context.perimeters_distances
 
         perimeters = (
-            Perimeter.objects.filter(activation_map__zones__in=zones)
-            .annotate(geometry=F("activation_map__geometry"))
-            .annotate(
-                distance=Cast(
-                    Distance("activation_map__zones__geometry", coords), IntegerField()
-                )
-            )
-            .order_by("id", "distance")
-            .distinct("id")
+            Perimeter.objects.filter(id__in=distances.keys())
+            .annotate(distance=get_distance_annotation(distances))
+            .order_by("id")
             .select_related("activation_map")
             .defer("activation_map__geometry")
         )
@@ -2471,19 +2822,13 @@ class MoulinetteAmenagement(Moulinette):
         return perimeters
 
     def get_criteria(self):
-        coords = self.catalog["lng_lat"]
-        zones = self.catalog["all_zones"]
+        distances = self.spatial_context.criteria_distances
 
         criteria = (
             super()
             .get_criteria()
-            .filter(activation_map__zones__in=zones)
-            .annotate(
-                distance=Cast(
-                    Distance("activation_map__zones__geometry", coords), IntegerField()
-                )
-            )
-            .filter(distance__lte=F("activation_distance"))
+            .filter(id__in=distances.keys())
+            .annotate(distance=get_distance_annotation(distances))
             .select_related("activation_map")
             .defer("activation_map__geometry")
         )
@@ -2500,73 +2845,59 @@ class MoulinetteAmenagement(Moulinette):
             lat = catalog["lat"]
             catalog["lng_lat"] = Point(float(lng), float(lat), srid=EPSG_WGS84)
 
-            fetching_radius = int(self.data.get("radius", "200"))
-            zones = self.get_zones(catalog["lng_lat"], fetching_radius)
-            catalog["all_zones"] = zones
-
-            def wetlands_filter(zone):
-                return all(
-                    (
-                        zone.map.map_type == "zone_humide",
-                        zone.map.data_type in ("certain", "forbidden"),
-                    )
-                )
-
-            catalog["wetlands"] = list(filter(wetlands_filter, zones))
-
-            def potential_wetlands_filter(zone):
-                return all(
-                    (
-                        zone.map.map_type == "zone_humide",
-                        zone.map.data_type == "uncertain",
-                    )
-                )
-
-            catalog["potential_wetlands"] = list(
-                filter(potential_wetlands_filter, zones)
-            )
-
-            def forbidden_wetlands_filter(zone):
-                return all(
-                    (
-                        zone.map.map_type == "zone_humide",
-                        zone.map.data_type == "forbidden",
-                    )
-                )
+            self.result_cache = self.get_result_cache(catalog)
+            self._cached_inputs = self.result_cache.get() or {}
+            self._is_cache_hit = bool(self._cached_inputs)
 
-            catalog["forbidden_wetlands"] = list(
-                filter(forbidden_wetlands_filter, zones)
+            # The spatial context is fetched in the background while the
+            # page is being built. The catchment area is only prefetched once
+            # we know that an activated criterion needs it.
+            self._fetchers = {
+                "spatial_context": partial(
+                    SpatialContext.fetch, catalog["lng_lat"], self.fetching_radius
+                ),
+                "catchment_area": partial(get_catchment_area, lng, lat),
+            }
+            self._prefetched = prefetch(
+                {
+                    name: self._fetchers[name]
+                    for name in ["spatial_context"]
+                    if name not in self._cached_inputs
+                }
             )
 
-            def flood_zones_filter(zone):
-                return all(
-                    (
-                        zone.map.map_type == "zone_inondable",
-                        zone.map.data_type == "certain",
-                    )
+            if "catchment_area" in self._cached_inputs:
+                catalog["catchment_area"] = self._cached_inputs["catchment_area"]
+            else:
+                catalog.add_resolver(
+                    "catchment_area",
+                    lambda: self.cache_input(
+                        "catchment_area", self.get_prefetched("catchment_area")
+                    ),
                 )
 
-            catalog["flood_zones"] = list(filter(flood_zones_filter, zones))
-
-            def potential_flood_zones_filter(zone):
-                return all(
-                    (
-                        zone.map.map_type == "zone_inondable",
-                        zone.map.data_type == "uncertain",
+            if self.lazy:
+                # The spatial context is only fetched if some page needs it
+                catalog.add_resolver("all_zones", lambda: self.spatial_context.zones)
+                for category in ZONE_CATEGORIES.keys():
+                    catalog.add_resolver(
+                        category,
+                        partial(self.get_zones_by_category, category),
                     )
-                )
-
-            catalog["potential_flood_zones"] = list(
-                filter(potential_flood_zones_filter, zones)
-            )
+            else:
+                catalog["all_zones"] = self.spatial_context.zones
+                catalog.update(self.spatial_context.get_zones_by_category())
 
         return catalog
 
+    def get_zones_by_category(self, category):
+        return self.spatial_context.get_zones_by_category()[category]
+
     def get_zones(self, coords, radius=200):
         """Return the Zone objects containing the queried coordinates."""
 
         zones = (
-            Zone.objects.filter(geometry__dwithin=(coords, D(m=radius)))
+            Zone.objects.within_distance(coords, D(m=radius))
             .annotate(distance=Cast(Distance("geometry", coords), IntegerField()))
             .annotate(geom=Cast("geometry", MultiPolygonField()))
             .select_related("map")
@@ -2603,15 +2934,14 @@ class MoulinetteAmenagement(Moulinette):
             return None
 
         lng_lat = self.catalog["lng_lat"]
-        department = Department.objects.filter(geometry__contains=lng_lat).first()
-        return department
+        return get_department_locator().locate(lng_lat.x, lng_lat.y)
 
     def get_config(self):
         if not self.department:
             return None
-        config = ConfigAmenagement.objects.prefetch_related(
-            "templates"
-        ).get_valid_config(self.department, self.date)
+        config = get_registry().get_valid_config(
+            ConfigAmenagement, self.department, self.date
+        )
         return config
 
     def get_debug_context(self):
@@ -2626,6 +2956,7 @@ class MoulinetteAmenagement(Moulinette):
             )
             .distinct("activation_map__name", "id"),
             "grouped_criteria": self.get_criteria()
+            .filter(activation_map__zones__in=self.spatial_context.zones)
             .annotate(
                 geometry=F("activation_map__zones__geometry"),
             )
@@ -2636,7 +2967,7 @@ class MoulinetteAmenagement(Moulinette):
             )
             .distinct("activation_map__name", "id"),
             "grouped_zones": (
-                self.catalog["all_zones"]
+                self.get_zones(self.catalog["lng_lat"], self.fetching_radius)
                 .annotate(type=Concat("map__map_type", V("-"), "map__data_type"))
                 .order_by("type", "distance", "map__name")
             ),
@@ -2974,12 +3305,13 @@ class MoulinetteHaie(MoulinetteHaieUrlMixin, Moulinette):
 
     def get_regulations(self):
         """Find the activated regulations and their criteria."""
-        perimeters = self.get_perimeters()
 
-        regulations = (
-            super()
-            .get_regulations()
-            .prefetch_related(Prefetch("perimeters", queryset=perimeters))
+        criteria_distances = dict(self.get_criteria().values_list("id", "distance"))
+        regulations = get_registry().get_regulations(
+            self.REGULATIONS,
+            self.date,
+            criteria_distances,
+            perimeters=list(self.get_perimeters()),
         )
         return regulations
 
@@ -2997,10 +3329,11 @@ class MoulinetteHaie(MoulinetteHaieUrlMixin, Moulinette):
                         0, output_field=IntegerField()
                     )  # We use an exists subquery that check for intersection so the distance is 0
                 )
-                .annotate(geometry=F("activation_map__geometry"))
                 .filter(activation_map_id__in=map_ids)
                 .order_by("id")
                 .distinct("id")
+                .select_related("activation_map")
+                .defer("activation_map__geometry")
             )
         else:
             perimeters = Perimeter.objects.none()
@@ -3033,12 +3366,10 @@ class MoulinetteHaie(MoulinetteHaieUrlMixin, Moulinette):
             if not hedges
             for evaluator_classpath in evaluators_by_category[category]
         ]
-        centroid_subquery = Zone.objects.filter(
-            map_id=OuterRef("activation_map_id"), geometry__intersects=dept_centroid
-        ).values("id")
+        centroid_map_ids = Zone.objects.find_covering_map_ids(dept_centroid)
         centroid_q = (
             Q(activation_mode="department_centroid")
-            & Exists(centroid_subquery)
+            & Q(activation_map_id__in=centroid_map_ids)
             & ~Q(evaluator__in=empty_category_evaluators)
         )
         # Filter for hedges_intersection activation mode
@@ -3076,7 +3407,8 @@ class MoulinetteHaie(MoulinetteHaieUrlMixin, Moulinette):
         between spheroidal and planar intersection is submillimeter.
 
         The geography GIST index still handles bounding box pre-filtering (the
-        && operator), so only a few dozen candidate zones reach the exact check.
+        && operator), so only a few dozen candidate zones reach the exact check,
+        and it runs on the zone parts of the subdivided maps (see `ZonePart`).
         """
         if hasattr(self, "_intersecting_map_ids"):
             return self._intersecting_map_ids
@@ -3084,7 +3416,7 @@ class MoulinetteHaie(MoulinetteHaieUrlMixin, Moulinette):
         merged = HedgeList(hedges).to_multilinestring()
         with connection.cursor() as cursor:
             cursor.execute(
-                "SELECT DISTINCT map_id FROM geodata_zone "
+                f"SELECT DISTINCT map_id FROM {ZONE_PARTS_SQL} zp "
                 "WHERE geometry && %s::geography "
                 "AND ST_Intersects(geometry::geometry, %s::geometry)",
                 [merged.ewkt, merged.ewkt],
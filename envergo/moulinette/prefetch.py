@@ -0,0 +1,66 @@
+"""Concurrent fetching of the moulinette inputs.
+
+Some inputs of a simulation are independent slow lookups: the zones around the
+project, the catchment area raster, the address from the IGN geocoding api…
+Instead of running them one after another, they are submitted together to a
+bounded thread pool, so the total latency is the one of the slowest input.
+Inputs that don't hit the db or an api (e.g the department, read from the
+in-memory locator) are not worth a thread.
+
+Each worker thread uses its own persistent db connection, recycled like the
+request ones, according to `CONN_MAX_AGE`. Those connections don't see the
+uncommitted changes of the calling thread, which is fine for the reference
+data that is prefetched. But tests create this data in a transaction, so
+prefetching is disabled in tests (see `MOULINETTE_PREFETCH_WORKERS`), except
+in transactional tests.
+
+When prefetching is disabled, `prefetch` returns nothing, and the inputs are
+fetched on demand, as usual.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Return the thread pool shared by all the simulations of the process."""
+    global _executor
+
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.MOULINETTE_PREFETCH_WORKERS,
+                thread_name_prefix="moulinette-prefetch",
+            )
+    return _executor
+
+
+def run_in_worker(func):
+    # Worker threads are not request threads, so Django would never recycle
+    # their connections. Just like around requests, connections that are too
+    # old or broken are closed before and after each input.
+    close_old_connections()
+    try:
+        return func()
+    finally:
+        close_old_connections()
+
+
+def prefetch(inputs):
+    """Start fetching the given inputs concurrently.
+
+    `inputs` maps input names to callables without arguments. Returns a dict
+    of futures, with the same keys. Exceptions are raised when the future
+    result is read.
+    """
+    if settings.MOULINETTE_PREFETCH_WORKERS <= 0:
+        return {}
+
+    executor = get_executor()
+    return {name: executor.submit(run_in_worker, func) for name, func in inputs.items()}
@@ -0,0 +1,153 @@
+"""Profiling of moulinette evaluations.
+
+When a result page is slow, we want to know which regulation, criterion or
+catalog entry is responsible. So the evaluation steps are wrapped in `step`
+blocks, that record the wall time and the db queries (count and time) spent
+in each of them.
+
+Profiling is always enabled on the debug page, and enabled for a random
+sample of the other simulations (see `MOULINETTE_PROFILING_SAMPLE_RATE`).
+When profiling is disabled, a step only costs a context variable lookup.
+
+Profiles are displayed on the debug page, and logged as a single json line.
+"""
+
+import json
+import logging
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+_current_profile = ContextVar("moulinette_profile", default=None)
+
+
+class ProfileStep:
+    """A single profiled evaluation step."""
+
+    def __init__(self, kind, name, depth):
+        self.kind = kind
+        self.name = name
+        self.depth = depth
+        self.duration = 0.0
+        self.queries = 0
+        self.queries_duration = 0.0
+
+    def as_dict(self):
+        return {
+            "kind": self.kind,
+            "name": self.name,
+            "depth": self.depth,
+            "duration_ms": round(self.duration * 1000, 2),
+            "queries": self.queries,
+            "queries_ms": round(self.queries_duration * 1000, 2),
+        }
+
+
+class MoulinetteProfile:
+    """Timings of a single moulinette evaluation."""
+
+    def __init__(self, name):
+        self.name = name
+        self.steps = []
+        self._stack = []
+        self.total = ProfileStep("moulinette", name, 0)
+        self.start = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        """Time spent so far, e.g when the profile is displayed while rendering."""
+        return self.total.duration or time.perf_counter() - self.start
+
+    def record_query(self, execute, sql, params, many, context):
+        """Db execute wrapper that charges the query to every open step."""
+
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            for step in (self.total, *self._stack):
+                step.queries += 1
+                step.queries_duration += duration
+
+    @contextmanager
+    def step(self, kind, name):
+        step = ProfileStep(kind, name, len(self._stack))
+        self.steps.append(step)
+        self._stack.append(step)
+        start = time.perf_counter()
+        try:
+            yield step
+        finally:
+            step.duration = time.perf_counter() - start
+            self._stack.pop()
+
+    def as_dict(self):
+        return {
+            **self.total.as_dict(),
+            "name": self.name,
+            "steps": [step.as_dict() for step in self.steps],
+        }
+
+    def log(self):
+        total = self.total
+        logger.info(
+            "Moulinette profile: %s %.1fms, %d queries (%.1fms) %s",
+            self.name,
+            total.duration * 1000,
+            total.queries,
+            total.queries_duration * 1000,
+            json.dumps(self.as_dict()),
+            extra={"moulinette_profile": self.as_dict()},
+        )
+
+
+def is_sampled():
+    rate = settings.MOULINETTE_PROFILING_SAMPLE_RATE
+    return rate > 0 and random.random() < rate
+
+
+@contextmanager
+def profile_evaluation(name="", force=False):
+    """Profile the moulinette evaluation(s) run in this block.
+
+    Yields the profile, or None if the evaluation is not profiled. When
+    called inside an already profiled block, the current profile is reused.
+    """
+    current = _current_profile.get()
+    if current is not None:
+        yield current
+        return
+
+    if not (force or is_sampled()):
+        yield None
+        return
+
+    profile = MoulinetteProfile(name)
+    token = _current_profile.set(profile)
+    try:
+        with connection.execute_wrapper(profile.record_query):
+            yield profile
+    finally:
+        profile.total.duration = time.perf_counter() - profile.start
+        _current_profile.reset(token)
+        profile.log()
+
+
+@contextmanager
+def step(kind, name):
+    """Record the time spent in the block, if the evaluation is profiled."""
+
+    profile = _current_profile.get()
+    if profile is None:
+        yield None
+        return
+
+    with profile.step(kind, name) as profile_step:
+        yield profile_step
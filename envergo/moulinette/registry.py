@@ -0,0 +1,162 @@
+"""In-process registry of the moulinette configuration.
+
+Regulations, criteria (and their templates) and department configs are needed
+by every simulation, but they are only edited a few times a month through the
+admin. So each process keeps a copy of those rows in memory.
+
+The registry is versioned with a token stored in the shared django cache. The
+token is renewed every time a relevant object is saved (see `signals.py`), so
+every worker process rebuilds its registry on the next simulation.
+
+Registry objects are shared between simulations, and moulinette objects are
+evaluated in place. So the registry always returns copies.
+"""
+
+import copy
+import logging
+import threading
+import uuid
+from collections import defaultdict
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+REGISTRY_VERSION_KEY = "moulinette:registry:version"
+
+_registry = None
+_lock = threading.Lock()
+
+
+def get_registry_version():
+    return cache.get_or_set(REGISTRY_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+
+
+def invalidate_registry():
+    """Make every process rebuild its registry."""
+    global _registry
+
+    cache.set(REGISTRY_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+    _registry = None
+
+
+def get_registry():
+    """Return the registry matching the current moulinette data version."""
+    global _registry
+
+    version = get_registry_version()
+    registry = _registry
+    if registry is None or registry.version != version:
+        with _lock:
+            if _registry is None or _registry.version != version:
+                _registry = MoulinetteRegistry(version)
+            registry = _registry
+    return registry
+
+
+def set_prefetched(instance, name, objs):
+    """Fill a related manager cache, just like `prefetch_related` would."""
+
+    if not hasattr(instance, "_prefetched_objects_cache"):
+        instance._prefetched_objects_cache = {}
+
+    qs = getattr(instance, name).get_queryset()
+    qs._result_cache = list(objs)
+    qs._prefetch_done = True
+    instance._prefetched_objects_cache[name] = qs
+
+
+class MoulinetteRegistry:
+    """A snapshot of the moulinette configuration tables."""
+
+    def __init__(self, version):
+        from envergo.moulinette.models import (
+            ConfigAmenagement,
+            ConfigHaie,
+            Criterion,
+            Perimeter,
+            Regulation,
+        )
+
+        logger.info("Building moulinette registry")
+        self.version = version
+
+        self.regulations = list(Regulation.objects.order_by("weight"))
+
+        criteria = (
+            Criterion.objects.select_related("activation_map", "perimeter")
+            .defer("activation_map__geometry")
+            .prefetch_related("templates")
+            .order_by("weight", "id")
+        )
+        self.criteria = defaultdict(list)
+        for criterion in criteria:
+            self.criteria[criterion.regulation_id].append(criterion)
+
+        links = Perimeter.regulations.through.objects.values_list(
+            "perimeter_id", "regulation_id"
+        )
+        self.perimeter_regulations = defaultdict(set)
+        for perimeter_id, regulation_id in links:
+            self.perimeter_regulations[perimeter_id].add(regulation_id)
+
+        self.configs = defaultdict(list)
+        for model, related in (
+            (ConfigAmenagement, ["templates"]),
+            (ConfigHaie, []),
+        ):
+            configs = (
+                model.objects.select_related("department")
+                .defer("department__geometry")
+                .prefetch_related(*related)
+            )
+            for config in configs:
+                self.configs[(model, config.department_id)].append(config)
+
+    def get_valid_config(self, model, department, date):
+        """Registry counterpart of `ConfigQuerySet.get_valid_config`."""
+
+        for config in self.configs[(model, department.id)]:
+            if config.is_valid_at(date):
+                return copy.copy(config)
+        return None
+
+    def get_regulations(self, slugs, date, criteria_distances, perimeters=None):
+        """Return the regulations with their activated criteria and perimeters.
+
+        `criteria_distances` is a {criterion_id: distance} dict of activated
+        criteria. `perimeters` is a list of activated (and annotated)
+        perimeter objects. When it's not provided, perimeters are not
+        prefetched.
+        """
+        perimeters_by_regulation = defaultdict(list)
+        for perimeter in perimeters or []:
+            for regulation_id in self.perimeter_regulations[perimeter.id]:
+                perimeters_by_regulation[regulation_id].append(perimeter)
+
+        regulations = []
+        for regulation in self.regulations:
+            if regulation.regulation not in slugs:
+                continue
+
+            regulation = copy.copy(regulation)
+            criteria = []
+            for criterion in self.criteria[regulation.id]:
+                if criterion.id not in criteria_distances:
+                    continue
+                if not criterion.is_valid_at(date):
+                    continue
+
+                criterion = copy.copy(criterion)
+                criterion.distance = criteria_distances[criterion.id]
+                criterion.regulation = regulation
+                criteria.append(criterion)
+
+            set_prefetched(regulation, "criteria", criteria)
+            if perimeters is not None:
+                set_prefetched(
+                    regulation, "perimeters", perimeters_by_regulation[regulation.id]
+                )
+            regulations.append(regulation)
+
+        return regulations
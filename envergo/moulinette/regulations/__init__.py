@@ -10,7 +10,10 @@ from django.contrib.gis.geos import GEOSGeometry, Point
 from envergo.evaluations.models import RESULT_CASCADE, RESULTS, TAG_STYLES_BY_RESULT
 from envergo.geodata.utils import (
     EPSG_WGS84,
-    get_best_epsg_for_location,
+    MAP_DISPLAY_MAX_ZOOM,
+    clip_to_bbox,
+    get_bbox_around,
+    get_map_display_geometry,
     merge_geometries,
     to_geojson,
 )
@@ -46,7 +49,23 @@ class MapPolygon:
 
     @property
     def geometry(self):
-        geometries = [p.geometry for p in self.perimeters]
+        return self.get_display_geometry(MAP_DISPLAY_MAX_ZOOM)
+
+    def get_display_geometry(self, zoom=None):
+        """Return the merged geometry, to be displayed at the given zoom level.
+
+        Perimeters geometries are read from their activation map simplified
+        (and cached) version.
+        """
+        geometries = []
+        for p in self.perimeters:
+            if hasattr(p, "activation_map"):
+                geometry = get_map_display_geometry(p.activation_map, zoom)
+            else:
+                geometry = p.geometry
+            if geometry is not None:
+                geometries.append(geometry)
+
         merged_geometry = merge_geometries(geometries)
         return merged_geometry
 
@@ -82,14 +101,17 @@ class Map:
     fixed: bool = True  # Is the map fixed or can it be zoomed and dragged?
     type: str = "criterion"  # Can be "criterion" or "regulation"
 
-    def to_json(self):
-        # Clip displayed polygons to a 1 km disc around the center.
-        # center is WGS84, so buffer in the local UTM zone (meters), not in
-        # degrees — a degree-radius buffer would span the globe and clip nothing.
-        utm_srid = get_best_epsg_for_location(self.center.x, self.center.y)
-        center_utm = self.center.transform(utm_srid, clone=True)
-        buffer = center_utm.buffer(1000).transform(EPSG_WGS84, clone=True)
+    def get_entry_geometry(self, entry):
+        """Return the entry geometry, as it will be displayed."""
+
+        geometry = entry.get_display_geometry(self.zoom)
+        if self.truncate:
+            # Clip displayed polygons to a 1 km box around the center
+            bbox = get_bbox_around(self.center, 1000)
+            geometry = clip_to_bbox(geometry, bbox)
+        return geometry
 
+    def to_json(self):
         data = json.dumps(
             {
                 "type": self.type,
@@ -97,11 +119,7 @@ class Map:
                 "zoom": self.zoom,
                 "polygons": [
                     {
-                        "polygon": (
-                            to_geojson(entry.geometry.intersection(buffer))
-                            if self.truncate
-                            else to_geojson(entry.geometry)
-                        ),
+                        "polygon": to_geojson(self.get_entry_geometry(entry)),
                         "color": entry.color,
                         "label": entry.label,
                         "className": entry.class_name,
@@ -580,6 +598,10 @@ class CriterionEvaluator(ABC):
     # The form class to use to ask the admin for necessary settings
     settings_form_class = None
 
+    # Slow catalog inputs to fetch in the background when the criterion is
+    # activated (see `MoulinetteAmenagement.prefetch_criteria_inputs`)
+    prefetched_inputs = ()
+
     def __init__(self, criterion, moulinette, distance, settings):
         """Initialize the evaluator.
 
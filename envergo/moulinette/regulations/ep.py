@@ -471,10 +471,8 @@ class EspecesProtegeesNormandie(
         # Normandie is divided into natural areas with a certain homogeneity of biodiversity.
         # We use the centroid of the hedges to find the zone in which the hedges are located.
         zonage = (
-            Zone.objects.filter(
-                geometry__covers=centroid_geos,
-                map__map_type=MAP_TYPES.zonage,
-            )
+            Zone.objects.covering(centroid_geos)
+            .filter(map__map_type=MAP_TYPES.zonage)
             .defer("geometry")
             .first()
         )
@@ -606,6 +604,12 @@ class EspecesProtegeesNormandie(
 
         return float(self.catalog.get("aggregated_r"))
 
+    def pop_density_circle(self, artifacts):
+        """Pop both circles from the density artifacts, return the computed one."""
+        circle = artifacts.pop("circle")
+        truncated_circle = artifacts.pop("truncated_circle")
+        return circle if artifacts["mode"] == "grid" else truncated_circle
+
     def get_debug_context(self):
         """Return centroid-based density data for debug display."""
         haies = self.catalog.get("haies")
@@ -617,8 +621,10 @@ class EspecesProtegeesNormandie(
         )
         # Pop circles from artifacts so they don't leak into the template context
         # dict, while keeping them available for the map builder below.
-        truncated_circle_200 = density_200["artifacts"].pop("truncated_circle")
-        truncated_circle_5000 = density_5000["artifacts"].pop("truncated_circle")
+        # Densities computed from the grid have no trimmed circle, so the raw
+        # circle is displayed. In exact mode, an off-land circle stays None.
+        truncated_circle_200 = self.pop_density_circle(density_200["artifacts"])
+        truncated_circle_5000 = self.pop_density_circle(density_5000["artifacts"])
 
         context = {
             "numero_pacage": self.catalog.get("numero_pacage"),
@@ -632,6 +638,10 @@ class EspecesProtegeesNormandie(
             "area_5000_ha": density_5000["artifacts"]["area_ha"],
             "density_200": density_200["density"],
             "debug_density_5000": density_5000["density"],
+            "density_200_mode": density_200["artifacts"]["mode"],
+            "density_200_error": density_200["artifacts"]["error"],
+            "density_5000_mode": density_5000["artifacts"]["mode"],
+            "density_5000_error": density_5000["artifacts"]["error"],
         }
 
         pre_computed = haies.density_around_centroid(self.hedges.to_remove())
@@ -771,9 +781,8 @@ class EspecesProtegeesRegimeUnique(
         hedges_geom = MultiLineString(
             [h.geos_geometry for h in hedges], srid=EPSG_WGS84
         )
-        zones = Zone.objects.filter(
+        zones = Zone.objects.intersecting(hedges_geom).filter(
             map__map_type=MAP_TYPES.zone_sensible_ep,
-            geometry__intersects=hedges_geom,
         )
 
         # Run a nested loop to check intersection between hedges and zones
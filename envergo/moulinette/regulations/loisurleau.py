@@ -360,6 +360,7 @@ class Ruissellement(EcoulementSansBV):
 class EcoulementAvecBV(SelfDeclarationMixin, ActionsToTakeMixin, CriterionEvaluator):
     choice_label = "Loi sur l'eau > Écoulement EP avec BV"
     slug = "ecoulement_avec_bv"
+    prefetched_inputs = ("catchment_area",)
 
     CODES = [
         "soumis",
@@ -474,9 +475,19 @@ class EcoulementAvecBV(SelfDeclarationMixin, ActionsToTakeMixin, CriterionEvalua
     def get_catalog_data(self):
         data = {}
 
+        # The raw value is kept in the catalog so it can be stored in the
+        # moulinette result cache. It may also have been prefetched.
+        if (
+            "catchment_area" in self.catalog
+            or "catchment_area" in self.catalog.resolvers
+        ):
+            surface = self.catalog["catchment_area"]
+        else:
+            surface = get_catchment_area(self.catalog["lng"], self.catalog["lat"])
+            data["catchment_area"] = surface
+
         # If we cannot compute the catchment area surface, we have to consider
         # the value is 0
-        surface = get_catchment_area(self.catalog["lng"], self.catalog["lat"])
         if surface is None:
             surface = 0
             logger.warning(
@@ -82,10 +82,8 @@ class Natura2000Haie(HaieCriterionEvaluator):
         )
 
         # Find all the Zones for the current Perimeter and that intersects any of the hedges
-        qs = (
-            self.criterion.activation_map.zones.all()
-            .filter(geometry__intersects=hedges_geom)
-            .aggregate(geom=Union(Cast("geometry", MultiPolygonField())))
+        qs = self.criterion.activation_map.zones.intersecting(hedges_geom).aggregate(
+            geom=Union(Cast("geometry", MultiPolygonField()))
         )
         # Aggregate them into a single polygon
         multipolygon = qs["geom"]
@@ -0,0 +1,58 @@
+"""Rendering of templates on top of a moulinette catalog.
+
+Result templates read the catalog data as context variables. But in a lazy
+moulinette, some catalog entries (zones, catchment area…) are only fetched
+when they are first read, and copying the whole catalog in the template
+context would fetch them all.
+
+So the catalog is pushed at the bottom of the template context, behind a
+`CatalogContext` view, and the templates only fetch the entries they read.
+"""
+
+from django.template import Context, RequestContext
+from django.template.response import TemplateResponse
+
+
+def make_catalog_context(catalog, context, request=None, autoescape=True):
+    """Build a template context that reads missing variables from the catalog."""
+
+    if request is None:
+        template_context = Context(catalog.as_context(), autoescape=autoescape)
+    else:
+        template_context = RequestContext(
+            request, catalog.as_context(), autoescape=autoescape
+        )
+    template_context.push(context)
+    return template_context
+
+
+def render_with_catalog(template, catalog, context, request=None):
+    """Render a template on top of the catalog.
+
+    `template` is either a compiled django template, or a template returned by
+    `get_template`.
+    """
+    template = getattr(template, "template", template)
+    template_context = make_catalog_context(
+        catalog, context, request, autoescape=template.engine.autoescape
+    )
+    return template.render(template_context)
+
+
+class MoulinetteTemplateResponse(TemplateResponse):
+    """Template response rendered on top of the moulinette catalog."""
+
+    rendering_attrs = TemplateResponse.rendering_attrs + ["catalog"]
+
+    def __init__(self, *args, catalog=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.catalog = catalog
+
+    @property
+    def rendered_content(self):
+        if self.catalog is None:
+            return super().rendered_content
+
+        template = self.resolve_template(self.template_name)
+        context = self.resolve_context(self.context_data) or {}
+        return render_with_catalog(template, self.catalog, context, self._request)
@@ -0,0 +1,115 @@
+import logging
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+
+from envergo.geodata.models import Department, Map
+from envergo.moulinette.cache import invalidate_result_cache
+from envergo.moulinette.models import (
+    ConfigAmenagement,
+    ConfigHaie,
+    Criterion,
+    MoulinetteTemplate,
+    Perimeter,
+    Regulation,
+    evict_compiled_template,
+)
+from envergo.moulinette.registry import invalidate_registry
+from envergo.utils.models import get_changed_fields
+
+logger = logging.getLogger(__name__)
+
+# Every model the cached simulation inputs depend on, with the fields they
+# depend on. The department, configs and regulations are not cached, they are
+# read from the registry.
+RESULT_CACHE_FIELDS = {
+    Criterion: ("activation_map", "activation_distance"),
+    # The import date changes every time the map zones are imported
+    Map: ("map_type", "data_type", "import_date"),
+    Perimeter: ("activation_map",),
+}
+
+# Every model whose rows are kept in the moulinette registry
+REGISTRY_SENDERS = (
+    ConfigAmenagement,
+    ConfigHaie,
+    Criterion,
+    Department,
+    Map,
+    MoulinetteTemplate,
+    Perimeter,
+    Regulation,
+)
+
+# Registry models that are often saved for other purposes, with the fields the
+# registry copies. Other senders always invalidate the registry.
+REGISTRY_FIELDS = {
+    # Departments are copied with the configs, without their geometry
+    Department: ("department",),
+    # Maps are copied as activation maps, the import status and the spatial
+    # index flags are not used by the moulinette
+    Map: (
+        "name",
+        "display_name",
+        "source",
+        "display_for_user",
+        "file",
+        "map_type",
+        "data_type",
+        "description",
+        "departments",
+    ),
+}
+
+
+def on_moulinette_data_save(sender, instance, update_fields=None, **kwargs):
+    changed = get_changed_fields(instance, RESULT_CACHE_FIELDS[sender], update_fields)
+    instance._changes_cached_inputs = bool(changed)
+
+
+def on_moulinette_data_change(sender, instance, **kwargs):
+    # Deleted objects always invalidate the cache
+    if not instance.__dict__.pop("_changes_cached_inputs", True):
+        return
+
+    # We invalidate right away so the current request sees its own changes,
+    # and once again after the commit, in case a concurrent request cached
+    # the old data in between.
+    invalidate_result_cache()
+    transaction.on_commit(invalidate_result_cache)
+
+
+def on_registry_data_save(sender, instance, update_fields=None, **kwargs):
+    changed = get_changed_fields(instance, REGISTRY_FIELDS[sender], update_fields)
+    instance._changes_registry = bool(changed)
+
+
+def on_registry_data_change(sender, instance=None, **kwargs):
+    if instance is not None and not instance.__dict__.pop("_changes_registry", True):
+        return
+
+    # Same as above
+    invalidate_registry()
+    transaction.on_commit(invalidate_registry)
+
+
+def on_template_change(sender, instance, **kwargs):
+    evict_compiled_template(instance.pk)
+
+
+for sender in RESULT_CACHE_FIELDS.keys():
+    pre_save.connect(on_moulinette_data_save, sender=sender)
+    post_save.connect(on_moulinette_data_change, sender=sender)
+    post_delete.connect(on_moulinette_data_change, sender=sender)
+
+for sender in REGISTRY_FIELDS.keys():
+    pre_save.connect(on_registry_data_save, sender=sender)
+
+for sender in REGISTRY_SENDERS:
+    post_save.connect(on_registry_data_change, sender=sender)
+    post_delete.connect(on_registry_data_change, sender=sender)
+
+post_save.connect(on_template_change, sender=MoulinetteTemplate)
+post_delete.connect(on_template_change, sender=MoulinetteTemplate)
+
+m2m_changed.connect(on_registry_data_change, sender=Perimeter.regulations.through)
@@ -0,0 +1,236 @@
+"""Spatial context of an amenagement simulation.
+
+The amenagement moulinette needs to know, for the project location:
+
+ - the zones around the project, with their distance, sorted by category
+   (wetlands, flood zones…);
+ - the distance to the activation map of every criterion and perimeter.
+
+All those are resolved in a single sql statement: the distance to each nearby
+zone is computed once, and the activation distances are deduced from it.
+
+The grid index (see `GridCell`) spares most distance computations: zones
+covering the whole project cell are at a null distance, and zones of indexed
+maps with no cell around the project are too far away. The remaining distances
+are computed on the zone parts (see `ZonePart`).
+"""
+
+import math
+
+from django.db import connection
+from django.db.models import Case, IntegerField, Value, When
+from django.utils.functional import cached_property
+
+from envergo.geodata.models import (
+    GRID_CELL_SIZE,
+    GRID_CELL_X_SQL,
+    GRID_CELL_Y_SQL,
+    ZONE_PARTS_SQL,
+    Zone,
+)
+
+# Catalog entry -> (map type, data types)
+ZONE_CATEGORIES = {
+    "wetlands": ("zone_humide", ("certain", "forbidden")),
+    "potential_wetlands": ("zone_humide", ("uncertain",)),
+    "forbidden_wetlands": ("zone_humide", ("forbidden",)),
+    "flood_zones": ("zone_inondable", ("certain",)),
+    "potential_flood_zones": ("zone_inondable", ("uncertain",)),
+}
+
+
+def categories_sql():
+    """Return the sql expression that computes the categories of a zone."""
+
+    clauses = []
+    params = []
+    for category, (map_type, data_types) in ZONE_CATEGORIES.items():
+        clauses.append(
+            "CASE WHEN m.map_type = %s AND m.data_type = ANY(%s) THEN %s END"
+        )
+        params.extend([map_type, list(data_types), category])
+
+    sql = f"ARRAY_REMOVE(ARRAY[{', '.join(clauses)}]::text[], NULL)"
+    return sql, params
+
+
+def get_distance_annotation(distances):
+    """Annotate objects with their precomputed distance, given as {pk: distance}."""
+
+    return Case(
+        *[When(pk=pk, then=Value(distance)) for pk, distance in distances.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
+class SpatialContext:
+    """Everything the moulinette needs to know about the project location.
+
+    Only ids, distances and categories are kept, so the context can be stored
+    in the result cache (see `as_cache_entry`). The zones themselves are
+    loaded by id when first accessed.
+    """
+
+    def __init__(self, zone_rows, criteria_distances, perimeters_distances):
+        # {zone pk: (distance, categories)}
+        self.zone_rows = zone_rows
+        self.criteria_distances = criteria_distances
+        self.perimeters_distances = perimeters_distances
+
+    def as_cache_entry(self):
+        return {
+            "zone_rows": self.zone_rows,
+            "criteria_distances": self.criteria_distances,
+            "perimeters_distances": self.perimeters_distances,
+        }
+
+    @cached_property
+    def zones(self):
+        zones = list(
+            Zone.objects.filter(id__in=self.zone_rows.keys())
+            .select_related("map")
+            .defer("map__geometry")
+        )
+        for zone in zones:
+            zone.distance, zone.categories = self.zone_rows[zone.id]
+        zones.sort(key=lambda zone: (zone.distance, zone.map.name))
+        return zones
+
+    def get_zones_by_category(self):
+        data = {category: [] for category in ZONE_CATEGORIES.keys()}
+        for zone in self.zones:
+            for category in zone.categories:
+                data[category].append(zone)
+        return data
+
+    @classmethod
+    def from_zones(cls, zones, criteria_distances, perimeters_distances):
+        """Build the context from already fetched zones.
+
+        Zones must have a `distance` and a `map` property. They are kept, so
+        they are not loaded again.
+        """
+        zone_rows = {}
+        for zone in zones:
+            zone.categories = [
+                category
+                for category, (map_type, data_types) in ZONE_CATEGORIES.items()
+                if zone.map.map_type == map_type and zone.map.data_type in data_types
+            ]
+            zone_rows[zone.id] = (zone.distance, zone.categories)
+
+        context = cls(zone_rows, criteria_distances, perimeters_distances)
+        context.zones = sorted(zones, key=lambda zone: (zone.distance, zone.map.name))
+        return context
+
+    @classmethod
+    def fetch(cls, lng_lat, radius):
+        """Resolve the spatial context of the given location."""
+
+        categories, params = categories_sql()
+
+        # Number of grid cells to look around the project cell. The extra
+        # cell absorbs the Lambert 93 scale error.
+        nb_cells = math.ceil(radius / GRID_CELL_SIZE) + 1
+
+        sql = f"""
+            WITH project AS (
+                SELECT ST_SetSRID(ST_MakePoint(%s, %s), 4326) AS geom
+            ),
+            cell AS (
+                SELECT {GRID_CELL_X_SQL} AS x, {GRID_CELL_Y_SQL} AS y
+                FROM project
+            ),
+            grid AS (
+                SELECT
+                    gc.zone_id,
+                    bool_or(gc.x = c.x AND gc.y = c.y AND gc.is_full) AS covers
+                FROM geodata_gridcell gc
+                CROSS JOIN cell c
+                WHERE gc.x BETWEEN c.x - %s AND c.x + %s
+                AND gc.y BETWEEN c.y - %s AND c.y + %s
+                GROUP BY gc.zone_id
+            ),
+            nearby_zones AS (
+                SELECT z.id, z.map_id, 0 AS distance, {categories} AS categories
+                FROM grid g
+                JOIN geodata_zone z ON z.id = g.zone_id
+                JOIN geodata_map m ON m.id = z.map_id
+                WHERE g.covers
+                UNION ALL
+                SELECT z.id, z.map_id, d.distance, {categories} AS categories
+                FROM grid g
+                JOIN geodata_zone z ON z.id = g.zone_id
+                JOIN geodata_map m ON m.id = z.map_id
+                CROSS JOIN project p
+                CROSS JOIN LATERAL (
+                    SELECT
+                        MIN(ST_Distance(zp.geometry, p.geom::geography))::integer
+                        AS distance
+                    FROM {ZONE_PARTS_SQL} zp
+                    WHERE zp.zone_id = z.id
+                    AND ST_DWithin(zp.geometry, p.geom::geography, %s)
+                ) d
+                WHERE NOT g.covers
+                AND d.distance IS NOT NULL
+                UNION ALL
+                SELECT z.id, z.map_id, d.distance, {categories} AS categories
+                FROM (
+                    SELECT
+                        zp.zone_id,
+                        MIN(ST_Distance(zp.geometry, p.geom::geography))::integer
+                        AS distance
+                    FROM {ZONE_PARTS_SQL} zp
+                    CROSS JOIN project p
+                    WHERE zp.map_id NOT IN (SELECT id FROM geodata_map WHERE grid_indexed)
+                    AND ST_DWithin(zp.geometry, p.geom::geography, %s)
+                    GROUP BY zp.zone_id
+                ) d
+                JOIN geodata_zone z ON z.id = d.zone_id
+                JOIN geodata_map m ON m.id = z.map_id
+            ),
+            map_distances AS (
+                SELECT map_id, MIN(distance) AS distance
+                FROM nearby_zones
+                GROUP BY map_id
+            )
+            SELECT 'zone', id, distance, categories
+            FROM nearby_zones
+            UNION ALL
+            SELECT 'criterion', c.id, md.distance, NULL
+            FROM moulinette_criterion c
+            JOIN map_distances md ON md.map_id = c.activation_map_id
+            WHERE md.distance <= c.activation_distance
+            UNION ALL
+            SELECT 'perimeter', p.id, md.distance, NULL
+            FROM moulinette_perimeter p
+            JOIN map_distances md ON md.map_id = p.activation_map_id
+        """
+        params = [
+            lng_lat.x,
+            lng_lat.y,
+            *[nb_cells] * 4,
+            *params,
+            *params,
+            radius,
+            *params,
+            radius,
+        ]
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+
+        zone_rows = {}
+        criteria_distances = {}
+        perimeters_distances = {}
+        for kind, pk, distance, zone_categories in rows:
+            if kind == "zone":
+                zone_rows[pk] = (distance, zone_categories)
+            elif kind == "criterion":
+                criteria_distances[pk] = distance
+            else:
+                perimeters_distances[pk] = distance
+
+        return cls(zone_rows, criteria_distances, perimeters_distances)
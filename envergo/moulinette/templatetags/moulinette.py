@@ -7,7 +7,6 @@ from decimal import Decimal
 from django import template
 from django.contrib.humanize.templatetags.humanize import intcomma
 from django.forms.widgets import NumberInput
-from django.template import Context, Template
 from django.template.defaultfilters import floatformat
 from django.template.exceptions import TemplateDoesNotExist
 from django.template.loader import get_template, render_to_string
@@ -18,6 +17,7 @@ from envergo.geodata.utils import to_geojson as convert_to_geojson
 from envergo.moulinette.forms import MOTIF_CHOICES
 from envergo.moulinette.models import CityHallSubmission
 from envergo.moulinette.regulations import HaieCriterionEvaluator
+from envergo.moulinette.rendering import render_with_catalog
 from envergo.moulinette.utils import get_moulinette_class_from_site
 
 register = template.Library()
@@ -55,16 +55,17 @@ def render_from_moulinette_templates(context, template_name):
     """
     full_template_name = f"moulinette/{template_name}"
     context_data = context.flatten()  # context must be a dict, not RequestContext
-    moulinette_templates = context["moulinette"].templates
-    if template_name in moulinette_templates:
-        template_content = moulinette_templates[template_name].content
-        content = Template(template_content).render(Context(context_data))
+    moulinette = context["moulinette"]
+    if template_name in moulinette.templates:
+        template = moulinette.templates[template_name].get_compiled_template()
     else:
         try:
-            content = render_to_string((full_template_name,), context_data)
+            template = get_template(full_template_name)
         except TemplateDoesNotExist:
-            content = ""
+            return ""
 
+    # The flattened context only holds the catalog data that was already read
+    content = render_with_catalog(template, moulinette.catalog, context_data)
     return content
 
 
@@ -118,7 +119,7 @@ def criterion_template(context, template_key, **kwargs):
         logger.warning(f"Template {template_key} not found for criterion {criterion}.")
         return ""
 
-    template = Template(template_obj.content)
+    template = template_obj.get_compiled_template()
     content = template.render(context)
     return mark_safe(content)
 
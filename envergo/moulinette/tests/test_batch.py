@@ -0,0 +1,133 @@
+import json
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from envergo.moulinette.batch import MoulinetteBatch, iter_csv
+from envergo.moulinette.models import MoulinetteAmenagement
+from envergo.moulinette.tests.factories import ConfigAmenagementFactory
+from envergo.moulinette.tests.utils import (
+    COORDS_HERAULT,
+    COORDS_MOUAIS,
+    COORDS_NANTES,
+    make_amenagement_data,
+    setup_loi_sur_leau,
+)
+
+
+@pytest.fixture
+def loisurleau_criteria(france_map):  # noqa
+    ConfigAmenagementFactory(is_activated=True)
+    return setup_loi_sur_leau(france_map, include_optional=False)
+
+
+def make_row(coords, surface):
+    lat, lng = coords
+    return {
+        "lat": lat,
+        "lng": lng,
+        "existing_surface": 0,
+        "created_surface": surface,
+        "final_surface": surface,
+    }
+
+
+def test_batch_results_match_single_simulations(
+    loisurleau_criteria, herault_department
+):
+    rows = [
+        make_row(COORDS_MOUAIS, 50),
+        make_row(COORDS_NANTES, 10000),
+        make_row(COORDS_HERAULT, 1500),
+    ]
+    results = list(MoulinetteBatch(rows))
+
+    assert [result["row"] for result in results] == [0, 1, 2]
+    for row, result in zip(rows, results):
+        moulinette = MoulinetteAmenagement(
+            make_amenagement_data(
+                lat=row["lat"],
+                lng=row["lng"],
+                created_surface=row["created_surface"],
+                final_surface=row["final_surface"],
+            )
+        )
+        assert result == {"row": result["row"], **moulinette.summary()}
+
+    criteria_results = [
+        result["result"]["loi_sur_leau"]["criterions"] for result in results[:2]
+    ]
+    assert criteria_results[0]["ecoulement_sans_bv"] == "non_soumis"
+    assert criteria_results[1]["ecoulement_sans_bv"] == "soumis_ou_pac"
+    # No config in Hérault
+    assert results[2]["department"] == "34"
+    assert not results[2]["is_eval_available"]
+
+
+def test_batch_spatial_queries_do_not_depend_on_row_count(loisurleau_criteria):
+    def count_zone_queries(rows):
+        with CaptureQueriesContext(connection) as ctx:
+            list(MoulinetteBatch(rows))
+        return len([q for q in ctx.captured_queries if "geodata_zone" in q["sql"]])
+
+    few = count_zone_queries([make_row(COORDS_MOUAIS, 50)] * 2)
+    many = count_zone_queries([make_row(COORDS_MOUAIS, 50)] * 20)
+    assert few == many
+
+
+def test_batch_reports_invalid_rows(loisurleau_criteria):
+    rows = [{"lat": "not a number", "lng": 2}, make_row(COORDS_MOUAIS, 50)]
+    results = list(MoulinetteBatch(rows))
+
+    assert "lat" in results[0]["errors"]
+    assert "result" not in results[0]
+    assert results[1]["is_eval_available"]
+
+
+def test_batch_csv_export(loisurleau_criteria):
+    lines = list(iter_csv(MoulinetteBatch([make_row(COORDS_MOUAIS, 50)])))
+
+    assert lines[0].startswith("row,lat,lng,")
+    assert "loi_sur_leau" in lines[0]
+    assert lines[1].startswith("0,47.69671,-1.64695,")
+    assert "non_soumis" in lines[1]
+
+
+def test_batch_command(loisurleau_criteria, tmp_path, capsys):
+    csv_file = tmp_path / "simulations.csv"
+    csv_file.write_text(
+        "lat,lng,created_surface,final_surface\n"
+        f"{COORDS_MOUAIS[0]},{COORDS_MOUAIS[1]},50,50\n"
+    )
+    call_command("evaluate_moulinette_batch", csv_file)
+
+    result = json.loads(capsys.readouterr().out)
+    assert result["row"] == 0
+    assert result["result"]["loi_sur_leau"]["result"] == "non_soumis"
+
+
+def test_batch_view_is_staff_only(client, loisurleau_criteria):
+    url = reverse("moulinette_batch")
+    body = {"rows": [make_row(COORDS_MOUAIS, 50)]}
+    res = client.post(url, json.dumps(body), content_type="application/json")
+    assert res.status_code == 302
+
+
+def test_batch_view_streams_ndjson(staff_client, loisurleau_criteria):
+    url = reverse("moulinette_batch")
+    body = {"rows": [make_row(COORDS_MOUAIS, 50), make_row(COORDS_NANTES, 10000)]}
+    res = staff_client.post(url, json.dumps(body), content_type="application/json")
+
+    assert res.status_code == 200
+    lines = b"".join(res.streaming_content).decode().splitlines()
+    results = [json.loads(line) for line in lines]
+    assert [result["row"] for result in results] == [0, 1]
+
+
+def test_batch_view_rejects_invalid_body(staff_client):
+    url = reverse("moulinette_batch")
+    res = staff_client.post(url, "{", content_type="application/json")
+    assert res.status_code == 400
@@ -0,0 +1,150 @@
+from unittest.mock import patch
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from envergo.moulinette.cache import MoulinetteResultCache, normalize_query
+from envergo.moulinette.models import MoulinetteAmenagement
+from envergo.moulinette.tests.factories import ConfigAmenagementFactory
+from envergo.moulinette.tests.utils import make_amenagement_data, setup_loi_sur_leau
+
+
+@pytest.fixture(autouse=True)
+def result_cache(settings):
+    settings.MOULINETTE_RESULT_CACHE_TIMEOUT = 60
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def loisurleau_criteria(france_map):  # noqa
+    ConfigAmenagementFactory(is_activated=True)
+    return setup_loi_sur_leau(france_map, include_optional=False)
+
+
+def test_normalize_query_ignores_param_order_and_tiny_coords_variations():
+    query = normalize_query(47.696706, -1.646947, radius="200", date="2025-01-01")
+    assert query == normalize_query(
+        "47.69670601", "-1.64694699", date="2025-01-01", radius="200"
+    )
+    assert query != normalize_query(
+        47.696706, -1.646947, radius="500", date="2025-01-01"
+    )
+
+
+def test_repeated_simulation_skips_spatial_queries(loisurleau_criteria):
+    data = make_amenagement_data(created_surface=1500, final_surface=1500)
+    moulinette = MoulinetteAmenagement(data)
+    assert moulinette.result_cache.get() is not None
+
+    with CaptureQueriesContext(connection) as ctx:
+        cached_moulinette = MoulinetteAmenagement(
+            make_amenagement_data(created_surface=1500, final_surface=1500)
+        )
+
+    assert not any("ST_" in q["sql"] for q in ctx.captured_queries)
+    assert not any("geodata_department" in q["sql"] for q in ctx.captured_queries)
+    assert cached_moulinette.result_data() == moulinette.result_data()
+    assert cached_moulinette.department == moulinette.department
+    assert cached_moulinette.catalog["all_zones"] == moulinette.catalog["all_zones"]
+
+
+def test_cache_entry_only_contains_plain_values(loisurleau_criteria):
+    moulinette = MoulinetteAmenagement(
+        make_amenagement_data(created_surface=1500, final_surface=1500)
+    )
+    entry = moulinette.result_cache.get()
+
+    assert "spatial_context" in entry
+    assert set(entry.keys()) <= {"spatial_context", "catchment_area"}
+    zone_rows = entry["spatial_context"]["zone_rows"]
+    assert set(zone_rows.keys()) == {
+        zone.id for zone in moulinette.catalog["all_zones"]
+    }
+
+
+def test_cache_entry_is_written_once(loisurleau_criteria):
+    data = make_amenagement_data(created_surface=1500, final_surface=1500)
+    with patch.object(
+        MoulinetteResultCache,
+        "set",
+        autospec=True,
+        side_effect=MoulinetteResultCache.set,
+    ) as cache_set:
+        MoulinetteAmenagement(data)
+    assert cache_set.call_count == 1
+
+    with patch.object(MoulinetteResultCache, "set", autospec=True) as cache_set:
+        moulinette = MoulinetteAmenagement(data)
+    assert moulinette._is_cache_hit
+    assert cache_set.call_count == 0
+
+
+def test_cached_inputs_are_evaluated_with_the_current_project_data(
+    loisurleau_criteria,
+):
+    moulinette = MoulinetteAmenagement(
+        make_amenagement_data(created_surface=50, final_surface=50)
+    )
+    assert moulinette.loi_sur_leau.ecoulement_sans_bv.result_code == "non_soumis"
+
+    moulinette = MoulinetteAmenagement(
+        make_amenagement_data(created_surface=10000, final_surface=10000)
+    )
+    assert moulinette._is_cache_hit
+    assert moulinette.loi_sur_leau.ecoulement_sans_bv.result_code == "soumis_ou_pac"
+
+
+def test_criterion_edition_invalidates_the_cache(loisurleau_criteria):
+    data = make_amenagement_data(created_surface=1500, final_surface=1500)
+    moulinette = MoulinetteAmenagement(data)
+    assert len(moulinette.loi_sur_leau.criteria.all()) == 3
+
+    criterion = loisurleau_criteria[0]
+    criterion.delete()
+
+    moulinette = MoulinetteAmenagement(
+        make_amenagement_data(created_surface=1500, final_surface=1500)
+    )
+    assert not moulinette._is_cache_hit
+    assert len(moulinette.loi_sur_leau.criteria.all()) == 2
+
+
+def test_unrelated_edition_does_not_invalidate_the_cache(loisurleau_criteria):
+    data = make_amenagement_data(created_surface=1500, final_surface=1500)
+    MoulinetteAmenagement(data)
+
+    criterion = loisurleau_criteria[0]
+    criterion.title = "Nouveau titre"
+    criterion.save()
+
+    moulinette = MoulinetteAmenagement(
+        make_amenagement_data(created_surface=1500, final_surface=1500)
+    )
+    assert moulinette._is_cache_hit
+    titles = [c.title for c in moulinette.loi_sur_leau.criteria.all()]
+    assert "Nouveau titre" in titles
+
+
+def test_activation_distance_edition_invalidates_the_cache(loisurleau_criteria):
+    data = make_amenagement_data(created_surface=1500, final_surface=1500)
+    MoulinetteAmenagement(data)
+
+    criterion = loisurleau_criteria[0]
+    criterion.activation_distance = 0
+    criterion.save(update_fields=["activation_distance"])
+
+    moulinette = MoulinetteAmenagement(
+        make_amenagement_data(created_surface=1500, final_surface=1500)
+    )
+    assert not moulinette._is_cache_hit
+
+
+def test_cache_can_be_disabled(settings, loisurleau_criteria):
+    settings.MOULINETTE_RESULT_CACHE_TIMEOUT = 0
+    MoulinetteAmenagement(make_amenagement_data())
+    moulinette = MoulinetteAmenagement(make_amenagement_data())
+    assert not moulinette._is_cache_hit
@@ -7,6 +7,7 @@ import pytest
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.db.backends.postgresql.psycopg_any import DateRange
+from django.template import Context
 
 from envergo.contrib.sites.tests.factories import SiteFactory
 from envergo.geodata.tests.factories import DepartmentFactory, MapFactory, ZoneFactory
@@ -16,11 +17,13 @@ from envergo.moulinette.models import (
     ConfigHaie,
     MoulinetteAmenagement,
     MoulinetteHaie,
+    MoulinetteTemplate,
 )
 from envergo.moulinette.tests.factories import (
     ConfigAmenagementFactory,
     CriterionFactory,
     DCConfigHaieFactory,
+    MoulinetteTemplateFactory,
     PerimeterFactory,
     RegulationFactory,
 )
@@ -119,6 +122,26 @@ def test_result_with_contact_data(moulinette_data):
     assert moulinette.is_valid()
 
 
+@pytest.mark.parametrize("footprint", [50, 1200])
+def test_lazy_moulinette_evaluates_regulations_on_demand(moulinette_data):
+    ConfigAmenagementFactory(is_activated=True)
+    eager_moulinette = MoulinetteAmenagement(moulinette_data)
+
+    moulinette = MoulinetteAmenagement(moulinette_data, lazy=True)
+    assert moulinette.is_evaluated()
+    regulation = moulinette.regulations[0]
+    assert not regulation.is_evaluated()
+
+    # Accessing the result evaluates the regulation and its criteria
+    assert regulation.result == eager_moulinette.regulations[0].result
+    assert regulation.is_evaluated()
+    assert all(criterion.is_evaluated() for criterion in regulation.criteria.all())
+
+    # Nothing is left to evaluate
+    assert not moulinette.evaluate_pending()
+    assert moulinette.result == eager_moulinette.result
+
+
 @pytest.mark.parametrize("footprint", [50])
 def test_moulinette_amenagement_has_specific_behavior(moulinette_data):
     site = SiteFactory()
@@ -706,7 +729,7 @@ class TestConfigQueryWithMultipleValidityPeriods:
 
 
 def test_map_to_json_truncates_polygons_around_center():
-    """Guards against the regression where the clip buffer was applied in
+    """Guards against the regression where the clip box was computed in
     WGS84 degrees (clipping nothing) instead of metric meters."""
     from django.contrib.gis.geos import GEOSGeometry, Point, Polygon
 
@@ -728,3 +751,64 @@ def test_map_to_json_truncates_polygons_around_center():
     # The clipped polygon must be a strict, non-empty subset of the source.
     assert not truncated_geom.empty
     assert truncated_geom.area < full_geom.area
+
+
+@pytest.mark.django_db
+def test_map_to_json_uses_cached_perimeter_geometries(django_assert_num_queries):
+    from django.contrib.gis.geos import GEOSGeometry, MultiPolygon, Point, Polygon
+    from django.utils import timezone
+
+    from envergo.moulinette.regulations import Map, MapPolygon
+
+    big_polygon = Polygon.from_bbox((-1.5, 46.5, -0.5, 47.5))
+    activation_map = MapFactory(
+        geometry=MultiPolygon([big_polygon], srid=4326), import_date=timezone.now()
+    )
+    perimeter = PerimeterFactory(activation_map=activation_map)
+    perimeter = (
+        type(perimeter).objects.defer("activation_map__geometry").get(pk=perimeter.pk)
+    )
+    entry = MapPolygon(perimeters=[perimeter], color="red", label="test")
+    center = Point(-1.0, 47.0, srid=4326)
+
+    # The map geometry is only fetched once, and only the simplified version
+    with django_assert_num_queries(1):
+        Map(center=center, entries=[entry], zoom=None, truncate=False).to_json()
+    with django_assert_num_queries(0):
+        data = json.loads(
+            Map(center=center, entries=[entry], zoom=None, truncate=False).to_json()
+        )
+    polygon = GEOSGeometry(json.dumps(data["polygons"][0]["polygon"]))
+    assert polygon.equals(big_polygon)
+
+    # A new import invalidates the cached geometries
+    activation_map.geometry = MultiPolygon(
+        [Polygon.from_bbox((-1.2, 46.8, -0.8, 47.2))], srid=4326
+    )
+    activation_map.import_date = timezone.now()
+    activation_map.save()
+    perimeter.activation_map = activation_map
+    data = json.loads(Map(center=center, entries=[entry], truncate=False).to_json())
+    polygon = GEOSGeometry(json.dumps(data["polygons"][0]["polygon"]))
+    assert polygon.area < big_polygon.area
+
+
+@pytest.mark.django_db
+def test_moulinette_template_compilation_is_cached():
+    tpl = MoulinetteTemplateFactory(content="Hello {{ name }}")
+
+    compiled = tpl.get_compiled_template()
+    fresh = MoulinetteTemplate.objects.get(pk=tpl.pk)
+    assert fresh.get_compiled_template() is compiled
+
+    tpl.content = "Bye {{ name }}"
+    tpl.save()
+    recompiled = tpl.get_compiled_template()
+    assert recompiled is not compiled
+    assert recompiled.render(Context({"name": "Bob"})) == "Bye Bob"
+
+    # A stale copy of the object must not bring back the old version
+    assert fresh.get_compiled_template() is not recompiled
+    assert fresh.get_compiled_template().render(Context({"name": "Bob"})) == (
+        "Hello Bob"
+    )
@@ -0,0 +1,97 @@
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from envergo.moulinette import prefetch as prefetch_module
+from envergo.moulinette.models import MoulinetteAmenagement
+from envergo.moulinette.prefetch import prefetch
+from envergo.moulinette.tests.factories import ConfigAmenagementFactory
+from envergo.moulinette.tests.utils import make_amenagement_data, setup_loi_sur_leau
+
+
+@pytest.fixture
+def workers(settings, monkeypatch):
+    settings.MOULINETTE_PREFETCH_WORKERS = 2
+    monkeypatch.setattr(prefetch_module, "_executor", None)
+
+
+def test_prefetch_is_disabled_in_tests():
+    assert prefetch({"answer": lambda: 42}) == {}
+
+
+def test_prefetch_runs_inputs_concurrently(workers):
+    # Both inputs wait for each other, so they must run at the same time
+    barrier = threading.Barrier(2, timeout=5)
+
+    def fetch(value):
+        barrier.wait()
+        return value
+
+    futures = prefetch({"a": lambda: fetch(1), "b": lambda: fetch(2)})
+
+    assert futures["a"].result(timeout=5) == 1
+    assert futures["b"].result(timeout=5) == 2
+
+
+def test_prefetch_errors_are_raised_on_result(workers):
+    def fetch():
+        raise ValueError("Nope")
+
+    futures = prefetch({"error": fetch})
+
+    with pytest.raises(ValueError):
+        futures["error"].result(timeout=5)
+
+
+@pytest.fixture
+def worker_threads():
+    """Record the prefetched inputs, and the thread they were fetched in."""
+    threads = {}
+
+    def run_in_worker(func):
+        threads[func.func.__name__] = threading.current_thread().name
+        return prefetch_module.run_in_worker(func)
+
+    with patch("envergo.moulinette.prefetch.run_in_worker", run_in_worker):
+        yield threads
+
+
+@pytest.mark.django_db(transaction=True)
+def test_moulinette_inputs_are_fetched_in_workers(
+    workers, worker_threads, settings, france_map, loire_atlantique_department
+):
+    """Worker threads use their own connections, that see the committed data."""
+    settings.MOULINETTE_RESULT_CACHE_TIMEOUT = 0
+    ConfigAmenagementFactory(is_activated=True)
+    setup_loi_sur_leau(france_map, include_optional=False)
+    data = make_amenagement_data(created_surface=1500, final_surface=1500)
+
+    moulinette = MoulinetteAmenagement(data)
+    result = moulinette.result_data()
+    department = moulinette.department
+
+    # No activated criterion reads the catchment area
+    assert set(worker_threads) == {"fetch"}
+    assert all(
+        name.startswith("moulinette-prefetch") for name in worker_threads.values()
+    )
+
+    settings.MOULINETTE_PREFETCH_WORKERS = 0
+    expected = MoulinetteAmenagement(data)
+    assert department == expected.department == loire_atlantique_department
+    assert result == expected.result_data()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_catchment_area_is_prefetched_for_activated_criteria(
+    workers, worker_threads, settings, france_map, loire_atlantique_department
+):
+    settings.MOULINETTE_RESULT_CACHE_TIMEOUT = 0
+    ConfigAmenagementFactory(is_activated=True)
+    setup_loi_sur_leau(france_map, include_optional=True)
+    data = make_amenagement_data(created_surface=1500, final_surface=1500)
+
+    MoulinetteAmenagement(data)
+
+    assert set(worker_threads) == {"fetch", "get_catchment_area"}
@@ -0,0 +1,86 @@
+from urllib.parse import urlencode
+
+import pytest
+from django.urls import reverse
+
+from envergo.geodata.models import Map
+from envergo.moulinette.models import MoulinetteAmenagement
+from envergo.moulinette.profiling import profile_evaluation, step
+from envergo.moulinette.tests.factories import ConfigAmenagementFactory
+from envergo.moulinette.tests.utils import make_amenagement_data, setup_loi_sur_leau
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def loisurleau_criteria(france_map):  # noqa
+    ConfigAmenagementFactory(is_activated=True)
+    return setup_loi_sur_leau(france_map, include_optional=False)
+
+
+def test_evaluation_is_not_profiled_by_default(settings, loisurleau_criteria):
+    settings.MOULINETTE_PROFILING_SAMPLE_RATE = 0
+    moulinette = MoulinetteAmenagement(make_amenagement_data())
+    assert moulinette.profile is None
+
+
+def test_evaluation_is_sampled(settings, loisurleau_criteria):
+    settings.MOULINETTE_PROFILING_SAMPLE_RATE = 1
+    moulinette = MoulinetteAmenagement(make_amenagement_data())
+    assert moulinette.profile is not None
+    assert moulinette.profile.name == "MoulinetteAmenagement"
+
+
+def test_evaluation_steps_are_recorded(settings, loisurleau_criteria, caplog):
+    settings.MOULINETTE_PROFILING_SAMPLE_RATE = 0
+    with profile_evaluation(force=True):
+        moulinette = MoulinetteAmenagement(make_amenagement_data())
+
+    profile = moulinette.profile
+    steps = {(s.kind, s.name): s for s in profile.steps}
+    assert ("regulation", "loi_sur_leau") in steps
+    assert ("criterion", "loi_sur_leau__zone_humide") in steps
+    assert ("criterion_catalog", "loi_sur_leau__zone_humide") in steps
+    assert steps[("criterion", "loi_sur_leau__zone_humide")].depth == 1
+    assert profile.total.queries > 0
+    assert profile.total.duration > 0
+    assert "Moulinette profile: MoulinetteAmenagement" in caplog.text
+
+
+def test_result_page_profile_includes_lazy_evaluation(
+    settings, client, loisurleau_criteria, caplog
+):
+    """Regulations are evaluated while the page renders, and must be profiled."""
+    settings.MOULINETTE_PROFILING_SAMPLE_RATE = 1
+    data = make_amenagement_data()["data"]
+    res = client.get(f"{reverse('moulinette_result')}?{urlencode(data)}")
+    assert res.status_code == 200
+
+    profiles = [
+        record.moulinette_profile
+        for record in caplog.records
+        if hasattr(record, "moulinette_profile")
+    ]
+    assert len(profiles) == 1
+    steps = {(s["kind"], s["name"]) for s in profiles[0]["steps"]}
+    assert ("regulation", "loi_sur_leau") in steps
+    assert ("criterion", "loi_sur_leau__zone_humide") in steps
+
+
+def test_queries_are_charged_to_open_steps(settings):
+    settings.MOULINETTE_PROFILING_SAMPLE_RATE = 0
+    with profile_evaluation("test", force=True) as profile:
+        with step("regulation", "outer"):
+            list(Map.objects.all())
+            with step("criterion", "inner"):
+                list(Map.objects.all())
+
+    outer, inner = profile.steps
+    assert outer.queries == 2
+    assert inner.queries == 1
+    assert profile.total.queries == 2
+
+
+def test_steps_are_noop_when_not_profiled():
+    with step("regulation", "outer") as profile_step:
+        assert profile_step is None
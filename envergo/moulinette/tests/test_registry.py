@@ -0,0 +1,109 @@
+from datetime import date
+
+import pytest
+from django.db import connection
+from django.db.backends.postgresql.psycopg_any import DateRange
+from django.test.utils import CaptureQueriesContext
+
+from envergo.geodata.tests.factories import DepartmentFactory
+from envergo.moulinette.models import ConfigAmenagement, MoulinetteAmenagement
+from envergo.moulinette.registry import get_registry
+from envergo.moulinette.tests.factories import (
+    ConfigAmenagementFactory,
+    CriterionFactory,
+)
+from envergo.moulinette.tests.utils import make_amenagement_data, setup_loi_sur_leau
+
+pytestmark = pytest.mark.django_db
+
+REGISTRY_TABLES = (
+    "moulinette_regulation",
+    "moulinette_criterion",
+    "moulinette_configamenagement",
+    "moulinette_moulinettetemplate",
+)
+
+
+@pytest.fixture
+def loisurleau_criteria(france_map):  # noqa
+    ConfigAmenagementFactory(is_activated=True)
+    return setup_loi_sur_leau(france_map, include_optional=False)
+
+
+def test_registry_is_rebuilt_when_data_changes(loisurleau_criteria):
+    registry = get_registry()
+    assert get_registry() is registry
+
+    CriterionFactory(regulation=loisurleau_criteria[0].regulation)
+    assert get_registry() is not registry
+
+
+def test_registry_is_kept_on_map_import_updates(loisurleau_criteria, france_map):
+    registry = get_registry()
+
+    france_map.import_status = "success"
+    france_map.grid_indexed = True
+    france_map.save()
+    assert get_registry() is registry
+
+    france_map.name = "Nouveau nom"
+    france_map.save()
+    assert get_registry() is not registry
+
+
+def test_simulation_reads_configuration_from_registry(loisurleau_criteria):
+    MoulinetteAmenagement(make_amenagement_data())
+
+    with CaptureQueriesContext(connection) as ctx:
+        moulinette = MoulinetteAmenagement(make_amenagement_data())
+
+    for table in REGISTRY_TABLES:
+        assert not any(f'FROM "{table}"' in q["sql"] for q in ctx.captured_queries)
+    assert moulinette.is_evaluation_available()
+    assert len(moulinette.loi_sur_leau.criteria.all()) == 3
+
+
+def test_registry_returns_fresh_copies(loisurleau_criteria):
+    first = MoulinetteAmenagement(make_amenagement_data(created_surface=50))
+    second = MoulinetteAmenagement(make_amenagement_data(created_surface=10000))
+
+    assert first.loi_sur_leau is not second.loi_sur_leau
+    assert first.loi_sur_leau.ecoulement_sans_bv.moulinette is first
+    assert first.loi_sur_leau.ecoulement_sans_bv.result_code == "non_soumis"
+    assert second.loi_sur_leau.ecoulement_sans_bv.result_code == "soumis_ou_pac"
+
+
+def test_registry_config_validity():
+    department = DepartmentFactory()
+    old_config = ConfigAmenagementFactory(
+        department=department,
+        validity_range=DateRange(date(2024, 1, 1), date(2025, 1, 1), "[)"),
+    )
+    new_config = ConfigAmenagementFactory(
+        department=department,
+        validity_range=DateRange(date(2025, 1, 1), None, "[)"),
+    )
+
+    registry = get_registry()
+    get_config = registry.get_valid_config
+    assert get_config(ConfigAmenagement, department, date(2024, 6, 1)) == old_config
+    assert get_config(ConfigAmenagement, department, date(2025, 1, 1)) == new_config
+    assert get_config(ConfigAmenagement, department, date(2023, 1, 1)) is None
+
+
+def test_registry_criteria_validity(loisurleau_criteria):
+    criterion = loisurleau_criteria[0]
+    criterion.validity_range = DateRange(date(2024, 1, 1), date(2025, 1, 1), "[)")
+    criterion.save()
+
+    distances = {c.id: 0 for c in loisurleau_criteria}
+    registry = get_registry()
+    [regulation] = registry.get_regulations(
+        ["loi_sur_leau"], date(2024, 6, 1), distances
+    )
+    assert criterion in regulation.criteria.all()
+
+    [regulation] = registry.get_regulations(
+        ["loi_sur_leau"], date(2025, 6, 1), distances
+    )
+    assert criterion not in regulation.criteria.all()
@@ -0,0 +1,51 @@
+from django.template import Template
+
+from envergo.moulinette.models import MoulinetteCatalog
+from envergo.moulinette.rendering import render_with_catalog
+
+
+def make_catalog(fetched):
+    catalog = MoulinetteCatalog(lng=-1)
+    catalog.add_resolver("all_zones", lambda: fetched.append("all_zones") or [])
+    catalog.add_resolver("catchment_area", lambda: fetched.append("area") or 4200)
+    return catalog
+
+
+def test_templates_only_fetch_the_catalog_data_they_read():
+    fetched = []
+    catalog = make_catalog(fetched)
+
+    content = render_with_catalog(
+        Template("{{ title }} {{ lng }} {{ catchment_area }}"),
+        catalog,
+        {"title": "Simulation"},
+    )
+
+    assert content == "Simulation -1 4200"
+    assert fetched == ["area"]
+    assert "all_zones" in catalog.resolvers
+
+
+def test_context_variables_take_precedence_over_the_catalog():
+    catalog = make_catalog([])
+
+    content = render_with_catalog(Template("{{ lng }}"), catalog, {"lng": 3})
+
+    assert content == "3"
+
+
+def test_unknown_variables_are_looked_up_after_pending_evaluations():
+    catalog = make_catalog([])
+    evaluations = []
+
+    def evaluate_pending():
+        evaluations.append(True)
+        catalog["contributed"] = "ok"
+        return True
+
+    catalog.on_missing = evaluate_pending
+
+    content = render_with_catalog(Template("{{ contributed }}"), catalog, {})
+
+    assert content == "ok"
+    assert evaluations == [True]
@@ -0,0 +1,113 @@
+import pytest
+from django.contrib.gis.geos import MultiPolygon, Point, Polygon
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from envergo.geodata.tests.factories import MapFactory
+from envergo.geodata.utils import index_map_grid
+from envergo.moulinette.models import MoulinetteAmenagement
+from envergo.moulinette.spatial import SpatialContext
+from envergo.moulinette.tests.factories import (
+    ConfigAmenagementFactory,
+    CriterionFactory,
+    PerimeterFactory,
+)
+from envergo.moulinette.tests.utils import (
+    COORDS_MOUAIS,
+    make_amenagement_data,
+    setup_loi_sur_leau,
+)
+
+pytestmark = pytest.mark.django_db
+
+LNG_LAT_MOUAIS = Point(COORDS_MOUAIS[1], COORDS_MOUAIS[0], srid=4326)
+
+
+@pytest.fixture
+def nearby_map():
+    """A map with a zone ~110m north of Mouais."""
+
+    polygon = Polygon(
+        [
+            (-1.648, 47.6977),
+            (-1.646, 47.6977),
+            (-1.646, 47.6987),
+            (-1.648, 47.6987),
+            (-1.648, 47.6977),
+        ],
+        srid=4326,
+    )
+    return MapFactory(
+        name="Nearby map",
+        map_type="zone_inondable",
+        data_type="uncertain",
+        zones__geometry=MultiPolygon([polygon]),
+    )
+
+
+def test_zones_are_classified(france_map, france_zh, nearby_map):
+    context = SpatialContext.fetch(LNG_LAT_MOUAIS, 200)
+
+    assert [zone.map for zone in context.zones] == [france_map, france_zh, nearby_map]
+    assert context.zones[0].distance == 0
+    assert 100 < context.zones[2].distance < 120
+
+    zones = context.get_zones_by_category()
+    assert [zone.map for zone in zones["wetlands"]] == [france_zh]
+    assert [zone.map for zone in zones["potential_flood_zones"]] == [nearby_map]
+    assert zones["potential_wetlands"] == []
+    assert zones["forbidden_wetlands"] == []
+    assert zones["flood_zones"] == []
+
+
+def test_grid_indexed_maps(france_map, france_zh, nearby_map):
+    """The grid index does not change the results."""
+
+    expected = SpatialContext.fetch(LNG_LAT_MOUAIS, 200)
+    for map in (france_map, france_zh, nearby_map):
+        index_map_grid(map)
+        map.save()
+
+    context = SpatialContext.fetch(LNG_LAT_MOUAIS, 200)
+
+    assert [(z.id, z.distance) for z in context.zones] == [
+        (z.id, z.distance) for z in expected.zones
+    ]
+    assert context.zones[0].distance == 0
+
+
+def test_zones_beyond_radius_are_ignored(nearby_map):
+    context = SpatialContext.fetch(LNG_LAT_MOUAIS, 50)
+
+    assert context.zones == []
+    assert context.get_zones_by_category()["potential_flood_zones"] == []
+
+
+def test_activation_distances(france_map, nearby_map):
+    inside = CriterionFactory(activation_map=france_map)
+    near = CriterionFactory(activation_map=nearby_map, activation_distance=150)
+    too_far = CriterionFactory(activation_map=nearby_map, activation_distance=50)
+    perimeter = PerimeterFactory(activation_map=nearby_map)
+
+    context = SpatialContext.fetch(LNG_LAT_MOUAIS, 200)
+
+    assert context.criteria_distances[inside.id] == 0
+    assert 100 < context.criteria_distances[near.id] < 120
+    assert too_far.id not in context.criteria_distances
+    assert context.perimeters_distances == {
+        perimeter.id: context.criteria_distances[near.id]
+    }
+
+
+def test_moulinette_computes_distances_once(france_map, nearby_map):
+    ConfigAmenagementFactory(is_activated=True)
+    setup_loi_sur_leau(france_map, include_optional=False)
+
+    with CaptureQueriesContext(connection) as ctx:
+        moulinette = MoulinetteAmenagement(make_amenagement_data())
+        assert moulinette.loi_sur_leau.result is not None
+
+    distance_queries = [q for q in ctx.captured_queries if "ST_Distance" in q["sql"]]
+    assert len(distance_queries) == 1
+    assert len(moulinette.loi_sur_leau.criteria.all()) == 3
+    assert moulinette.catalog["potential_flood_zones"][0].map == nearby_map
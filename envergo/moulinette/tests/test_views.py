@@ -140,6 +140,7 @@ def test_moulinette_result_debug_page(client):
 
     assert res.status_code == 200
     assertTemplateUsed(res, "amenagement/moulinette/result_debug.html")
+    assert "Profilage de l’évaluation" in res.content.decode()
 
 
 def test_moulinette_post_form_error(client):
@@ -2,7 +2,10 @@ from django.urls import include, path
 from django.utils.translation import gettext_lazy as _
 from django.views.generic import RedirectView
 
-from envergo.moulinette.views import MoulinetteAmenagementResult
+from envergo.moulinette.views import (
+    MoulinetteAmenagementBatch,
+    MoulinetteAmenagementResult,
+)
 
 from .urls import urlpatterns as common_urlpatterns
 
@@ -22,4 +25,5 @@ urlpatterns = [
             ]
         ),
     ),
+    path("batch/", MoulinetteAmenagementBatch.as_view(), name="moulinette_batch"),
 ] + common_urlpatterns
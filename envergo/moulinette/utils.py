@@ -27,12 +27,12 @@ class MoulinetteUrl:
     def params(self):
         return self.querydict.dict()
 
-    def get_moulinette(self):
+    def get_moulinette(self, lazy=False):
         try:
             MoulinetteClass = get_moulinette_class_from_url(self.url)
             data = self.params
             moulinette_data = {"initial": data, "data": data}
-            moulinette = MoulinetteClass(moulinette_data)
+            moulinette = MoulinetteClass(moulinette_data, lazy=lazy)
             return moulinette
         except RuntimeError:
             moulinette = None
@@ -44,7 +44,7 @@ class MoulinetteUrl:
 
         A moulinette url is valid if it can create a valid Moulinette with a valid url.
         """
-        moulinette = self.get_moulinette()
+        moulinette = self.get_moulinette(lazy=True)
         return moulinette and moulinette.is_valid()
 
     def __getitem__(self, key):
@@ -1,26 +1,36 @@
 import json
 from collections import defaultdict
+from contextlib import ExitStack
 from datetime import date
+from functools import partial
 from itertools import groupby
 from operator import attrgetter
 from urllib.parse import urlencode
 
+from dateutil import parser
 from django.conf import settings
 from django.contrib import messages
+from django.contrib.auth.mixins import UserPassesTestMixin
 from django.forms.widgets import CheckboxInput
-from django.http import Http404, HttpResponseRedirect
-from django.template.response import TemplateResponse
+from django.http import (
+    Http404,
+    HttpResponseRedirect,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from django.template.response import SimpleTemplateResponse, TemplateResponse
 from django.urls import reverse
 from django.utils.decorators import method_decorator
+from django.utils.functional import SimpleLazyObject
 from django.views.decorators.clickjacking import xframe_options_sameorigin
-from django.views.generic import DetailView, FormView, ListView
+from django.views.generic import DetailView, FormView, ListView, View
 
 from envergo.analytics.forms import FeedbackFormUseful, FeedbackFormUseless
 from envergo.analytics.utils import (
     get_matomo_tags,
     get_user_type,
-    is_request_from_a_bot,
     log_event,
+    log_unless_bot,
     update_url_with_matomo_params,
 )
 from envergo.evaluations.models import TagStyleEnum
@@ -28,6 +38,7 @@ from envergo.geodata.models import MAP_TYPES, Map
 from envergo.geodata.utils import get_address_from_coords
 from envergo.hedges.models import HedgeCategory, HedgeTypeFactory
 from envergo.hedges.services import PlantationEvaluator
+from envergo.moulinette.batch import MoulinetteBatch, iter_csv, iter_ndjson
 from envergo.moulinette.forms import TriageFormHaie
 from envergo.moulinette.models import (
     AaL3503Handling,
@@ -36,6 +47,9 @@ from envergo.moulinette.models import (
     Criterion,
     Regulation,
 )
+from envergo.moulinette.prefetch import prefetch
+from envergo.moulinette.profiling import profile_evaluation
+from envergo.moulinette.rendering import MoulinetteTemplateResponse
 from envergo.moulinette.utils import get_moulinette_class_from_site
 from envergo.users.mixins import InstructorDepartmentAuthorised
 from envergo.utils.tools import get_department_settings_form_url
@@ -45,6 +59,8 @@ from envergo.utils.urls import copy_qs, remove_from_qs, remove_mtm_params, updat
 class MoulinetteMixin:
     """Display the moulinette form and results."""
 
+    response_class = MoulinetteTemplateResponse
+
     def setup(self, request, *args, **kwargs):
         """Add a moulinette object to the view.
 
@@ -55,7 +71,33 @@ class MoulinetteMixin:
         """
         super().setup(request, *args, **kwargs)
         MoulinetteClass = get_moulinette_class_from_site(request.site)
-        self.moulinette = MoulinetteClass(self.get_form_kwargs())
+
+        # The evaluation is always profiled on the debug page, so it must
+        # happen right away. Otherwise, regulations are evaluated on demand,
+        # and redirections don't evaluate anything.
+        # The profile stays open until the response is rendered (see
+        # `dispatch`), since that's when a lazy moulinette is evaluated.
+        is_debug = bool(request.GET.get("debug", False))
+        self.profile = ExitStack()
+        self.profile.enter_context(profile_evaluation(force=is_debug))
+        try:
+            self.moulinette = MoulinetteClass(self.get_form_kwargs(), lazy=not is_debug)
+            if is_debug:
+                self.moulinette.catalog.resolve_all()
+        except BaseException:
+            self.profile.close()
+            raise
+
+    def dispatch(self, request, *args, **kwargs):
+        with self.profile:
+            response = super().dispatch(request, *args, **kwargs)
+            if isinstance(response, SimpleTemplateResponse):
+                response.render()
+        return response
+
+    def render_to_response(self, context, **response_kwargs):
+        response_kwargs.setdefault("catalog", self.moulinette.catalog)
+        return super().render_to_response(context, **response_kwargs)
 
     def get_form_class(self):
         FormClass = self.moulinette.get_main_form_class()
@@ -105,6 +147,9 @@ class MoulinetteMixin:
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context["moulinette"] = self.moulinette
+
+        # The data that was not fetched yet is read from the catalog by the
+        # templates that need it (see `MoulinetteTemplateResponse`)
         context.update(self.moulinette.catalog)
 
         user = self.request.user
@@ -126,15 +171,28 @@ class MoulinetteMixin:
                 self.moulinette.are_additional_forms_bound()
             )
 
-            moulinette_data = self.moulinette.summary()
-            context["moulinette_summary"] = json.dumps(moulinette_data)
-            context["feedback_form_useful"] = FeedbackFormUseful(
-                prefix="useful",
-                initial={"feedback": "Oui", "moulinette_data": moulinette_data},
+            # The summary evaluates every regulation, so it is only computed
+            # if the page displays it
+            context["moulinette_summary"] = SimpleLazyObject(
+                lambda: json.dumps(self.get_moulinette_summary())
             )
-            context["feedback_form_useless"] = FeedbackFormUseless(
-                prefix="useless",
-                initial={"feedback": "Non", "moulinette_data": moulinette_data},
+            context["feedback_form_useful"] = SimpleLazyObject(
+                lambda: FeedbackFormUseful(
+                    prefix="useful",
+                    initial={
+                        "feedback": "Oui",
+                        "moulinette_data": self.get_moulinette_summary(),
+                    },
+                )
+            )
+            context["feedback_form_useless"] = SimpleLazyObject(
+                lambda: FeedbackFormUseless(
+                    prefix="useless",
+                    initial={
+                        "feedback": "Non",
+                        "moulinette_data": self.get_moulinette_summary(),
+                    },
+                )
             )
 
         # Is there a zoom value set in the url?
@@ -182,6 +240,13 @@ class MoulinetteMixin:
 
         return context
 
+    def get_moulinette_summary(self):
+        """Return the moulinette summary, computed once per request."""
+
+        if not hasattr(self, "_moulinette_summary"):
+            self._moulinette_summary = self.moulinette.summary()
+        return self._moulinette_summary
+
     def get_urls_context_data(self, context):
         """Custom context data related to urls.
 
@@ -287,7 +352,10 @@ class MoulinetteMixin:
         return url_with_params
 
     def log_moulinette_event(self, moulinette, context, **kwargs):
-        export = moulinette.summary()
+        if moulinette is self.moulinette:
+            export = dict(self.get_moulinette_summary())
+        else:
+            export = moulinette.summary()
         export.update(kwargs)
         export["url"] = self.request.build_absolute_uri()
 
@@ -303,7 +371,7 @@ class MoulinetteMixin:
         mtm_keys = get_matomo_tags(self.request)
         export.update(mtm_keys)
 
-        log_event(
+        return log_event(
             self.event_category,
             action,
             self.request,
@@ -550,6 +618,13 @@ class MoulinetteResultMixin:
 
 
 class BaseMoulinetteResult(FormView):
+    def prefetch_result_inputs(self):
+        """Start fetching the data only needed to render the result page.
+
+        Called once we know the result page will be rendered, and not
+        redirected.
+        """
+
     def get(self, request, *args, **kwargs):
         moulinette = self.moulinette
         triage_form = moulinette.triage_form
@@ -581,17 +656,12 @@ class BaseMoulinetteResult(FormView):
         if redirect_url:
             return HttpResponseRedirect(redirect_url)
 
+        self.prefetch_result_inputs()
         context = self.get_context_data(**kwargs)
         res = self.render_to_response(context)
 
         # Logging moulinette event
-        if is_request_from_a_bot(request):
-            # When we detect that the request comes from a robot
-            # (e.g a search engine crawler), we don't log any event to try to keep
-            # some clean analytiscs
-            pass
-        else:
-            self.log_moulinette_event(moulinette, context)
+        log_unless_bot(request, lambda: self.log_moulinette_event(moulinette, context))
 
         return res
 
@@ -601,6 +671,17 @@ class MoulinetteAmenagementResult(
 ):
     event_category = "simulateur"
     event_action_amenagement = "soumission"
+    prefetched = {}
+
+    def prefetch_result_inputs(self):
+        # The address is fetched from the IGN api while the moulinette is
+        # evaluated and rendered
+        lng = self.moulinette.catalog.get("lng")
+        lat = self.moulinette.catalog.get("lat")
+        if lng and lat:
+            self.prefetched = prefetch(
+                {"address": partial(get_address_from_coords, lng, lat)}
+            )
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -610,7 +691,10 @@ class MoulinetteAmenagementResult(
             lng = moulinette.catalog.get("lng")
             lat = moulinette.catalog.get("lat")
             if lng and lat:
-                address = get_address_from_coords(lng, lat)
+                if "address" in self.prefetched:
+                    address = self.prefetched["address"].result()
+                else:
+                    address = get_address_from_coords(lng, lat)
                 if address:
                     context["address"] = address
                     context["form"].data[
@@ -623,6 +707,51 @@ class MoulinetteAmenagementResult(
         return context
 
 
+class MoulinetteAmenagementBatch(UserPassesTestMixin, View):
+    """Evaluate the amenagement moulinette for many locations at once.
+
+    The request body is a json object, e.g:
+    {"date": "2025-01-01", "rows": [{"lat": …, "lng": …, "created_surface": …}]}
+
+    Results are streamed as ndjson (one line per row), or as csv when the
+    `format=csv` parameter is set.
+    """
+
+    http_method_names = ["post"]
+    max_rows = 5000
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def post(self, request, *args, **kwargs):
+        try:
+            body = json.loads(request.body)
+            rows = body["rows"]
+            simulation_date = body.get("date")
+            if simulation_date:
+                simulation_date = parser.isoparse(simulation_date).date()
+        except (json.JSONDecodeError, KeyError, TypeError, ValueError):
+            return JsonResponse({"error": "Invalid JSON data"}, status=400)
+
+        if not isinstance(rows, list) or not all(isinstance(r, dict) for r in rows):
+            return JsonResponse({"error": "Rows must be a list of objects"}, status=400)
+
+        if len(rows) > self.max_rows:
+            return JsonResponse(
+                {"error": f"Too many rows (max {self.max_rows})"}, status=400
+            )
+
+        batch = MoulinetteBatch(rows, date=simulation_date)
+        if request.GET.get("format") == "csv":
+            response = StreamingHttpResponse(iter_csv(batch), content_type="text/csv")
+            response["Content-Disposition"] = 'attachment; filename="simulations.csv"'
+        else:
+            response = StreamingHttpResponse(
+                iter_ndjson(batch), content_type="application/x-ndjson"
+            )
+        return response
+
+
 class MoulinetteHaieResult(
     MoulinetteResultMixin, MoulinetteMixin, BaseMoulinetteResult
 ):
@@ -716,7 +845,7 @@ class MoulinetteResultPlantation(MoulinetteHaieResult):
 
     def log_moulinette_event(self, moulinette, context, **kwargs):
         kwargs["plantation_acceptable"] = context["plantation_evaluation"].result
-        super().log_moulinette_event(moulinette, context, **kwargs)
+        return super().log_moulinette_event(moulinette, context, **kwargs)
 
 
 class Triage(MoulinetteMixin, FormView):
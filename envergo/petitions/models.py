@@ -506,8 +506,14 @@ class PetitionProject(MoulinetteHaieUrlMixin, models.Model):
         self.save()
 
     def get_moulinette(self):
-        """Recreate moulinette from moulinette url and hedge data"""
-        if not hasattr(self, "_moulinette"):
+        """Recreate moulinette from moulinette url and hedge data
+
+        The moulinette is memoized until the url or the hedge data change, so
+        the result snapshot and the dossier pre-fill share a single evaluation.
+        """
+        key = (self.moulinette_url, self.hedge_data_id)
+        if getattr(self, "_moulinette_key", None) != key:
+            self._moulinette_key = key
             moulinette_data = self._parse_moulinette_data()
             moulinette_data["haies"] = self.hedge_data
             form_data = {"initial": moulinette_data, "data": moulinette_data}
@@ -932,7 +938,11 @@ class ResultSnapshot(ResultSnapshotBase):
 
     @classmethod
     def create_for_project(cls, project):
-        """Create a snapshot for a PetitionProject."""
+        """Create a snapshot for a PetitionProject.
+
+        The project moulinette is memoized, so it is not evaluated again if it
+        was already used (see `PetitionProject.get_moulinette`).
+        """
         moulinette = project.get_moulinette()
         payload = moulinette.summary()
         # Convert HedgeData object to its UUID for JSON serialization
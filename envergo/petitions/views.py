@@ -399,7 +399,8 @@ class PetitionProjectCreate(FormView):
         """
 
         moulinette_url = project.moulinette_url
-        moulinette = MoulinetteUrl(moulinette_url).get_moulinette()
+        # Shared with the result snapshot created when the project is saved
+        moulinette = project.get_moulinette()
         config = moulinette.config
         if config is None:
             department = extract_param_from_url(moulinette_url, "department")
@@ -17,3 +17,36 @@ class ResultSnapshotBase(models.Model):
 
     class Meta:
         abstract = True
+
+
+def get_changed_fields(instance, fields, update_fields=None):
+    """Return the given fields whose value will change when the instance is saved.
+
+    Meant to be called from a `pre_save` signal handler, so the stored values
+    can be compared with the instance ones. All fields of a new object are
+    considered changed.
+    """
+    if update_fields is not None:
+        fields = [name for name in fields if name in update_fields]
+
+    if not fields:
+        return set()
+
+    if instance._state.adding or instance.pk is None:
+        return set(fields)
+
+    attnames = {name: instance._meta.get_field(name).attname for name in fields}
+    stored = (
+        type(instance)
+        ._base_manager.filter(pk=instance.pk)
+        .values(*attnames.values())
+        .first()
+    )
+    if stored is None:
+        return set(fields)
+
+    return {
+        name
+        for name, attname in attnames.items()
+        if getattr(instance, attname) != stored[attname]
+    }